@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""Time the core PestUtilsLib entry points and helpers on synthetic grids.
+
+Each case is run at each grid size in a fresh interpreter, so that the
+peak resident memory reported is that of the case alone. The best time of
+``--repeat`` calls is reported, with the peak memory after setup and after
+the timed calls. Results may be written to JSON with ``--output`` and
+compared with a previous run with ``--compare``, so that regressions
+between releases are caught. The 1M cell grids are only run if selected
+with ``--size``, as some cases take minutes. Usage::
+
+    python benchmarks/core.py
+    python benchmarks/core.py --size 1M --case krige_using_file
+    python benchmarks/core.py --output new.json --compare old.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+sizes = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+
+# cell size, pilot point spacing in cells, and number of model layers
+delta = 10.0
+pp_space = 10
+nlay = 3
+
+# smallest increase in time, in seconds, reported as a regression
+min_time_diff = 0.01
+
+cases: dict[str, Callable[[Path, int], Callable[[], object]]] = {}
+
+
+def case(func):
+    """Register a case, which sets up in a directory for a number of cells
+    and returns the function to time."""
+    cases[func.__name__] = func
+    return func
+
+
+def peak_memory_mb() -> float | None:
+    """Peak resident memory of this process in MB, or None if unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss / (1024.0**2 if sys.platform == "darwin" else 1024.0)
+
+
+def grid_shape(ncells: int, layers: int = 1) -> tuple[int, int]:
+    """Square-ish number of rows and columns for ncells over layers."""
+    ncpl = ncells // layers
+    nrow = int(round(np.sqrt(ncpl)))
+    return nrow, ncpl // nrow
+
+
+def cell_centres(nrow: int, ncol: int) -> tuple[np.ndarray, np.ndarray]:
+    """Cell centres of one layer, with the origin at the lower left."""
+    y, x = np.mgrid[nrow - 0.5 : 0 : -1, 0.5:ncol]
+    return x.ravel() * delta, y.ravel() * delta
+
+
+def pilot_points(nrow: int, ncol: int) -> tuple[np.ndarray, np.ndarray]:
+    """Pilot points every pp_space cells."""
+    x, y = cell_centres(nrow, ncol)
+    sel = np.zeros((nrow, ncol), bool)
+    sel[pp_space // 2 :: pp_space, pp_space // 2 :: pp_space] = True
+    return x[sel.ravel()], y[sel.ravel()]
+
+
+def write_gridspec(fname: Path, nrow: int, ncol: int) -> None:
+    """Write a PEST grid specification file."""
+    with open(fname, "w") as f:
+        f.write(f"{nrow} {ncol}\n0.0 {nrow * delta} 0.0\n")
+        f.write(f"{ncol}*{delta}\n{nrow}*{delta}\n")
+
+
+def write_dis_grb(fname: Path, nrow: int, ncol: int) -> None:
+    """Write a MODFLOW 6 DIS binary grid file of nlay layers."""
+    ncpl = nrow * ncol
+    ncells = nlay * ncpl
+    node = np.arange(ncells).reshape(nlay, nrow, ncol)
+    # symmetric connections, including each cell to itself
+    pairs = [
+        (node[:, :, :-1], node[:, :, 1:]),
+        (node[:, :-1], node[:, 1:]),
+        (node[:-1], node[1:]),
+    ]
+    n = np.concatenate([node.ravel()] + [p[i].ravel() for p in pairs for i in (0, 1)])
+    m = np.concatenate([node.ravel()] + [p[i].ravel() for p in pairs for i in (1, 0)])
+    order = np.lexsort((m, n))
+    ja = m[order] + 1
+    ia = np.concatenate([[0], np.cumsum(np.bincount(n, minlength=ncells))]) + 1
+    top = np.full(ncpl, 100.0)
+    botm = np.repeat(100.0 - 10.0 * np.arange(1, nlay + 1), ncpl)
+    defs = [
+        ("NCELLS", ncells),
+        ("NLAY", nlay),
+        ("NROW", nrow),
+        ("NCOL", ncol),
+        ("NJA", len(ja)),
+        ("XORIGIN", 0.0),
+        ("YORIGIN", 0.0),
+        ("ANGROT", 0.0),
+        ("DELR", np.full(ncol, delta)),
+        ("DELC", np.full(nrow, delta)),
+        ("TOP", top),
+        ("BOTM", botm),
+        ("IA", ia),
+        ("JA", ja),
+        ("IDOMAIN", np.ones(ncells, int)),
+        ("ICELLTYPE", np.ones(ncells, int)),
+    ]
+    with open(fname, "wb") as f:
+        for line in ["GRID DIS", "VERSION 1", f"NTXT {len(defs)}", "LENTXT 100"]:
+            f.write(f"{line:<49}\n".encode())
+        for name, value in defs:
+            kind = "DOUBLE" if np.asarray(value).dtype.kind == "f" else "INTEGER"
+            if np.ndim(value) == 0:
+                line = f"{name} {kind} NDIM 0 # {value}"
+            else:
+                line = f"{name} {kind} NDIM 1 {len(value)}"
+            f.write(f"{line:<99}\n".encode())
+        for name, value in defs:
+            dtype = "<f8" if np.asarray(value).dtype.kind == "f" else "<i4"
+            f.write(np.asarray(value, dtype).tobytes())
+
+
+def write_heads(fname: Path, nrow: int, ncol: int, ntime: int) -> None:
+    """Write a MODFLOW 6 head file of nlay layers and ntime times."""
+    head = np.dtype(
+        [
+            ("kstp", "<i4"),
+            ("kper", "<i4"),
+            ("pertim", "<f8"),
+            ("totim", "<f8"),
+            ("text", "S16"),
+            ("ncol", "<i4"),
+            ("nrow", "<i4"),
+            ("ilay", "<i4"),
+        ]
+    )
+    rng = np.random.default_rng(0)
+    with open(fname, "wb") as f:
+        for itime in range(1, ntime + 1):
+            for ilay in range(1, nlay + 1):
+                rec = (1, itime, 1.0, float(itime), b"HEAD".rjust(16), ncol, nrow, ilay)
+                f.write(np.array(rec, head).tobytes())
+                f.write(rng.uniform(50.0, 100.0, nrow * ncol).tobytes())
+
+
+def write_cbc(fname: Path, nrow: int, ncol: int, ntime: int) -> None:
+    """Write a MODFLOW 6 budget file with recharge to the top layer."""
+    ncpl = nrow * ncol
+    rng = np.random.default_rng(0)
+    head1 = np.dtype(
+        [
+            ("kstp", "<i4"),
+            ("kper", "<i4"),
+            ("text", "S16"),
+            ("ndim1", "<i4"),
+            ("ndim2", "<i4"),
+            ("ndim3", "<i4"),
+            ("imeth", "<i4"),
+            ("delt", "<f8"),
+            ("pertim", "<f8"),
+            ("totim", "<f8"),
+            ("txt", "S16", 4),
+            ("ndat", "<i4"),
+            ("nlist", "<i4"),
+        ]
+    )
+    rec = np.dtype([("id1", "<i4"), ("id2", "<i4"), ("q", "<f8")])
+    with open(fname, "wb") as f:
+        for itime in range(1, ntime + 1):
+            txt = [b"MODEL".rjust(16), b"MODEL".rjust(16), b"MODEL".rjust(16)]
+            hdr = (1, itime, b"RCH".rjust(16), ncol, nrow, -nlay, 6, 1.0, 1.0)
+            hdr += (float(itime), txt + [b"RCH-1".rjust(16)], 1, ncpl)
+            f.write(np.array(hdr, head1).tobytes())
+            data = np.empty(ncpl, rec)
+            data["id1"] = data["id2"] = np.arange(1, ncpl + 1)
+            data["q"] = rng.uniform(0.0, 1.0, ncpl)
+            f.write(data.tobytes())
+
+
+def kriging_args_2d(ncells: int) -> tuple:
+    """Arguments of calc_kriging_factors_2d, with pilot points as sources."""
+    nrow, ncol = grid_shape(ncells)
+    x, y = cell_centres(nrow, ncol)
+    ppx, ppy = pilot_points(nrow, ncol)
+    aa = 5.0 * pp_space * delta
+    return (ppx, ppy, 1, x, y, 1, "exp", "ordinary", aa, 1.5, 30.0, 1e30, 20, 1)
+
+
+def kriging_args_3d(ncells: int) -> tuple:
+    """Arguments of calc_kriging_factors_3d, with pilot points as sources."""
+    nrow, ncol = grid_shape(ncells, nlay)
+    x, y = cell_centres(nrow, ncol)
+    ppx, ppy = pilot_points(nrow, ncol)
+    z = np.repeat(-10.0 * np.arange(nlay) - 5.0, len(x))
+    ppz = np.repeat(-10.0 * np.arange(nlay) - 5.0, len(ppx))
+    aa = 5.0 * pp_space * delta
+    return (
+        np.tile(ppx, nlay),
+        np.tile(ppy, nlay),
+        ppz,
+        1,
+        np.tile(x, nlay),
+        np.tile(y, nlay),
+        z,
+        1,
+        1,
+        "ordinary",
+        "exp",
+        aa,
+        aa / 2.0,
+        20.0,
+        30.0,
+        0.0,
+        0.0,
+        1e30,
+        1e30,
+        1e30,
+        20,
+        1,
+    )
+
+
+@case
+def calc_kriging_factors_2d(workdir: Path, ncells: int):
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    lib = PestUtilsLib()
+    args = kriging_args_2d(ncells)
+    return lambda: lib.calc_kriging_factors_2d(*args, workdir / "fac.bin", 0)
+
+
+@case
+def calc_kriging_factors_3d(workdir: Path, ncells: int):
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    lib = PestUtilsLib()
+    args = kriging_args_3d(ncells)
+    return lambda: lib.calc_kriging_factors_3d(*args, workdir / "fac.bin", 0)
+
+
+@case
+def numpy_kriging_factors_2d(workdir: Path, ncells: int):
+    from pypestutils import kriging
+
+    args = kriging_args_2d(ncells)
+    return lambda: kriging.calc_kriging_factors_2d(*args, workdir / "fac.bin", 0)
+
+
+@case
+def numpy_kriging_factors_3d(workdir: Path, ncells: int):
+    from pypestutils import kriging
+
+    args = kriging_args_3d(ncells)
+    return lambda: kriging.calc_kriging_factors_3d(*args, workdir / "fac.bin", 0)
+
+
+@case
+def krige_using_file(workdir: Path, ncells: int):
+    calc_kriging_factors_2d(workdir, ncells)()
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    lib = PestUtilsLib()
+    nrow, ncol = grid_shape(ncells)
+    ppx, _ = pilot_points(nrow, ncol)
+    sourceval = np.random.default_rng(0).uniform(1.0, 10.0, len(ppx))
+    mpts = nrow * ncol
+    args = (workdir / "fac.bin", 0, mpts, "ordinary", "log", sourceval, 1.0, 1.0)
+    return lambda: lib.krige_using_file(*args)
+
+
+@case
+def fieldgen2d_sva(workdir: Path, ncells: int):
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    lib = PestUtilsLib()
+    nrow, ncol = grid_shape(ncells)
+    x, y = cell_centres(nrow, ncol)
+    args = (x, y, delta**2, 1, 1.0, 1.0, 5.0 * delta, 1.5, 30.0, "log", "exp", 1.0, 10)
+
+    def run():
+        lib.initialize_randgen(1)
+        return lib.fieldgen2d_sva(*args)
+
+    return run
+
+
+@case
+def build_covar_matrix_2d(workdir: Path, ncells: int):
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    lib = PestUtilsLib()
+    nrow, ncol = grid_shape(ncells)
+    ppx, ppy = pilot_points(nrow, ncol)
+    aa = 5.0 * pp_space * delta
+    args = (ppx, ppy, 1, "exp", 0.0, aa, 1.0, 1.5, 30.0, len(ppx))
+    return lambda: lib.build_covar_matrix_2d(*args)
+
+
+def _mf6_points(nrow: int, ncol: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Points in every layer, with a point for every pp_space**2 cells."""
+    rng = np.random.default_rng(0)
+    npts = max(nrow * ncol // pp_space**2, 1)
+    # within the cell centres, so that all points are interpolated
+    ecoord = rng.uniform(0.5, ncol - 0.5, npts * nlay) * delta
+    ncoord = rng.uniform(0.5, nrow - 0.5, npts * nlay) * delta
+    return ecoord, ncoord, np.repeat(np.arange(1, nlay + 1), npts)
+
+
+@case
+def calc_mf6_interp_factors(workdir: Path, ncells: int):
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    lib = PestUtilsLib()
+    nrow, ncol = grid_shape(ncells, nlay)
+    write_dis_grb(workdir / "model.dis.grb", nrow, ncol)
+    lib.install_mf6_grid_from_file("grid", workdir / "model.dis.grb")
+    args = ("grid", *_mf6_points(nrow, ncol), workdir / "fac.bin", 0)
+    return lambda: lib.calc_mf6_interp_factors(*args, workdir / "pts.bln")
+
+
+@case
+def interp_from_mf6_depvar_file(workdir: Path, ncells: int):
+    calc_mf6_interp_factors(workdir, ncells)()
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    lib = PestUtilsLib()
+    ntime = 10
+    nrow, ncol = grid_shape(ncells, nlay)
+    write_heads(workdir / "model.hds", nrow, ncol, ntime)
+    npts = len(_mf6_points(nrow, ncol)[0])
+    args = (workdir / "model.hds", workdir / "fac.bin", 0, ntime, "head")
+    return lambda: lib.interp_from_mf6_depvar_file(*args, 1e10, 1, 1e30, npts)
+
+
+@case
+def extract_flows_from_cbc_file(workdir: Path, ncells: int):
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    lib = PestUtilsLib()
+    ntime = 10
+    nrow, ncol = grid_shape(ncells, nlay)
+    write_cbc(workdir / "model.cbc", nrow, ncol, ntime)
+    izone = np.arange(nlay * nrow * ncol) % 10 + 1
+    args = (workdir / "model.cbc", "rch", 31, 2, izone, 10, ntime)
+    return lambda: lib.extract_flows_from_cbc_file(*args)
+
+
+@case
+def get_2d_pp_info_structured_grid(workdir: Path, ncells: int):
+    from pypestutils import helpers
+
+    nrow, ncol = grid_shape(ncells)
+    write_gridspec(workdir / "grid.spc", nrow, ncol)
+
+    def run():
+        helpers.clear_grid_info_cache()
+        return helpers.get_2d_pp_info_structured_grid(pp_space, workdir / "grid.spc")
+
+    return run
+
+
+@case
+def interpolate_with_sva_pilotpoints_2d(workdir: Path, ncells: int):
+    from pypestutils import helpers
+
+    nrow, ncol = grid_shape(ncells)
+    write_gridspec(workdir / "grid.spc", nrow, ncol)
+    ppdf = helpers.get_2d_pp_info_structured_grid(pp_space, workdir / "grid.spc")
+    rng = np.random.default_rng(0)
+    ppdf["value"] = rng.uniform(1.0, 10.0, len(ppdf))
+    ppdf["bearing"] = rng.uniform(0.0, 90.0, len(ppdf))
+    ppdf["aniso"] = rng.uniform(1.0, 3.0, len(ppdf))
+    ppdf["corrlen"] = rng.uniform(3.0, 6.0, len(ppdf)) * pp_space * delta
+
+    def run():
+        helpers.clear_grid_info_cache()
+        return helpers.interpolate_with_sva_pilotpoints_2d(
+            ppdf, workdir / "grid.spc", max_pts=20, verbose=False
+        )
+
+    return run
+
+
+@case
+def interpolate_with_pilotpoints_3d(workdir: Path, ncells: int):
+    import pandas as pd
+
+    from pypestutils import helpers
+
+    nrow, ncol = grid_shape(ncells, nlay)
+    write_dis_grb(workdir / "model.dis.grb", nrow, ncol)
+    ppx, ppy = pilot_points(nrow, ncol)
+    ppdf = pd.DataFrame({"ppname": np.arange(len(ppx)), "x": ppx, "y": ppy})
+    ppdf["value"] = np.random.default_rng(0).uniform(1.0, 10.0, len(ppdf))
+    aa = 5.0 * pp_space * delta
+
+    def run():
+        helpers.clear_grid_info_cache()
+        return helpers.interpolate_with_pilotpoints_3d(
+            ppdf, workdir / "model.dis.grb", ahmax=aa, max_pts=20
+        )
+
+    return run
+
+
+def run_case(name: str, ncells: int, repeat: int) -> dict:
+    """Set up and time a case in this interpreter.
+
+    Parameters
+    ----------
+    name : str
+        Case name.
+    ncells : int
+        Number of grid cells.
+    repeat : int
+        Number of timed calls.
+
+    Returns
+    -------
+    dict
+        Best time in seconds, and peak memory in MB after setup and after
+        the timed calls.
+    """
+    with tempfile.TemporaryDirectory(prefix="pypestutils_bench_") as tmp_dir:
+        func = cases[name](Path(tmp_dir), ncells)
+        setup_peak_mb = peak_memory_mb()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return {
+        "time": min(times),
+        "setup_peak_mb": setup_peak_mb,
+        "peak_mb": peak_memory_mb(),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--case", nargs="*", choices=list(cases), default=list(cases))
+    parser.add_argument(
+        "--size", nargs="*", choices=list(sizes), default=["10k", "100k"]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results to JSON file")
+    parser.add_argument("--compare", help="compare with results in JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="ratio to previous time or peak memory reported as a regression",
+    )
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        name, size = args.child
+        print(json.dumps(run_case(name, sizes[size], args.repeat)))
+        return
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    results = {}
+    regressions = []
+    print(f"{'case':<36} {'size':>5} {'time (s)':>10} {'peak (MB)':>10} {'ratio':>12}")
+    for name in args.case:
+        for size in args.size:
+            key = f"{name}[{size}]"
+            proc = subprocess.run(
+                [sys.executable, __file__, "--child", name, size]
+                + ["--repeat", str(args.repeat)],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                print(
+                    f"{name:<36} {size:>5} failed: {proc.stderr.strip().splitlines()[-1]}"
+                )
+                continue
+            result = results[key] = json.loads(proc.stdout.splitlines()[-1])
+            ratio = ""
+            if key in previous:
+                time_ratio = result["time"] / previous[key]["time"]
+                ratio = f"{time_ratio:.2f}"
+                mem_ratio = None
+                if result["peak_mb"] and previous[key]["peak_mb"]:
+                    mem_ratio = result["peak_mb"] / previous[key]["peak_mb"]
+                    ratio += f"/{mem_ratio:.2f}"
+                # times of a few milliseconds are too noisy to compare
+                slower = result["time"] - previous[key]["time"] > min_time_diff
+                if (slower and time_ratio > args.threshold) or (
+                    mem_ratio or 0.0
+                ) > args.threshold:
+                    regressions.append(key)
+            peak_mb = result["peak_mb"] or float("nan")
+            print(
+                f"{name:<36} {size:>5} {result['time']:10.3f} {peak_mb:10.1f} {ratio:>12}"
+            )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(
+            f"regressions (time/peak ratio > {args.threshold}): {', '.join(regressions)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Measure package import time with ``python -X importtime``.
+
+Each module is imported in a fresh interpreter ``--repeat`` times, and the
+median cumulative import time is reported, followed by the slowest modules
+pulled in by the last run. Usage::
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py pypestutils.helpers --repeat 10
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+default_modules = [
+    "pypestutils",
+    "pypestutils.pestutilslib",
+    "pypestutils.helpers",
+]
+
+_line_re = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Import module in a new interpreter and parse ``-X importtime`` output.
+
+    Parameters
+    ----------
+    module : str
+        Dotted module name to import.
+
+    Returns
+    -------
+    dict
+        Self and cumulative import times in microseconds, keyed by module name.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        match = _line_re.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            times[name] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=default_modules)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+    for module in args.modules:
+        samples = []
+        for _ in range(args.repeat):
+            times = import_times(module)
+            samples.append(times[module][1])
+        median_ms = statistics.median(samples) / 1000.0
+        print(f"{module}: {median_ms:.1f} ms (median of {args.repeat})")
+        slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (self_us, cumulative_us) in slowest[: args.top]:
+            self_ms = self_us / 1000.0
+            cumulative_ms = cumulative_us / 1000.0
+            print(f"  {self_ms:8.1f} ms self {cumulative_ms:8.1f} ms cumulative  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Compare the speed and results of pestutils library build profiles.
+
+Each profile is built with meson in a temporary directory. The test suite's
+driver tests are run with it, which compare results with the ``.std``
+outputs in tests/data, and the outputs of the field generation and
+covariance functions are compared with those of the first profile. Field
+generation must be bitwise equal, and covariance matrices, which a system
+LAPACK may round differently, equal within a relative tolerance of 1e-12.
+The kriging, field generation and covariance cases of ``core.py`` are then
+timed, and the speedup relative to the first profile is reported. The exit
+status is non-zero if driver tests fail, or field generation or covariance
+results differ. Usage::
+
+    python benchmarks/profiles.py
+    python benchmarks/profiles.py --size 100k 1M --repeat 1
+    python benchmarks/profiles.py --profile default \\
+        --profile fast -Dvectorize=true -Dlapack=openblas
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+root = Path(__file__).resolve().parents[1]
+
+default_profiles = {
+    "default": [],
+    "optimised": ["-Dvectorize=true", "-Dmarch=native", "-Dlapack=openblas"],
+}
+# largest relative difference of outputs from those of the first profile;
+# the optimisation options keep IEEE semantics, so field generation is
+# bitwise equal, but a system LAPACK may round dgesvd results differently
+tolerances = {
+    "fieldgen2d_sva": 0.0,
+    "fieldgen3d_sva": 0.0,
+    "build_covar_matrix_2d": 1e-12,
+    "build_covar_matrix_3d": 1e-12,
+}
+default_cases = [
+    "calc_kriging_factors_2d",
+    "calc_kriging_factors_3d",
+    "krige_using_file",
+    "fieldgen2d_sva",
+    "build_covar_matrix_2d",
+]
+
+# computes outputs that have no .std files, written to the file in argv[1]
+outputs_script = """
+import sys
+import numpy as np
+from pypestutils.pestutilslib import PestUtilsLib
+
+lib = PestUtilsLib()
+rng = np.random.default_rng(0)
+x, y = np.meshgrid(np.arange(80.0), np.arange(60.0))
+x, y = x.ravel(), y.ravel()
+z = np.arange(len(x)) % 3 * 1.0
+lib.initialize_randgen(1)
+fieldgen2d = lib.fieldgen2d_sva(
+    x, y, 1.0, 1, 1.0, 1.0, 6.0, 1.5, 30.0, "log", "exp", 1.0, 5
+)
+lib.initialize_randgen(1)
+fieldgen3d = lib.fieldgen3d_sva(
+    x, y, z, 1.0, 1.0, 1, 1.0, 1.0, 6.0, 4.0, 2.0, 30.0, 10.0, 5.0,
+    "none", "spher", 1.0, 5
+)
+# variograms vary between points, so that covariance matrices are made
+# positive definite with dgesvd, from the bundled or a system LAPACK
+ec, nc, zc = rng.uniform(0.0, 80.0, (3, 300))
+aa, anis, bearing = rng.uniform([15.0, 1.0, 0.0], [35.0, 2.0, 90.0], (300, 3)).T
+covar2d = lib.build_covar_matrix_2d(
+    ec, nc, 1, "exp", 0.1, aa, 2.0, anis, bearing, len(ec)
+)
+covar3d = lib.build_covar_matrix_3d(
+    ec, nc, zc, 1, "exp", 0.1, 2.0, aa, aa / anis, aa / 2.0, bearing,
+    0.0, 0.0, len(ec)
+)
+np.savez(
+    sys.argv[1], fieldgen2d_sva=fieldgen2d, fieldgen3d_sva=fieldgen3d,
+    build_covar_matrix_2d=covar2d, build_covar_matrix_3d=covar3d,
+)
+"""
+
+
+def build(name: str, options: list[str], build_root: Path) -> Path | None:
+    """Build a profile, returning the directory with the library."""
+    builddir = build_root / name
+    for cmd in [
+        ["meson", "setup", str(builddir), *options],
+        ["meson", "compile", "-C", str(builddir)],
+    ]:
+        proc = subprocess.run(cmd, cwd=root, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{name}: '{' '.join(cmd)}' failed:\n{proc.stdout[-2000:]}")
+            return None
+    return builddir / "pestutils"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--profile",
+        nargs="+",
+        action="append",
+        metavar=("NAME", "OPTION"),
+        help="profile name and meson options, may be repeated",
+    )
+    parser.add_argument("--case", nargs="*", default=default_cases)
+    parser.add_argument("--size", nargs="*", default=["10k", "100k"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiles = {profile[0]: profile[1:] for profile in args.profile}
+    else:
+        profiles = default_profiles
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(root), env.get("PYTHONPATH", "")])
+    results = {}
+    outputs = {}
+    failed = []
+    with tempfile.TemporaryDirectory(prefix="pypestutils_profiles_") as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        for name, options in profiles.items():
+            libdir = build(name, options, tmp_path)
+            if libdir is None:
+                continue
+            env["PESTUTILS_LIBRARY"] = str(libdir)
+            print(f"{name}: {' '.join(options) or '(no options)'}")
+            proc = subprocess.run(
+                [sys.executable, "-m", "pytest", "-q", "-rfE", "-p", "no:cacheprovider"]
+                + ["tests/test_drivers.py"],
+                cwd=root,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            lines = proc.stdout.strip().splitlines() or [proc.stderr.strip()]
+            print(f"  driver tests (.std outputs): {lines[-1]}")
+            if proc.returncode != 0:
+                # the short test summary of failed tests and errors
+                for line in lines:
+                    if line.startswith(("FAILED", "ERROR")):
+                        print(f"    {line}")
+                failed.append(f"{name} driver tests")
+            fname = tmp_path / f"{name}.npz"
+            subprocess.run(
+                [sys.executable, "-c", outputs_script, str(fname)],
+                env=env,
+                check=True,
+                capture_output=True,
+            )
+            with np.load(fname) as data:
+                outputs[name] = dict(data)
+            first = next(iter(outputs))
+            for key, value in outputs[name].items():
+                expected = outputs[first][key]
+                diff = np.abs(value - expected).max() / np.abs(expected).max()
+                status = "ok"
+                if not diff <= tolerances[key]:
+                    status = f"FAILED, tolerance {tolerances[key]:.0e}"
+                    failed.append(f"{name} {key}")
+                print(
+                    f"  {key}: max relative difference from {first} {diff:.1e} "
+                    f"({status})"
+                )
+            fname = tmp_path / f"{name}.json"
+            subprocess.run(
+                [sys.executable, str(root / "benchmarks" / "core.py"), "--case"]
+                + args.case
+                + ["--size", *args.size, "--repeat", str(args.repeat)]
+                + ["--output", str(fname)],
+                env=env,
+            )
+            with open(fname) as f:
+                results[name] = json.load(f)
+    if not results:
+        sys.exit(1)
+    names = list(results)
+    first = names[0]
+    print()
+    header = f"{'time (s)':<40}" + "".join(f"{name:>12}" for name in names)
+    print(header + "".join(f"{'speedup ' + name:>20}" for name in names[1:]))
+    for key, result in results[first].items():
+        times = [results[name].get(key, {}).get("time", np.nan) for name in names]
+        line = f"{key:<40}" + "".join(f"{time:12.3f}" for time in times)
+        line += "".join(f"{result['time'] / time:20.2f}" for time in times[1:])
+        print(line)
+    if failed:
+        print(f"\nresults differ: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1061,6 +1061,560 @@ end function interp_from_structured_grid
 
 
 
+integer (kind=c_int) function calc_structured_interp_factors(                &
+                             gridname,npts,ecoord,ncoord,layer,              &
+                             factorfile,factorfiletype,interp_success)       &
+                 bind(c,name="calc_structured_interp_factors")
+
+! -- This function calculates interpolation factors from an installed structured grid
+!    to a set of points, and records them in a file. Interpolation from a dependent
+!    variable file can then be undertaken using function
+!    interp_from_structured_grid_using_factors().
+
+       use iso_c_binding, only: c_int,c_double,c_char
+       use dimvar
+       use deftypes
+       use utilities
+       use high_level_utilities
+       implicit none
+
+       character (kind=c_char), intent(in)  :: gridname(LENGRIDNAME)      ! name of installed structured grid
+       integer(kind=c_int), intent(in)      :: npts                       ! number of points for which interpolation required
+       real(kind=c_double), intent(in)      :: ecoord(npts),ncoord(npts)  ! eastings and northing of points
+       integer(kind=c_int), intent(in)      :: layer(npts)                ! layers of points
+       character (kind=c_char), intent(in)  :: factorfile(LENFILENAME)    ! name of factor file
+       integer(kind=c_int), intent(in)      :: factorfiletype             ! 0=binary; 1=text
+       integer(kind=c_int), intent(out)     :: interp_success(npts)       ! 1=success; 0=failure
+
+       integer                        :: outunit,ierr,ipts,igrid
+       integer                        :: ncol,nrow,nlay
+       integer                        :: icellno,jcellno
+       double precision               :: fac1,fac2,fac3,fac4
+       character (len=LENGRIDNAME)    :: chargridname
+       character (len=LENFILENAME)    :: outfile
+
+! -- Initialisation
+
+       calc_structured_interp_factors=0
+       function_name='calc_structured_interp_factors()'
+       interp_success=0         ! an array
+       outunit=0
+
+! -- Character arrays are translated to character variables.
+
+       call utl_string2char(LENGRIDNAME,gridname,chargridname)
+       chargridname=adjustl(chargridname)
+       call utl_casetrans(chargridname,'lo')
+       call utl_string2char(LENFILENAME,factorfile,outfile)
+       outfile=adjustl(outfile)
+
+! -- We check for errors in input arguments.
+
+       if(npts.le.0)then
+         write(amessage,110) 'NPTS'
+110      format(a,' argument must be positive.')
+         go to 9890
+       end if
+       if(chargridname.eq.' ')then
+         write(amessage,130) 'GRIDNAME'
+130      format(a,' argument must not be an empty string.')
+         go to 9890
+       end if
+       if(outfile.eq.' ')then
+         write(amessage,130) 'FACTORFILE'
+         go to 9890
+       end if
+       if((factorfiletype.ne.0).and.(factorfiletype.ne.1))then
+         write(amessage,135) trim(function_name)
+135      format('The FACTORFILETYPE argument of function ',a,' must be supplied as 0 or 1.')
+         go to 9890
+       end if
+
+! -- Identify the grid.
+
+       do igrid=1,MAXSTRUCMODGRID
+         if(strucmodgrid(igrid)%name.eq.chargridname) go to 150
+       end do
+       write(amessage,140) trim(chargridname)
+140    format('"',a,'" is not an installed grid.')
+       go to 9890
+150    continue
+       nrow=strucmodgrid(igrid)%nrow
+       ncol=strucmodgrid(igrid)%ncol
+       nlay=strucmodgrid(igrid)%nlay
+       if(any(layer.le.0))then
+         write(amessage,160)
+160      format('At least one element of the LAYER array argument is zero or less.')
+         go to 9890
+       end if
+       if(any(layer.gt.nlay))then
+         write(amessage,170) trim(chargridname)
+170      format('At least one element of the LAYER array argument has a value that is ',  &
+         'greater than NLAY for structured grid "',a,'".')
+         go to 9890
+       end if
+
+! -- The factor file is opened.
+
+       call utl_addquote(outfile,afile1)
+       outunit=utl_nextunit()
+       if(factorfiletype.eq.0)then
+         open(unit=outunit,file=outfile,form='unformatted',access='stream',   &
+         action='write',iostat=ierr)
+       else
+         open(unit=outunit,file=outfile,action='write',iostat=ierr)
+       end if
+       if(ierr.ne.0)then
+         write(amessage,190) trim(afile1)
+190      format('Cannot write to file ',a,'.')
+         go to 9890
+       end if
+
+! -- Record data at the top of the file.
+
+       if(factorfiletype.eq.0)then
+         write(outunit,err=9300) npts,ncol,nrow,nlay
+         do ipts=1,npts
+           write(outunit,err=9300) ecoord(ipts),ncoord(ipts),layer(ipts)
+         end do
+       else
+         write(outunit,220,err=9300) npts,ncol,nrow,nlay
+220      format(4i10)
+         do ipts=1,npts
+           write(outunit,230,err=9300) ecoord(ipts),ncoord(ipts),layer(ipts)
+230        format(2(' ',1pg23.16),1x,i10)
+         end do
+       end if
+
+! -- Calculate and record interpolation factors.
+
+       do ipts=1,npts
+         call uth_strucfactors(igrid,ecoord(ipts),ncoord(ipts),fac1,fac2,  &
+         fac3,fac4,icellno,jcellno)
+         if(icellno.ne.-999)then
+           interp_success(ipts)=1
+         else
+           jcellno=0
+           fac1=0.0d0
+           fac2=0.0d0
+           fac3=0.0d0
+           fac4=0.0d0
+         end if
+         if(factorfiletype.eq.0)then
+           write(outunit,err=9300) icellno,jcellno,fac1,fac2,fac3,fac4
+         else
+           write(outunit,240,err=9300) icellno,jcellno,fac1,fac2,fac3,fac4
+240        format(2i10,4(' ',1pg23.16))
+         end if
+       end do
+       if(all(interp_success.eq.0)) then
+         write(amessage,250) trim(strucmodgrid(igrid)%name)
+250      format('None of the user-supplied points are within the bounds of ',    &
+         'the "',a,'" structured grid.')
+         go to 9890
+       end if
+       go to 9900
+
+9300   write(amessage,9310) trim(afile1)
+9310   format('Error writing to file ',a,'.')
+       go to 9890
+
+9890   continue
+       calc_structured_interp_factors=1
+
+9900   continue
+       if(outunit.ne.0) close(unit=outunit,iostat=ierr)
+
+       return
+
+end function calc_structured_interp_factors
+
+
+
+integer (kind=c_int) function interp_from_structured_grid_using_factors(     &
+                             depvarfile,factorfile,factorfiletype,           &
+                             isim,iprec,ntime,                               &
+                             vartype,interpthresh,nointerpval,               &
+                             npts,nproctime,simtime,simstate)                &
+                 bind(c,name="interp_from_structured_grid_using_factors")
+
+! -- This function performs spatial interpolation from a structured grid to a set of points
+!    using factors previously calculated by function calc_structured_interp_factors().
+
+       use iso_c_binding, only: c_int,c_double,c_char
+       use dimvar
+       use utilities
+       use high_level_utilities
+       implicit none
+
+       character (kind=c_char), intent(in)  :: depvarfile(LENFILENAME)    ! name of binary file to read
+       character (kind=c_char), intent(in)  :: factorfile(LENFILENAME)    ! name of factor file
+       integer(kind=c_int), intent(in)      :: factorfiletype             ! 0 for binary; 1 for ascii
+       integer(kind=c_int), intent(in)      :: isim                       ! -1 for MT3D; 1 for MODFLOW
+       integer(kind=c_int), intent(in)      :: iprec                      ! 1 for single; 2 for double
+       integer(kind=c_int), intent(in)      :: ntime                      ! number of output times
+       character (kind=c_char), intent(in)  :: vartype(17)                ! only read arrays of this type
+       real(kind=c_double), intent(in)      :: interpthresh               ! abs threshold for dry or inactive
+       real(kind=c_double), intent(in)      :: nointerpval                ! no-interpolation-possible value
+       integer(kind=c_int), intent(in)      :: npts                       ! number of points for which interpolation required
+       integer(kind=c_int), intent(out)     :: nproctime                  ! number of processed simulation times
+       real(kind=c_double), intent(out)     :: simtime(ntime)             ! simulation time
+       real(kind=c_double), intent(out)     :: simstate(ntime,npts)       ! interpolated system state
+
+       integer                        :: kstp,kper,ntrans,kstpold,kperold,ntransold
+       integer                        :: inunit,facunit,ierr,ipts
+       integer                        :: mpts,ncol,nrow,icol,irow,nlay
+       integer                        :: iarray,itime,mcol,mrow,ilay,ibig,icount
+       real                           :: rinterpthresh,rgt_thresh,pertim,totim
+       double precision               :: gt_thresh,dtemp
+       double precision               :: dpertim,dtotim
+       character (len=10)             :: alay
+       character (len=16)             :: atext,text
+       character (len=LENFILENAME)    :: infile,facfile
+
+! -- Allocatable data objects.
+
+       integer, allocatable           :: layer(:),icellno(:),jcellno(:)
+       real, allocatable              :: rarray(:,:)
+       double precision, allocatable  :: darray(:,:)
+       double precision, allocatable  :: fac1(:),fac2(:),fac3(:),fac4(:)
+
+! -- Initialisation
+
+       interp_from_structured_grid_using_factors=0
+       function_name='interp_from_structured_grid_using_factors()'
+       simtime=nointerpval      ! default output value
+       simstate=nointerpval     ! an array
+       inunit=0
+       facunit=0
+       kstpold=-99999999
+       kperold=-99999999
+       ntransold=-99999999
+       kstp=kstpold
+       kper=kperold
+       ntrans=ntransold
+       nproctime=0
+       icount=0
+       ibig=huge(ibig)/2                   ! arbitrary
+
+! -- Character arrays are translated to character variables.
+
+       call utl_string2char(LENFILENAME,depvarfile,infile)
+       infile=adjustl(infile)
+       call utl_string2char(LENFILENAME,factorfile,facfile)
+       facfile=adjustl(facfile)
+       call utl_string2char(17,vartype,atext)
+       atext=adjustl(atext)
+       call utl_casetrans(atext,'lo')
+
+! -- We check for errors in input arguments.
+
+       if((isim.ne.1).and.(isim.ne.-1))then
+         write(amessage,90)
+90       format('ISIM argument must be supplied as -1 (MT3D) or +1 (MODFLOW).')
+         go to 9890
+       end if
+       if((iprec.ne.1).and.(iprec.ne.2))then
+         write(amessage,100)
+100      format('IPREC argument must be supplied as 1 (single) or 2 (double).')
+         go to 9890
+       end if
+       if(ntime.le.0)then
+         write(amessage,110) 'NTIME'
+110      format(a,' argument must be positive.')
+         go to 9890
+       end if
+       if(npts.le.0)then
+         write(amessage,110) 'NPTS'
+         go to 9890
+       end if
+       if(infile.eq.' ')then
+         write(amessage,130) 'DEPVARFILE'
+130      format(a,' argument must not be an empty string.')
+         go to 9890
+       end if
+       if(facfile.eq.' ')then
+         write(amessage,130) 'FACTORFILE'
+         go to 9890
+       end if
+       if((factorfiletype.ne.0).and.(factorfiletype.ne.1))then
+         write(amessage,135) trim(function_name)
+135      format('The FACTORFILETYPE argument of function ',a,' must be supplied as 0 or 1.')
+         go to 9890
+       end if
+       if(iprec.eq.1)then
+         if(interpthresh.gt.huge(rinterpthresh)-2.0*spacing(huge(rinterpthresh)))then
+           write(amessage,136)
+136        format('Value supplied for INTERPTHRESH argument is greater ',  &
+           'than single precision allows.')
+           go to 9890
+         end if
+         rinterpthresh=min(huge(rinterpthresh)-2.0*spacing(huge(rinterpthresh)),real(interpthresh))
+       end if
+
+! -- Open the factor file.
+
+       call utl_addquote(facfile,afile2)
+       facunit=utl_nextunit()
+       if(factorfiletype.eq.0)then
+         open(unit=facunit,file=facfile,status='old',form='unformatted',access='stream',iostat=ierr)
+         if(ierr.ne.0) then
+           write(amessage,140) trim(afile2)
+140        format('Cannot open binary interpolation factor file ',a,'.')
+           go to 9890
+         end if
+       else
+         open(unit=facunit,file=facfile,status='old',iostat=ierr)
+         if(ierr.ne.0) then
+           write(amessage,145) trim(afile2)
+145        format('Cannot open ASCII interpolation factor file ',a,'.')
+           go to 9890
+         end if
+       end if
+
+! -- Read the header of the factor file.
+
+       if(factorfiletype.eq.0)then
+         read(facunit,err=9100,end=9100) mpts,ncol,nrow,nlay
+       else
+         read(facunit,*,err=9100,end=9100) mpts,ncol,nrow,nlay
+       end if
+       if(mpts.ne.npts)then
+         write(amessage,150) trim(afile2)
+150      format('The value for NPTS recorded in the header to file ',a,' does not ', &
+         'agree with the value of the user-supplied NPTS function argument.')
+         go to 9890
+       end if
+       if((ncol.le.0).or.(nrow.le.0).or.(nlay.le.0))then
+         write(amessage,155) trim(afile2)
+155      format('The header to interpolation factor file ',a,' does not make sense.')
+         go to 9890
+       end if
+
+! -- Allocate memory
+
+       if(iprec.eq.1)then
+         allocate(rarray(0:ncol+1,0:nrow+1),stat=ierr)
+         if(ierr.ne.0) go to 9200
+       else
+         allocate(darray(0:ncol+1,0:nrow+1),stat=ierr)
+         if(ierr.ne.0) go to 9200
+       end if
+       allocate(layer(npts),icellno(npts),jcellno(npts),stat=ierr)
+       if(ierr.ne.0) go to 9200
+       allocate(fac1(npts),fac2(npts),fac3(npts),fac4(npts),stat=ierr)
+       if(ierr.ne.0) go to 9200
+
+! -- Read point layers and interpolation factors.
+
+       if(factorfiletype.eq.0)then
+         do ipts=1,npts
+           read(facunit,err=9100,end=9100) dtemp,dtemp,layer(ipts)
+         end do
+         do ipts=1,npts
+           read(facunit,err=9100,end=9100) icellno(ipts),jcellno(ipts),  &
+           fac1(ipts),fac2(ipts),fac3(ipts),fac4(ipts)
+         end do
+       else
+         do ipts=1,npts
+           read(facunit,*,err=9100,end=9100) dtemp,dtemp,layer(ipts)
+         end do
+         do ipts=1,npts
+           read(facunit,*,err=9100,end=9100) icellno(ipts),jcellno(ipts),  &
+           fac1(ipts),fac2(ipts),fac3(ipts),fac4(ipts)
+         end do
+       end if
+       close(unit=facunit)
+       facunit=0
+
+! -- Open the system state file.
+
+       call utl_addquote(infile,afile1)
+       inunit=utl_nextunit()
+       open(unit=inunit,file=infile,status='old',form='unformatted',access='stream',iostat=ierr)
+       if(ierr.ne.0) then
+         write(amessage,160) trim(afile1)
+160      format('Cannot open binary simulator output file ',a,'.')
+         go to 9890
+       end if
+
+! -- Pre-fill the cells of the array that are not in the model grid.
+
+       if(iprec.eq.1)then
+         rgt_thresh=rinterpthresh+2.0*(spacing(rinterpthresh))
+         rarray(0,:)=rgt_thresh
+         rarray(ncol+1,:)=rgt_thresh
+         rarray(:,0)=rgt_thresh
+         rarray(:,nrow+1)=rgt_thresh
+       else
+         gt_thresh=interpthresh+2.0d0*spacing(interpthresh)
+         darray(0,:)=gt_thresh
+         darray(ncol+1,:)=gt_thresh
+         darray(:,0)=gt_thresh
+         darray(:,nrow+1)=gt_thresh
+       end if
+
+! -- Read the input file
+
+       iarray=0
+       itime=0
+       read_an_array: do
+         iarray=iarray+1
+         mrow=0
+         mcol=0
+         if(isim.eq.1)then
+           if(iprec.eq.1)then
+             read(inunit,err=9000,end=1000) kstp,kper,pertim,totim, &
+             text,mcol,mrow,ilay
+           else
+             read(inunit,err=9000,end=1000) kstp,kper,dpertim,dtotim, &
+             text,mcol,mrow,ilay
+           end if
+         else if(isim.eq.-1)then
+           if(iprec.eq.1)then
+             read(inunit,err=9000,end=1000) ntrans,kstp,kper,&
+             totim,text,mcol,mrow,ilay
+           else
+             read(inunit,err=9000,end=1000) ntrans,kstp,kper,&
+             dtotim,text,mcol,mrow,ilay
+           end if
+         end if
+         if((mrow.lt.1).or.(mcol.lt.1).or.(ilay.lt.1).or.               &
+            (mrow.gt.ibig).or.(mcol.gt.ibig).or.(ilay.gt.ibig))then
+            write(amessage,180) trim(afile1)
+180         format('An array header in file ',a,' does not make sense. Is this ', &
+            'file being read using the correct precision?')
+            go to 9890
+          end if
+         if((mrow.ne.nrow).or.(mcol.ne.ncol))then
+           write(amessage,185) trim(afile2),trim(afile1)
+185        format('There is a NCOL or NROW mismatch between interpolation factor ',  &
+           'file ',a,' and arrays in file ',a,'. Alternatively this file is ', &
+           'being read using the wrong precision.')
+           go to 9890
+         end if
+         if(ilay.gt.nlay)then
+           call utl_num2char(ilay,alay)
+           write(amessage,190) trim(afile1),trim(alay),trim(afile2)
+190        format('An array in file ',a,' pertains to layer number ',a,'. This is ', &
+           'larger than the number of layers recorded in interpolation factor file ',a,'.')
+           go to 9890
+         end if
+         text=adjustl(text)
+         call utl_casetrans(text,'lo')
+         if(iarray.ne.1)then
+           if((kstp.ne.kstpold).or.(ntrans.ne.ntransold).or. &
+             (kper.ne.kperold)) then
+             itime=itime+1
+             if(itime.gt.ntime) then
+               itime=itime-1
+               go to 1000
+             end if
+             if(iprec.eq.1)then
+               simtime(itime)=totim
+             else
+               simtime(itime)=dtotim
+             end if
+           end if
+         else
+           itime=itime+1
+           if(iprec.eq.1)then
+             simtime(itime)=totim
+           else
+             simtime(itime)=dtotim
+           end if
+         end if
+         if(iprec.eq.1)then
+           read(inunit,err=9000,end=9050) ((rarray(icol,irow),icol=1,ncol), &
+           irow=1,nrow)
+           darray=rarray      ! arrays
+         else
+           read(inunit,err=9000,end=9050) ((darray(icol,irow),icol=1,ncol), &
+           irow=1,nrow)
+         end if
+         kstpold=kstp
+         kperold=kper
+         ntransold=ntrans
+         if(index(text,trim(atext)).ne.0)then
+           icount=icount+1
+           do ipts=1,npts
+             if(layer(ipts).eq.ilay) then
+                call uth_point_interp(ncol,nrow,interpthresh,nointerpval,fac1(ipts),    &
+                fac2(ipts),fac3(ipts),fac4(ipts),icellno(ipts),jcellno(ipts),           &
+                simstate(itime,ipts),darray)
+             end if
+           end do
+         end if
+       end do read_an_array
+1000   if(iarray.eq.1) then
+         write(amessage,1010) trim(afile1)
+1010     format('No arrays were found in file ',a,'.')
+         go to 9890
+       end if
+       nproctime=itime
+       if(icount.eq.0)then
+         write(amessage,1020) trim(atext),trim(afile1)
+1020     format('No "',a,'" arrays found in file ',a,'.')
+         go to 9890
+       end if
+       go to 9900
+
+9000   continue
+       if(isim.eq.-1)then
+         write(amessage,9010) 'MT3D',trim(afile1)
+       else
+         write(amessage,9010) 'MODFLOW',trim(afile1)
+       end if
+9010   format('An error was encountered in reading ',a,' binary output file ',a,'.')
+       go to 9890
+
+9050   continue
+       if(isim.eq.-1)then
+         write(amessage,9060) 'MT3D',trim(afile1)
+       else
+         write(amessage,9060) 'MODFLOW',trim(afile1)
+       end if
+9060   format('An unexpected end was encountered when reading ',a,    &
+       ' binary output file ',a,'.')
+       go to 9890
+
+9100   write(amessage,9110) trim(afile2)
+9110   format('Error reading interpolation factor file ',a,'.')
+       go to 9890
+
+9200   write(amessage,9210) trim(function_name)
+9210   format('Memory allocation error in call to function ',a,'.')
+       go to 9890
+
+9890   continue
+       interp_from_structured_grid_using_factors=1
+
+9900   continue
+
+! -- Tidy up
+
+       if(inunit.ne.0)then
+         close(unit=inunit,iostat=ierr)
+       end if
+       if(facunit.ne.0)then
+         close(unit=facunit,iostat=ierr)
+       end if
+       if(allocated(rarray))deallocate(rarray,stat=ierr)
+       if(allocated(darray))deallocate(darray,stat=ierr)
+       if(allocated(layer))deallocate(layer,stat=ierr)
+       if(allocated(icellno))deallocate(icellno,stat=ierr)
+       if(allocated(jcellno))deallocate(jcellno,stat=ierr)
+       if(allocated(fac1))deallocate(fac1,stat=ierr)
+       if(allocated(fac2))deallocate(fac2,stat=ierr)
+       if(allocated(fac3))deallocate(fac3,stat=ierr)
+       if(allocated(fac4))deallocate(fac4,stat=ierr)
+
+       return
+
+end function interp_from_structured_grid_using_factors
+
+
+
 integer (kind=c_int) function interp_to_obstime(                               &
                              nsimtime,nproctime,npts,simtime,simval,           &
                              interpthresh,how_extrap,time_extrap,nointerpval,  &
@@ -2509,6 +3063,7 @@ integer (kind=c_int) function interp_from_mf6_depvar_file(             &
 ! -- The dependent variable file is read.
 
        itime=0
+       call utl_progress_start(ntime)
        do
          if(distype.eq.1)then
            read(dvunit,err=9100,end=500) kstp,kper,dpertim,dtotim,text,mcol,mrow,mlay
@@ -2524,6 +3079,7 @@ integer (kind=c_int) function interp_from_mf6_depvar_file(             &
            if(index(textold,trim(atext)).ne.0) then
              itime=itime+1
              if(itime.gt.ntime) go to 500
+             if(utl_progress_step().ne.0) go to 9400
              simtime(itime)=dtotimold
              do ipts=1,npts
                if(ncell(ipts).gt.0)then
@@ -2560,6 +3116,7 @@ integer (kind=c_int) function interp_from_mf6_depvar_file(             &
        if(index(textold,trim(atext)).ne.0) then
          if(itime+1.le.ntime) then
            itime=itime+1
+           if(utl_progress_step().ne.0) go to 9400
            simtime(itime)=dtotimold
            do ipts=1,npts
              if(ncell(ipts).gt.0)then
@@ -2623,6 +3180,10 @@ integer (kind=c_int) function interp_from_mf6_depvar_file(             &
        'are recorded in file ',a,'.')
        go to 9890
 
+9400   write(amessage,9410) trim(function_name)
+9410   format('Function ',a,' was cancelled by the progress callback.')
+       go to 9890
+
 9890   continue
        interp_from_mf6_depvar_file=1
 
@@ -2823,6 +3384,7 @@ integer (kind=c_int) function extract_flows_from_cbc_file(     &
 
 ! -- Progress through the budget file.
 
+       call utl_progress_start(ntime)
        do
          if(nproctime+1.gt.ntime) go to 1000
          read(inunit,err=9000,end=1000) kstp,kper,text,ndim1,ndim2,ndim3
@@ -2867,6 +3429,7 @@ integer (kind=c_int) function extract_flows_from_cbc_file(     &
                end if
              end if
              nproctime=nproctime+1
+             if(utl_progress_step().ne.0) go to 9600
              timestep(nproctime)=kstp
              stressperiod(nproctime)=kper
              simtime(nproctime)=-1.0d0
@@ -2928,6 +3491,7 @@ integer (kind=c_int) function extract_flows_from_cbc_file(     &
            end if
            if(iflag.ne.0)then
              nproctime=nproctime+1
+             if(utl_progress_step().ne.0) go to 9600
              timestep(nproctime)=kstp
              stressperiod(nproctime)=kper
              simtime(nproctime)=dtotim
@@ -3427,6 +3991,10 @@ integer (kind=c_int) function extract_flows_from_cbc_file(     &
        'with IMETH=6 array reading option.')
        go to 9890
 
+9600   write(amessage,9610) trim(function_name)
+9610   format('Function ',a,' was cancelled by the progress callback.')
+       go to 9890
+
 9890   continue
        extract_flows_from_cbc_file=1
        nproctime=0
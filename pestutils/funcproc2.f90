@@ -280,6 +280,7 @@ integer (kind=c_int) function calc_kriging_factors_2d(npts,ecs,ncs,zns,     &
 ! -- The zone loop starts here
 
        icount_interp=0
+       call utl_progress_start(count(znt.ne.0))
        zones: do izone=1,numzone
          iizone=zone(izone)
 
@@ -300,6 +301,7 @@ integer (kind=c_int) function calc_kriging_factors_2d(npts,ecs,ncs,zns,     &
 
          targpoints: do ipt=1,mpts
            if(znt(ipt).eq.iizone)then
+             if(utl_progress_step().ne.0) go to 9300
              icount_interp=icount_interp+1
              dummy_rvector3(1)=ect(ipt)-xmin
              dummy_rvector4(1)=nct(ipt)-ymin
@@ -352,6 +354,10 @@ integer (kind=c_int) function calc_kriging_factors_2d(npts,ecs,ncs,zns,     &
 9210   format('Memory allocation error in function ',a,'.')
        go to 9890
 
+9300   write(amessage,9310) trim(function_name)
+9310   format('Function ',a,' was cancelled by the progress callback.')
+       go to 9890
+
 9890   calc_kriging_factors_2d=1
        icount_interp=0
 
@@ -625,6 +631,7 @@ integer (kind=c_int) function calc_kriging_factors_auto_2d(npts,ecs,ncs,zns,  &
 ! -- The zone loop starts here
 
        icount_interp=0
+       call utl_progress_start(count(znt.ne.0))
        zones: do izone=1,numzone
          iizone=zone(izone)
 
@@ -689,6 +696,7 @@ integer (kind=c_int) function calc_kriging_factors_auto_2d(npts,ecs,ncs,zns,  &
 
          targpoints: do ipt=1,mpts
            if(znt(ipt).eq.iizone)then
+             if(utl_progress_step().ne.0) go to 9300
 
 ! -- For each point to which we must interpolate we assign the variogram range a value as
 !    equal to either the distance to the closest pilot point or weighted average of inter-point
@@ -776,6 +784,10 @@ integer (kind=c_int) function calc_kriging_factors_auto_2d(npts,ecs,ncs,zns,  &
 9210   format('Memory allocation error in function ',a,'.')
        go to 9890
 
+9300   write(amessage,9310) trim(function_name)
+9310   format('Function ',a,' was cancelled by the progress callback.')
+       go to 9890
+
 9890   calc_kriging_factors_auto_2d=1
        icount_interp=0
 
@@ -1167,6 +1179,7 @@ integer (kind=c_int) function calc_kriging_factors_3d(            &
 ! -- The zone loop starts here
 
        icount_interp=0
+       call utl_progress_start(count(znt.ne.0))
        zones: do izone=1,nzone
          iizone=zonenum(izone)
          if(iizone.eq.0) cycle
@@ -1244,6 +1257,7 @@ integer (kind=c_int) function calc_kriging_factors_3d(            &
          mmpts,nnpts,ivector1,ivector2,rvector1,rvector2,rvector3,               &
          factorfile,aoutfile,iunit,pmx,                                          &
          ncol_range,nrow_range,emin,emax,nmin,nmax,elevmin,elevmax,af1,af2)
+         if(progress_cancelled) go to 9300
          if(unestimated.ne.0)then
            call utl_num2char(unestimated,anum)
            write(amessage,300) trim(anum)
@@ -1290,6 +1304,10 @@ integer (kind=c_int) function calc_kriging_factors_3d(            &
        go to 9890
 
 
+9300   write(amessage,9310) trim(function_name)
+9310   format('Function ',a,' was cancelled by the progress callback.')
+       go to 9890
+
 9890   calc_kriging_factors_3d=1
        icount_interp=0
 
@@ -2187,6 +2205,9 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
        integer                       :: inside,m
        integer                       :: minsector,ielem1,ielem2
        integer                       :: structtype
+       integer                       :: i_zero,k,nseg,iseg,ipass
+       integer                       :: ncol,nrow,icell,icol,irow,icol1,icol2,irow1,irow2
+       integer, allocatable          :: cellstart(:),cellnext(:),cellseg(:)
 
        real                          :: r_zero
        double precision              :: xx,yy
@@ -2194,6 +2215,7 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
        double precision              :: cw1,cw2,cw
        double precision              :: alp1,alp2,alp,dist_no_inform,gg,recip_alpha
        double precision              :: sum,dtemp2,dtemp,dtemp1
+       double precision              :: buffer,xmin,xmax,ymin,ymax,delx,dely
 
        character (len=LENFACCODE)    :: acode
        character (len=10)            :: anum
@@ -2207,6 +2229,7 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
        iunit=0
        i_one=1
        i_two=2
+       i_zero=0
        r_zero=0.0
        icount_interp=0
 
@@ -2410,6 +2433,69 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
            ivector1(numinlist1)=istart1
          end if
 
+! -- Target points that are further from the structure than the greatest distance at which
+!    any of its vertices has influence receive a blending factor of zero. Segments are
+!    registered in the cells of a uniform grid that their bounding boxes overlap, after these
+!    are expanded by this distance. Only segments registered in the cell that holds a target
+!    point are then searched for the segment that is closest to it.
+
+         buffer=0.0d0
+         do ipt=istart1,iend1
+           dtemp=conwidth(ipt)*0.5+aa(ipt)*sqrt(-log(1.0d-30))
+           if(dtemp.gt.buffer)buffer=dtemp
+         end do
+         xmin=minval(dvector1(1:numinlist1))
+         xmax=maxval(dvector1(1:numinlist1))
+         ymin=minval(dvector2(1:numinlist1))
+         ymax=maxval(dvector2(1:numinlist1))
+         buffer=buffer+1.0d-9*(buffer+(xmax-xmin)+(ymax-ymin))    ! allows for roundoff
+         nseg=numinlist1-1
+         ncol=max(1,nint(sqrt(dble(nseg))))
+         nrow=ncol
+         if(buffer.gt.0.0d0)then
+           ncol=max(1,min(ncol,int((xmax-xmin)/buffer)))          ! cells are no smaller than the buffer
+           nrow=max(1,min(nrow,int((ymax-ymin)/buffer)))
+         end if
+         xmin=xmin-buffer
+         xmax=xmax+buffer
+         ymin=ymin-buffer
+         ymax=ymax+buffer
+         delx=(xmax-xmin)/ncol
+         dely=(ymax-ymin)/nrow
+         if(delx.le.0.0d0)delx=1.0d0
+         if(dely.le.0.0d0)dely=1.0d0
+         allocate(cellstart(ncol*nrow+1),cellnext(ncol*nrow),stat=ierr)
+         if(ierr.ne.0) go to 9200
+         cellstart=0
+         do ipass=1,2
+           do iseg=1,nseg
+             icol1=min(ncol,max(1,int((min(dvector1(iseg),dvector1(iseg+1))-buffer-xmin)/delx)+1))
+             icol2=min(ncol,max(1,int((max(dvector1(iseg),dvector1(iseg+1))+buffer-xmin)/delx)+1))
+             irow1=min(nrow,max(1,int((min(dvector2(iseg),dvector2(iseg+1))-buffer-ymin)/dely)+1))
+             irow2=min(nrow,max(1,int((max(dvector2(iseg),dvector2(iseg+1))+buffer-ymin)/dely)+1))
+             do irow=irow1,irow2
+               do icol=icol1,icol2
+                 icell=(irow-1)*ncol+icol
+                 if(ipass.eq.1)then
+                   cellstart(icell+1)=cellstart(icell+1)+1
+                 else
+                   cellseg(cellnext(icell))=iseg
+                   cellnext(icell)=cellnext(icell)+1
+                 end if
+               end do
+             end do
+           end do
+           if(ipass.eq.1)then
+             cellstart(1)=1
+             do icell=1,ncol*nrow
+               cellstart(icell+1)=cellstart(icell+1)+cellstart(icell)
+               cellnext(icell)=cellstart(icell)
+             end do
+             allocate(cellseg(cellstart(ncol*nrow+1)-1),stat=ierr)
+             if(ierr.ne.0) go to 9200
+           end if
+         end do
+
 ! -- The work is now done.
 
          do ipt=1,mpts
@@ -2419,16 +2505,29 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
 
 ! -- Is the target point inside the polygon?
 
+             if((xx.lt.xmin).or.(xx.gt.xmax).or.(yy.lt.ymin).or.(yy.gt.ymax))then
+               gg=0.0d0
+               go to 300
+             end if
              inside=-1
              if(structtype.eq.2)then
-               call utl_locpt(xx,yy,dvector1,dvector2,numinlist1,inside,m)
+               if((xx.ge.xmin+buffer).and.(xx.le.xmax-buffer).and.      &
+                  (yy.ge.ymin+buffer).and.(yy.le.ymax-buffer))then
+                 call utl_locpt(xx,yy,dvector1,dvector2,numinlist1,inside,m)
+               end if
              end if
 
              if(inside.lt.0)then
 ! -- So either structtype is 1 or the point is outside the polygon.
-! -- We find the segment that the point is closest to.
+! -- We find the segment that the point is closest to. Segments are searched in ascending
+!    order so that ties are resolved as they would be in a search of all segments.
+               icol=min(ncol,int((xx-xmin)/delx)+1)
+               irow=min(nrow,int((yy-ymin)/dely)+1)
+               icell=(irow-1)*ncol+icol
                mindist=1.0d300
-               do i=1,numinlist1-1
+               minsector=0
+               do k=cellstart(icell),cellstart(icell+1)-1
+                 i=cellseg(k)
                  dist=utl_distance_to_segment(     &
                  dvector1(i),dvector2(i),dvector1(i+1),dvector2(i+1),xx,yy,uu)
                  if(dist.lt.mindist)then
@@ -2437,6 +2536,10 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
                    minuu=uu
                  end if
                end do
+               if(minsector.eq.0)then
+                 gg=0.0d0
+                 go to 300
+               end if
                if(minuu.lt.0.0d0)minuu=0.0d0
                if(minuu.gt.1.0d0)minuu=1.0d0
                ielem1=ivector1(minsector)
@@ -2473,6 +2576,16 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
              else
                gg=1.0d0
              end if
+300          continue
+             if(gg.eq.0.0d0)then
+! -- The target point is beyond the influence of the structure so no factors are recorded.
+               if(factorfiletype.eq.0)then
+                 write(iunit,err=9600) ipt,i_zero,r_zero
+               else
+                 write(iunit,310,err=9600) ipt,i_zero,r_zero
+               end if
+               cycle
+             end if
              if(structtype.eq.1)then
 ! -- We do a secondary inverse power of distance interpolation to supplement the interpolation that has already been done.
 !    This gets rid of discontinuties on lines that bisect the inside of bends.
@@ -2544,6 +2657,7 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
              end if
            end if
          end do
+         deallocate(cellstart,cellnext,cellseg,stat=ierr)
 
        end do
        icount_interp=num2
@@ -2580,6 +2694,9 @@ integer (kind=c_int) function calc_structural_overlay_factors(     &
        end if
 
 9900   continue
+       if(allocated(cellstart)) deallocate(cellstart,stat=ierr)
+       if(allocated(cellnext)) deallocate(cellnext,stat=ierr)
+       if(allocated(cellseg)) deallocate(cellseg,stat=ierr)
        return
 
 end function calc_structural_overlay_factors
@@ -2959,6 +3076,8 @@ integer (kind=c_int) function ipd_interpolate_2d(npts,             &
 
        zones: do izone=1,numzone
          iii=zone(izone)
+!$omp parallel do default(shared) private(x1,y1,aan,angle,cosang,sinang,power,      &
+!$omp   den,num,jpt,x2,y2,dx,dy,dtempx,dtempy,dxs,dys,dists,fac,dtemp)
          targpoints: do ipt=1,mpts
            if(znt(ipt).eq.iii)then
              x1=ect(ipt)
@@ -3000,6 +3119,7 @@ integer (kind=c_int) function ipd_interpolate_2d(npts,             &
              targval(ipt)=dtemp
            end if
          end do targpoints
+!$omp end parallel do
        end do zones
 
        go to 9900
@@ -3199,6 +3319,10 @@ integer (kind=c_int) function ipd_interpolate_3d(npts,                &
 
        zones: do izone=1,numzone
          iii=zone(izone)
+!$omp parallel do default(shared) private(x1,y1,z1,angle,cosang1,sinang1,          &
+!$omp   cosang2,sinang2,cosang3,sinang3,den_along,den_along2,den_amid,den_amid2,        &
+!$omp   den_avert,den_avert2,power,den,num,jpt,xdiff,ydiff,zdiff,xd,yd,zd,xdd,ydd,zdd,  &
+!$omp   dlong,dmid,dvert,dtemp,dtemp1,dtemp2,dtemp3,fac)
          targpoints: do ipt=1,mpts
            if(znt(ipt).eq.iii)then
              x1=ect(ipt)
@@ -3256,6 +3380,7 @@ integer (kind=c_int) function ipd_interpolate_3d(npts,                &
              targval(ipt)=dtemp
            end if
          end do targpoints
+!$omp end parallel do
        end do zones
        go to 9900
 
@@ -3307,6 +3432,94 @@ end function initialize_randgen
 
 
 
+integer (kind=c_int) function set_progress_callback(callback,interval) &
+                 bind(C,name="set_progress_callback")
+
+! -- Set (or remove) the function that lengthy functions call to report their progress.
+! -- The callback is called as callback(done,total) every INTERVAL target points, nodes
+!    or simulation times. If it returns a nonzero value the calling function is cancelled.
+
+       use iso_c_binding, only: c_int,c_funptr,c_associated,c_f_procpointer
+       use utilities
+       type(c_funptr), value, intent(in)  :: callback   ! Null pointer removes the callback
+       integer(kind=c_int), intent(in)    :: interval
+
+! -- Initialization
+
+       function_name='set_progress_callback()'
+       set_progress_callback=0
+
+       if(interval.le.0)then
+         write(amessage,100) trim(function_name)
+100      format('The interval argument of function ',a,' must be greater than zero.')
+         set_progress_callback=1
+         return
+       end if
+       progress_interval=interval
+       if(c_associated(callback))then
+         call c_f_procpointer(callback,progress_func)
+       else
+         nullify(progress_func)
+       end if
+       return
+
+end function set_progress_callback
+
+
+
+integer (kind=c_int) function set_num_threads(nthreads) &
+                 bind(C,name="set_num_threads")
+
+! -- Set the number of threads used by functions that are parallelised with OpenMP.
+! -- This has no effect if the library was built without OpenMP.
+
+       use iso_c_binding, only: c_int
+       use utilities
+!$     use omp_lib, only: omp_set_num_threads
+       integer(kind=c_int), intent(in)    :: nthreads
+
+! -- Initialization
+
+       function_name='set_num_threads()'
+       set_num_threads=0
+
+       if(nthreads.le.0)then
+         write(amessage,100) trim(function_name)
+100      format('The nthreads argument of function ',a,' must be greater than zero.')
+         set_num_threads=1
+         return
+       end if
+!$     call omp_set_num_threads(nthreads)
+       return
+
+end function set_num_threads
+
+
+
+integer (kind=c_int) function get_num_threads(nthreads) &
+                 bind(C,name="get_num_threads")
+
+! -- Get the number of threads used by functions that are parallelised with OpenMP.
+! -- This is 1 if the library was built without OpenMP.
+
+       use iso_c_binding, only: c_int
+       use utilities
+!$     use omp_lib, only: omp_get_max_threads
+       integer(kind=c_int), intent(out)   :: nthreads
+
+! -- Initialization
+
+       function_name='get_num_threads()'
+       get_num_threads=0
+
+       nthreads=1
+!$     nthreads=omp_get_max_threads()
+       return
+
+end function get_num_threads
+
+
+
 integer (kind=c_int) function fieldgen2d_sva(                &
                               nnode,                         &
                               ec,nc,area,active,             &
@@ -3339,7 +3552,7 @@ integer (kind=c_int) function fieldgen2d_sva(                &
        integer(kind=c_int), intent(in)   :: nreal                  ! Number of realisations to generate
        real(kind=c_double), intent(out)  :: randfield(ldrand,nreal)! Realisations
 
-       integer                 :: jnode,knode,ierr
+       integer                 :: jnode,knode,ierr,icancel
        integer                 :: ireal
        double precision        :: xi,yi
        double precision        :: vvar,along,amid,cosang1,sinang1,ang1
@@ -3434,9 +3647,10 @@ integer (kind=c_int) function fieldgen2d_sva(                &
          end if
        end do
 
-! -- Allocate the array that stores random numbers.
+! -- Allocate the array that stores random numbers. Realisations are stored contiguously
+!    for each node so that the convolution loop over realisations can be vectorised.
 
-       allocate(diid(nnode,nreal),stat=ierr)
+       allocate(diid(nreal,nnode),stat=ierr)
        if(ierr.ne.0) go to 9200
        if(utl_allocate_vector('d',1,nreal).ne.0) go to 9200
 
@@ -3444,7 +3658,7 @@ integer (kind=c_int) function fieldgen2d_sva(                &
 
        do ireal=1,nreal
          do jnode=1,nnode
-           diid(jnode,ireal)=utl_random_normal()
+           diid(ireal,jnode)=utl_random_normal()
          end do
        end do
 
@@ -3467,7 +3681,16 @@ integer (kind=c_int) function fieldgen2d_sva(                &
 
 ! -- Do the convolution
 
+       call utl_progress_start(nnode)
+!$omp parallel do default(shared) schedule(guided) private(icancel,knode,ireal,           &
+!$omp   xi,yi,vvar,along,amid,ang1,cosang1,sinang1,den_along,den_along2,den_amid,        &
+!$omp   den_amid2,den,xdiff,ydiff,dlong,dmid,dtemp,dtemp1,dtemp2,dtemp3,dvector1)
        do jnode=1,nnode
+         if(progress_cancelled) cycle
+!$omp critical (progress)
+         icancel=utl_progress_step()
+!$omp end critical (progress)
+         if(icancel.ne.0) cycle
          if(active(jnode).ne.0)then
            xi=ec(jnode)
            yi=nc(jnode)
@@ -3528,7 +3751,7 @@ integer (kind=c_int) function fieldgen2d_sva(                &
              end if
              dtemp=dtemp*area(knode)
              do ireal=1,nreal
-                dvector1(ireal)=dvector1(ireal)+dtemp*diid(knode,ireal)
+                dvector1(ireal)=dvector1(ireal)+dtemp*diid(ireal,knode)
              end do
              den=den+dtemp*dtemp
            end do
@@ -3543,6 +3766,8 @@ integer (kind=c_int) function fieldgen2d_sva(                &
            end do
          end if
        end do
+!$omp end parallel do
+       if(progress_cancelled) go to 9300
        go to 9900
 
 9000   write(amessage,9010) trim(varname),trim(function_name)
@@ -3557,6 +3782,10 @@ integer (kind=c_int) function fieldgen2d_sva(                &
 9210   format('Memory management error encountered in function ',a,'.')
        go to 9890
 
+9300   write(amessage,9310) trim(function_name)
+9310   format('Function ',a,' was cancelled by the progress callback.')
+       go to 9890
+
 9890   fieldgen2d_sva=1
 
 9900   continue
@@ -3605,7 +3834,7 @@ integer (kind=c_int) function fieldgen3d_sva(                &
        integer(kind=c_int), intent(in)   :: nreal                  ! Number of realisations to generate
        real(kind=c_double), intent(out)  :: randfield(ldrand,nreal)! Realisations
 
-       integer                 :: jnode,knode,ierr
+       integer                 :: jnode,knode,ierr,icancel
        integer                 :: ireal
        double precision        :: xi,yi,zi
        double precision        :: aavert
@@ -3724,9 +3953,10 @@ integer (kind=c_int) function fieldgen3d_sva(                &
          end if
        end do
 
-! -- Allocate the array that stores random numbers.
+! -- Allocate the array that stores random numbers. Realisations are stored contiguously
+!    for each node so that the convolution loop over realisations can be vectorised.
 
-       allocate(diid(nnode,nreal),stat=ierr)
+       allocate(diid(nreal,nnode),stat=ierr)
        if(ierr.ne.0) go to 9200
        if(utl_allocate_vector('d',1,nreal).ne.0) go to 9200
 
@@ -3734,7 +3964,7 @@ integer (kind=c_int) function fieldgen3d_sva(                &
 
        do ireal=1,nreal
          do jnode=1,nnode
-           diid(jnode,ireal)=utl_random_normal()
+           diid(ireal,jnode)=utl_random_normal()
          end do
        end do
 
@@ -3757,7 +3987,18 @@ integer (kind=c_int) function fieldgen3d_sva(                &
 
 ! -- Do the convolution
 
+       call utl_progress_start(nnode)
+!$omp parallel do default(shared) schedule(guided) private(icancel,knode,ireal,           &
+!$omp   xi,yi,zi,aavert,vvar,along,amid,ang1,cosang1,sinang1,cosang2,sinang2,cosang3,    &
+!$omp   sinang3,den_along,den_along2,den_amid,den_amid2,den_avert,den_avert2,den,        &
+!$omp   xd,yd,zd,xdd,ydd,zdd,xdiff,ydiff,zdiff,dlong,dmid,dvert,                         &
+!$omp   dtemp,dtemp1,dtemp2,dtemp3,dvector1)
        do jnode=1,nnode
+         if(progress_cancelled) cycle
+!$omp critical (progress)
+         icancel=utl_progress_step()
+!$omp end critical (progress)
+         if(icancel.ne.0) cycle
          if(active(jnode).ne.0)then
            xi=ec(jnode)
            yi=nc(jnode)
@@ -3842,7 +4083,7 @@ integer (kind=c_int) function fieldgen3d_sva(                &
              end if
              dtemp=dtemp*area(knode)*height(knode)
              do ireal=1,nreal
-               dvector1(ireal)=dvector1(ireal)+dtemp*diid(knode,ireal)
+               dvector1(ireal)=dvector1(ireal)+dtemp*diid(ireal,knode)
              end do
              den=den+dtemp*dtemp
            end do
@@ -3857,6 +4098,8 @@ integer (kind=c_int) function fieldgen3d_sva(                &
            end do
          end if
        end do
+!$omp end parallel do
+       if(progress_cancelled) go to 9300
 
        go to 9900
 
@@ -3873,6 +4116,10 @@ integer (kind=c_int) function fieldgen3d_sva(                &
 9210   format('Memory management error encountered in function ',a,'.')
        go to 9890
 
+9300   write(amessage,9310) trim(function_name)
+9310   format('Function ',a,' was cancelled by the progress callback.')
+       go to 9890
+
 9890   fieldgen3d_sva=1
 
 9900   continue
@@ -80,6 +80,42 @@ module function_interfaces
        real(kind=c_double), intent(out)     :: simstate(ntime,npts)
     end function interp_from_structured_grid
 
+    integer (kind=c_int) function calc_structured_interp_factors(            &
+                             gridname,npts,ecoord,ncoord,layer,              &
+                             factorfile,factorfiletype,interp_success)       &
+                     bind(c,name="calc_structured_interp_factors")
+       use iso_c_binding, only: c_int,c_double,c_char
+       character (kind=c_char), intent(in)  :: gridname(*)
+       integer(kind=c_int), intent(in)      :: npts
+       real(kind=c_double), intent(in)      :: ecoord(npts),ncoord(npts)
+       integer(kind=c_int), intent(in)      :: layer(npts)
+       character (kind=c_char), intent(in)  :: factorfile(*)
+       integer(kind=c_int), intent(in)      :: factorfiletype
+       integer(kind=c_int), intent(out)     :: interp_success(npts)
+    end function calc_structured_interp_factors
+
+    integer (kind=c_int) function interp_from_structured_grid_using_factors( &
+                             depvarfile,factorfile,factorfiletype,           &
+                             isim,iprec,ntime,                               &
+                             vartype,interpthresh,nointerpval,               &
+                             npts,nproctime,simtime,simstate)                &
+                     bind(c,name="interp_from_structured_grid_using_factors")
+       use iso_c_binding, only: c_int,c_double,c_char
+       character (kind=c_char), intent(in)  :: depvarfile(*)
+       character (kind=c_char), intent(in)  :: factorfile(*)
+       integer(kind=c_int), intent(in)      :: factorfiletype
+       integer(kind=c_int), intent(in)      :: isim
+       integer(kind=c_int), intent(in)      :: iprec
+       integer(kind=c_int), intent(in)      :: ntime
+       character (kind=c_char), intent(in)  :: vartype(*)
+       real(kind=c_double), intent(in)      :: interpthresh
+       real(kind=c_double), intent(in)      :: nointerpval
+       integer(kind=c_int), intent(in)      :: npts
+       integer(kind=c_int), intent(out)     :: nproctime
+       real(kind=c_double), intent(out)     :: simtime(ntime)
+       real(kind=c_double), intent(out)     :: simstate(ntime,npts)
+    end function interp_from_structured_grid_using_factors
+
     integer (kind=c_int) function interp_to_obstime(                           &
                              nsimtime,nproctime,npts,simtime,simval,           &
                              interpthresh,how_extrap,time_extrap,nointerpval,  &
@@ -448,6 +484,25 @@ module function_interfaces
        integer(kind=c_int), intent(in)    :: iseed
    end function initialize_randgen
 
+   integer (kind=c_int) function set_progress_callback(callback,interval) &
+                    bind(c,name="set_progress_callback")
+       use iso_c_binding, only: c_int,c_funptr
+       type(c_funptr), value, intent(in)  :: callback
+       integer(kind=c_int), intent(in)    :: interval
+   end function set_progress_callback
+
+   integer (kind=c_int) function set_num_threads(nthreads) &
+                    bind(c,name="set_num_threads")
+       use iso_c_binding, only: c_int
+       integer(kind=c_int), intent(in)    :: nthreads
+   end function set_num_threads
+
+   integer (kind=c_int) function get_num_threads(nthreads) &
+                    bind(c,name="get_num_threads")
+       use iso_c_binding, only: c_int
+       integer(kind=c_int), intent(out)   :: nthreads
+   end function get_num_threads
+
    integer (kind=c_int) function fieldgen2d_sva(             &
                               nnode,                         &
                               ec,nc,area,active,             &
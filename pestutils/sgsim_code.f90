@@ -1705,6 +1705,7 @@ end subroutine kb2d_1
 !-----------------------------------------------------------------------
 
       use geostat_3d
+      use utilities, only: utl_progress_step
 
       implicit integer(i-n), real(a-h, o-z)                          !jd
 
@@ -1936,6 +1937,7 @@ end subroutine kb2d_1
 !
 !jd      do index=1,nloop
       do i_ipts=1,n_npts
+      if(utl_progress_step().ne.0) return
 !jd      if((int(index/irepo)*irepo).eq.index) write(*,103) index
 !jd103   format('   currently on estimate ',i9)
 !
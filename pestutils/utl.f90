@@ -1,6 +1,7 @@
 module utilities
 
        use dimvar
+       use iso_c_binding, only: c_int
        implicit none
 
 public
@@ -24,6 +25,21 @@ public
         double precision, allocatable  :: dvector2(:)
         double precision, allocatable  :: dvector3(:)
 
+! -- Progress reporting and cancellation
+
+abstract interface
+        integer(c_int) function progress_callback(done,total) bind(c)
+          import :: c_int
+          integer(c_int), value, intent(in) :: done,total
+        end function progress_callback
+end interface
+
+        procedure(progress_callback), pointer :: progress_func => null()
+        integer                        :: progress_interval=1
+        integer                        :: progress_done=0
+        integer                        :: progress_total=0
+        logical                        :: progress_cancelled=.false.
+
 ! -- Geometry utilities
 
 public   utl_locpt,          &
@@ -63,6 +79,11 @@ public  utl_allocate_vector, &
 public utl_equals
 public utl_random_normal
 
+! -- Progress utilities
+
+public utl_progress_start,   &
+       utl_progress_step
+
 ! -- Interfaces for generic functions.
 
 interface utl_num2char
@@ -1145,4 +1166,44 @@ double precision function utl_random_normal()
        return
 end function utl_random_normal
 
+
+subroutine utl_progress_start(total)
+
+! -- Start counting the steps of a lengthy task for progress reporting.
+
+       implicit none
+
+       integer, intent(in) :: total
+
+       progress_done=0
+       progress_total=total
+       progress_cancelled=.false.
+
+       return
+end subroutine utl_progress_start
+
+
+integer function utl_progress_step()
+
+! -- Count a step of a lengthy task. Every progress_interval steps, and at the
+!    last step, the progress callback (if one is set) is called. A nonzero
+!    return value from the callback cancels the task; progress_cancelled is
+!    then set and this function returns 1.
+
+       implicit none
+
+       utl_progress_step=0
+       progress_done=progress_done+1
+       if(.not.associated(progress_func)) return
+       if((mod(progress_done,progress_interval).eq.0).or.          &
+          (progress_done.eq.progress_total))then
+         if(progress_func(int(progress_done,c_int),int(progress_total,c_int)).ne.0)then
+           progress_cancelled=.true.
+           utl_progress_step=1
+         end if
+       end if
+
+       return
+end function utl_progress_step
+
 end module utilities
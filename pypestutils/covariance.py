@@ -0,0 +1,1065 @@
+"""Pilot point covariance matrices evaluated with NumPy.
+
+Covariances are evaluated with the same single precision variogram
+arithmetic as the GSLIB routines used by the shared library, so that results
+match :meth:`PestUtilsLib.build_covar_matrix_2d` and
+:meth:`PestUtilsLib.build_covar_matrix_3d`. Matrices may be returned in
+full, packed or per-zone storage, in single or double precision, or used
+through :class:`CovarianceOperator` without being stored. SciPy is required
+for sparse output.
+"""
+from __future__ import annotations
+
+import abc
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import numpy.typing as npt
+
+from pypestutils import enum
+from pypestutils.data import ManyArrays
+
+__all__ = [
+    "CovarianceOperator",
+    "build_covar_matrix_2d",
+    "build_covar_matrix_3d",
+    "build_sparse_covar_matrix_2d",
+    "build_sparse_covar_matrix_3d",
+]
+
+# maximum variogram value used by the power model
+PMX = np.float32(10000.0)
+
+# number of point pairs evaluated at a time
+CHUNK_SIZE = 1_000_000
+
+
+def _f32(value) -> npt.NDArray[np.float32]:
+    return np.asarray(value, np.float32)
+
+
+def _f32_func(func, value) -> npt.NDArray[np.float32]:
+    # evaluate in double precision and round, as libm single precision does
+    return func(np.asarray(value, np.float64)).astype(np.float32)
+
+
+def _vartype_value(vartype: int | str | enum.VarioType) -> int:
+    if isinstance(vartype, str):
+        vartype = enum.VarioType.get_value(vartype)
+    vartype = int(vartype)
+    if vartype not in enum.VarioType.get_valid_options():
+        raise ValueError("vartype must be 1, 2, 3 or 4")
+    return vartype
+
+
+def _is_uniform(zn: npt.NDArray[np.int32], *params: npt.NDArray) -> bool:
+    for zone in np.unique(zn):
+        sel = zn == zone
+        for param in params:
+            values = param[sel]
+            if (values != values[0]).any():
+                return False
+    return True
+
+
+class _Variogram(abc.ABC):
+    """Variogram specifications of a set of pilot points."""
+
+    ndim: int
+    coords: npt.NDArray[np.float64]
+    zn: npt.NDArray[np.int32]
+    vartype: int
+    uniform: bool
+
+    def __len__(self) -> int:
+        return len(self.zn)
+
+    def _check_zones(self) -> None:
+        if (self.zn == 0).any():
+            raise ValueError("all elements of the zn array must be nonzero")
+
+    def _check_locations(self) -> None:
+        keys = np.column_stack([self.zn, self.coords])
+        order = np.lexsort(keys.T[::-1])
+        same = (keys[order[1:]] == keys[order[:-1]]).all(axis=1)
+        if same.any():
+            first = np.flatnonzero(same)[0]
+            ipt, jpt = np.sort(order[first : first + 2]) + 1
+            raise ValueError(
+                f"points {ipt} and {jpt} are at the same location "
+                "and are in the same zone"
+            )
+
+    @abc.abstractmethod
+    def diagonal(self) -> npt.NDArray[np.float64]:
+        """Variance of each point."""
+
+    @abc.abstractmethod
+    def covariance(
+        self, ipt: npt.NDArray[np.intp], jpt: npt.NDArray[np.intp]
+    ) -> npt.NDArray[np.float64]:
+        """Covariance between pairs of distinct points in the same zone."""
+
+    def _range_factor(self, sill: npt.NDArray, threshold: float) -> npt.NDArray:
+        # structural distance, in units of "a", beyond which |cov| <= threshold
+        if self.vartype == 1:
+            return np.ones(len(self))
+        elif self.vartype == 4 or threshold <= 0.0:
+            return np.full(len(self), np.inf)
+        with np.errstate(divide="ignore"):
+            ratio = np.log(np.maximum(sill, 0.0) / threshold)
+        ratio = np.maximum(ratio, 0.0)
+        if self.vartype == 2:
+            return ratio
+        return np.sqrt(ratio)
+
+    @abc.abstractmethod
+    def search_radius(self, threshold: float) -> npt.NDArray[np.float64]:
+        """Euclidean distance beyond which covariance is below threshold."""
+
+
+class _Variogram2D(_Variogram):
+    """Variogram specifications for 2D pilot points, as for cova2."""
+
+    ndim = 2
+
+    def __init__(self, ec, nc, zn, vartype, nugget, aa, sill, anis, bearing):
+        pta = ManyArrays(
+            {"ec": ec, "nc": nc},
+            {
+                "nugget": nugget,
+                "aa": aa,
+                "sill": sill,
+                "anis": anis,
+                "bearing": bearing,
+            },
+            {"zn": zn},
+        )
+        self.vartype = _vartype_value(vartype)
+        self.zn = pta.zn
+        self._check_zones()
+        if (pta.anis <= 0.0).any():
+            raise ValueError("at least one value in the anis array is zero or negative")
+        if ((pta.bearing < -360.0) | (pta.bearing > 360.0)).any():
+            raise ValueError(
+                "at least one value in the bearing array is less than -360 or "
+                "greater than 360"
+            )
+        if (pta.nugget < 0.0).any():
+            raise ValueError("at least one value in the nugget array is negative")
+        if (pta.aa <= 0.0).any():
+            raise ValueError("at least one value in the aa array is zero or negative")
+        if (pta.sill < 0.0).any():
+            raise ValueError("at least one value in the sill array is negative")
+        self.coords = np.column_stack([pta.ec, pta.nc])
+        self._check_locations()
+        self.uniform = _is_uniform(
+            pta.zn, pta.nugget, pta.aa, pta.sill, pta.anis, pta.bearing
+        )
+        self.nugget = pta.nugget
+        self.sill = pta.sill
+        self.aa = pta.aa
+        self.anis = pta.anis
+        # single precision values passed to cova2
+        self.c0 = _f32(pta.nugget)
+        self.cc = _f32(pta.sill)
+        self.a32 = _f32(pta.aa)
+        self.aanis = _f32(1.0 / pta.anis)
+        azmuth = (np.float32(90.0) - _f32(pta.bearing)) * (
+            np.float32(3.14159265) / np.float32(180.0)
+        )
+        self.cosaz = _f32_func(np.cos, azmuth)
+        self.sinaz = _f32_func(np.sin, azmuth)
+        if self.vartype == 4:
+            self.maxcov = self.c0 + PMX
+        else:
+            self.maxcov = self.c0 + self.cc
+
+    def diagonal(self) -> npt.NDArray[np.float64]:
+        return self.sill + self.nugget
+
+    def _cova2(self, kpt, dx, dy) -> npt.NDArray[np.float32]:
+        dx1 = dx * self.cosaz[kpt] + dy * self.sinaz[kpt]
+        dy1 = (dx * -self.sinaz[kpt] + dy * self.cosaz[kpt]) / self.aanis[kpt]
+        h = np.sqrt(np.maximum(dx1 * dx1 + dy1 * dy1, np.float32(0.0)))
+        cc = self.cc[kpt]
+        aa = self.a32[kpt]
+        if self.vartype == 1:
+            hr = h / aa
+            cov = np.where(
+                hr < np.float32(1.0),
+                cc
+                * (
+                    np.float32(1.0) - hr * (np.float32(1.5) - np.float32(0.5) * hr * hr)
+                ),
+                np.float32(0.0),
+            )
+        elif self.vartype == 2:
+            cov = cc * _f32_func(np.exp, -h / aa)
+        elif self.vartype == 3:
+            cov = cc * _f32_func(np.exp, -(h * h) / (aa * aa))
+        else:
+            hpow = _f32(np.power(h.astype(np.float64), aa.astype(np.float64)))
+            cov = PMX - cc * hpow
+        small = dx * dx + dy * dy < np.float32(0.0000001)
+        return np.where(small, self.maxcov[kpt], cov).astype(np.float32)
+
+    def covariance(self, ipt, jpt) -> npt.NDArray[np.float64]:
+        dx = _f32(self.coords[jpt, 0] - self.coords[ipt, 0])
+        dy = _f32(self.coords[jpt, 1] - self.coords[ipt, 1])
+        cov = self._cova2(ipt, dx, dy)
+        if not self.uniform:
+            np.minimum(cov, self._cova2(jpt, dx, dy), out=cov)
+        return cov.astype(np.float64)
+
+    def search_radius(self, threshold: float) -> npt.NDArray[np.float64]:
+        factor = self._range_factor(self.sill, threshold)
+        return factor * self.aa * np.maximum(1.0, 1.0 / self.anis)
+
+
+class _Variogram3D(_Variogram):
+    """Variogram specifications for 3D pilot points, as for cova3."""
+
+    ndim = 3
+
+    def __init__(
+        self,
+        ec,
+        nc,
+        zc,
+        zn,
+        vartype,
+        nugget,
+        sill,
+        ahmax,
+        ahmin,
+        avert,
+        bearing,
+        dip,
+        rake,
+    ):
+        pta = ManyArrays(
+            {"ec": ec, "nc": nc, "zc": zc},
+            {
+                "nugget": nugget,
+                "sill": sill,
+                "ahmax": ahmax,
+                "ahmin": ahmin,
+                "avert": avert,
+                "bearing": bearing,
+                "dip": dip,
+                "rake": rake,
+            },
+            {"zn": zn},
+        )
+        self.vartype = _vartype_value(vartype)
+        self.zn = pta.zn
+        self._check_zones()
+        if (pta.nugget < 0.0).any():
+            raise ValueError("at least one value in the nugget array is negative")
+        if (pta.sill < 0.0).any():
+            raise ValueError("at least one value in the sill array is negative")
+        for name in ["ahmax", "ahmin", "avert"]:
+            if (getattr(pta, name) <= 0.0).any():
+                raise ValueError(
+                    f"at least one value in the {name} array is zero or negative"
+                )
+        if ((pta.bearing < -360.0) | (pta.bearing > 360.0)).any():
+            raise ValueError(
+                "at least one value in the bearing array is less than -360 or "
+                "greater than 360"
+            )
+        if ((pta.dip < -180.0) | (pta.dip > 180.0)).any():
+            raise ValueError(
+                "at least one value in the dip array is less than -180 or "
+                "greater than 180"
+            )
+        if ((pta.rake < -90.0) | (pta.rake > 90.0)).any():
+            raise ValueError(
+                "at least one value in the rake array is less than -90 or "
+                "greater than 90"
+            )
+        self.coords = np.column_stack([pta.ec, pta.nc, pta.zc])
+        self._check_locations()
+        self.uniform = _is_uniform(
+            pta.zn,
+            pta.nugget,
+            pta.sill,
+            pta.ahmax,
+            pta.ahmin,
+            pta.avert,
+            pta.bearing,
+            pta.dip,
+            pta.rake,
+        )
+        self.nugget = pta.nugget
+        self.sill = pta.sill
+        self.amax = np.maximum(np.maximum(pta.ahmax, pta.ahmin), pta.avert)
+        self.ahmax = pta.ahmax
+        # single precision values passed to cova3, and setrot rotation matrices
+        eps = np.float32(0.000001)
+        self.c0 = _f32(pta.nugget)
+        self.cc = _f32(pta.sill)
+        self.a32 = _f32(pta.ahmax)
+        denom = np.maximum(self.a32, eps).astype(np.float64)
+        anis1 = _f32(_f32(pta.ahmin).astype(np.float64) / denom)
+        anis2 = _f32(_f32(pta.avert).astype(np.float64) / denom)
+        deg2rad = np.float32(3.141592654) / np.float32(180.0)
+        ang1 = _f32(pta.bearing)
+        alpha = np.where(
+            (ang1 >= np.float32(0.0)) & (ang1 < np.float32(270.0)),
+            (np.float32(90.0) - ang1) * deg2rad,
+            (np.float32(450.0) - ang1) * deg2rad,
+        ).astype(np.float32)
+        beta = (np.float32(-1.0) * _f32(pta.dip)) * deg2rad
+        theta = _f32(pta.rake) * deg2rad
+        sina = _f32_func(np.sin, alpha).astype(np.float64)
+        sinb = _f32_func(np.sin, beta).astype(np.float64)
+        sint = _f32_func(np.sin, theta).astype(np.float64)
+        cosa = _f32_func(np.cos, alpha).astype(np.float64)
+        cosb = _f32_func(np.cos, beta).astype(np.float64)
+        cost = _f32_func(np.cos, theta).astype(np.float64)
+        afac1 = 1.0 / np.maximum(anis1, np.float32(1e-20)).astype(np.float64)
+        afac2 = 1.0 / np.maximum(anis2, np.float32(1e-20)).astype(np.float64)
+        rotmat = np.empty((len(pta), 3, 3))
+        rotmat[:, 0, 0] = cosb * cosa
+        rotmat[:, 0, 1] = cosb * sina
+        rotmat[:, 0, 2] = -sinb
+        rotmat[:, 1, 0] = afac1 * (-cost * sina + sint * sinb * cosa)
+        rotmat[:, 1, 1] = afac1 * (cost * cosa + sint * sinb * sina)
+        rotmat[:, 1, 2] = afac1 * (sint * cosb)
+        rotmat[:, 2, 0] = afac2 * (sint * sina + cost * sinb * cosa)
+        rotmat[:, 2, 1] = afac2 * (-sint * cosa + cost * sinb * sina)
+        rotmat[:, 2, 2] = afac2 * (cost * cosb)
+        self.rotmat = rotmat
+        if self.vartype == 4:
+            self.cmax = self.c0 + PMX
+        else:
+            self.cmax = self.c0 + self.cc
+
+    def diagonal(self) -> npt.NDArray[np.float64]:
+        return self.sill + self.nugget
+
+    def _cova3(self, kpt, dx, dy, dz) -> npt.NDArray[np.float32]:
+        hsqd = 0.0
+        for irow in range(3):
+            cont = (
+                self.rotmat[kpt, irow, 0] * dx
+                + self.rotmat[kpt, irow, 1] * dy
+                + self.rotmat[kpt, irow, 2] * dz
+            )
+            hsqd = hsqd + cont * cont
+        h = _f32(np.sqrt(hsqd))
+        cc = self.cc[kpt]
+        aa = self.a32[kpt]
+        if self.vartype == 1:
+            hr = h / aa
+            cov = np.where(
+                hr < np.float32(1.0),
+                cc
+                * (
+                    np.float32(1.0) - hr * (np.float32(1.5) - np.float32(0.5) * hr * hr)
+                ),
+                np.float32(0.0),
+            )
+        elif self.vartype == 2:
+            cov = cc * _f32_func(np.exp, (np.float32(-1.0) * h) / aa)
+        elif self.vartype == 3:
+            cov = cc * _f32_func(np.exp, np.float32(-1.0) * (h / aa) * (h / aa))
+        else:
+            hpow = _f32(np.power(h.astype(np.float64), aa.astype(np.float64)))
+            cov = self.cmax[kpt] - cc * hpow
+        small = _f32(hsqd) < np.float32(0.00001)
+        return np.where(small, self.cmax[kpt], cov).astype(np.float32)
+
+    def covariance(self, ipt, jpt) -> npt.NDArray[np.float64]:
+        dx, dy, dz = (
+            _f32(self.coords[jpt, axis] - self.coords[ipt, axis]).astype(np.float64)
+            for axis in range(3)
+        )
+        # cova3 is evaluated with the rotation of each point of the pair
+        cov = self._cova3(jpt, dx, dy, dz)
+        if not self.uniform:
+            np.minimum(cov, self._cova3(ipt, -dx, -dy, -dz), out=cov)
+        return cov.astype(np.float64)
+
+    def search_radius(self, threshold: float) -> npt.NDArray[np.float64]:
+        return self._range_factor(self.sill, threshold) * self.amax
+
+
+def _sparse_covar_matrix(vario: _Variogram, threshold: float, format: str):
+    from scipy import sparse
+    from scipy.spatial import cKDTree
+
+    if format not in ("csr", "coo"):
+        raise ValueError("format must be 'csr' or 'coo'")
+    if not threshold >= 0.0:
+        raise ValueError("threshold must be zero or positive")
+    npts = len(vario)
+    diag = np.arange(npts)
+    rows = [diag]
+    cols = [diag]
+    vals = [vario.diagonal()]
+    radius = vario.search_radius(threshold)
+    for zone in np.unique(vario.zn):
+        idx = np.flatnonzero(vario.zn == zone)
+        if len(idx) < 2:
+            continue
+        tree = cKDTree(vario.coords[idx])
+        pairs = tree.query_pairs(radius[idx].max(), output_type="ndarray")
+        for start in range(0, len(pairs), CHUNK_SIZE):
+            chunk = pairs[start : start + CHUNK_SIZE]
+            ipt = idx[chunk[:, 0]]
+            jpt = idx[chunk[:, 1]]
+            cov = vario.covariance(ipt, jpt)
+            keep = np.abs(cov) > threshold
+            ipt = ipt[keep]
+            jpt = jpt[keep]
+            cov = cov[keep]
+            rows += [ipt, jpt]
+            cols += [jpt, ipt]
+            vals += [cov, cov]
+    covmat = sparse.coo_matrix(
+        (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(npts, npts),
+    )
+    if format == "csr":
+        return covmat.tocsr()
+    return covmat
+
+
+def _tile_rows(nz: int):
+    nrows = max(1, CHUNK_SIZE // nz)
+    for r0 in range(0, nz, nrows):
+        yield r0, min(nz, r0 + nrows)
+
+
+def _check_nthreads(nthreads: int | None) -> int:
+    if nthreads is None:
+        return os.cpu_count() or 1
+    elif nthreads < 1:
+        raise ValueError("nthreads must be 1 or more")
+    return nthreads
+
+
+def _map_tiles(func, nz: int, nthreads: int):
+    """Yield func(r0, r1) for each row tile in order, using a pool of threads."""
+    if nthreads == 1:
+        for r0, r1 in _tile_rows(nz):
+            yield func(r0, r1)
+        return
+    with ThreadPoolExecutor(nthreads) as pool:
+        yield from pool.map(lambda rows: func(*rows), _tile_rows(nz))
+
+
+def _for_each_tile(func, nz: int, nthreads: int) -> None:
+    """Call func(r0, r1) for each row tile, using a pool of threads."""
+    for _ in _map_tiles(func, nz, nthreads):
+        pass
+
+
+def _covariance_tile(
+    vario: _Variogram, idx: npt.NDArray[np.intp], r0: int, r1: int
+) -> npt.NDArray[np.float64]:
+    """Covariances between points idx[r0:r1] and idx[r0:]."""
+    tile = vario.covariance(idx[r0:r1, np.newaxis], idx[np.newaxis, r0:])
+    local = np.arange(r1 - r0)
+    tile[local, local] = vario.diagonal()[idx[r0:r1]]
+    return tile
+
+
+def _zone_covariance(
+    vario: _Variogram, idx: npt.NDArray[np.intp], store, nthreads: int
+) -> None:
+    """Evaluate the covariance block of a zone, as tiles passed to store.
+
+    Each tile is passed as store(r0, r1, tile), where tile holds covariances
+    between points idx[r0:r1] and idx[r0:]. Tiles may be stored concurrently,
+    and write to separate parts of a symmetric matrix.
+    """
+    if vario.uniform:
+        _for_each_tile(
+            lambda r0, r1: store(r0, r1, _covariance_tile(vario, idx, r0, r1)),
+            len(idx),
+            nthreads,
+        )
+        return
+    # as for the shared library, reconstruct from the singular value decomposition
+    nz = len(idx)
+    block = np.empty((nz, nz))
+
+    def fill(r0, r1):
+        tile = _covariance_tile(vario, idx, r0, r1)
+        block[r0:r1, r0:] = tile
+        block[r0:, r0:r1] = tile.T
+
+    _for_each_tile(fill, nz, nthreads)
+    u, s, _ = np.linalg.svd(block)
+    block = (u * s) @ u.T
+    del u
+    # keep the lower triangle
+    for r0, r1 in _tile_rows(nz):
+        block[r0:r1, r1:] = block[r1:, r0:r1].T
+        square = block[r0:r1, r0:r1]
+        upper = np.triu_indices(r1 - r0, 1)
+        square[upper] = square.T[upper]
+    for r0, r1 in _tile_rows(nz):
+        store(r0, r1, block[r0:r1, r0:])
+
+
+def _dense_covar_matrix(
+    vario: _Variogram, storage: str, dtype: npt.DTypeLike, nthreads: int | None
+):
+    if storage not in ("full", "packed", "blocks"):
+        raise ValueError("storage must be 'full', 'packed' or 'blocks'")
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError("dtype must be float32 or float64")
+    nthreads = _check_nthreads(nthreads)
+    npts = len(vario)
+    if storage == "full":
+        covmat = np.zeros((npts, npts), dtype)
+    elif storage == "packed":
+        covmat = np.zeros(npts * (npts + 1) // 2, dtype)
+    else:
+        blocks = []
+    for zone in np.unique(vario.zn):
+        idx = np.flatnonzero(vario.zn == zone)
+        nz = len(idx)
+        if storage == "blocks":
+            block = np.empty((nz, nz), dtype)
+            blocks.append({"zone": int(zone), "index": idx, "covmat": block})
+        elif storage == "full" and idx[-1] - idx[0] + 1 == nz:
+            # points in the zone are contiguous
+            block = covmat[idx[0] : idx[-1] + 1, idx[0] : idx[-1] + 1]
+        else:
+            block = None
+
+        def store(r0, r1, tile):
+            if block is not None:
+                block[r0:r1, r0:] = tile
+                block[r0:, r0:r1] = tile.T
+            elif storage == "full":
+                covmat[np.ix_(idx[r0:r1], idx[r0:])] = tile
+                covmat[np.ix_(idx[r0:], idx[r0:r1])] = tile.T
+            else:
+                # LAPACK upper packed storage of element (i, j), where i <= j
+                ipt = idx[r0:r1, np.newaxis]
+                jpt = idx[np.newaxis, r0:]
+                upper = np.triu(np.ones(tile.shape, bool))
+                pos = ipt + jpt * (jpt + 1) // 2
+                covmat[pos[upper]] = tile[upper]
+
+        _zone_covariance(vario, idx, store, nthreads)
+    if storage == "blocks":
+        return blocks
+    return covmat
+
+
+def build_sparse_covar_matrix_2d(
+    ec: npt.ArrayLike,
+    nc: npt.ArrayLike,
+    zn: int | npt.ArrayLike,
+    vartype: int | str | enum.VarioType,
+    nugget: float | npt.ArrayLike,
+    aa: float | npt.ArrayLike,
+    sill: float | npt.ArrayLike,
+    anis: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    threshold: float = 0.0,
+    format: str = "csr",
+):
+    """Calculate a sparse covariance matrix for a set of 2D pilot points.
+
+    Only pairs of points in the same zone that are within the range of the
+    variogram are evaluated, found with a neighbour search. Covariances with
+    an absolute value not greater than threshold are omitted.
+
+    Parameters
+    ----------
+    ec, nc : array_like
+        Pilot point coordinates, each 1D array with shape (npts,).
+    zn : int or array_like
+        Pilot point zones, integer or 1D array with shape (npts,).
+    vartype : int, str or enum.VarioType
+        Variogram type, where 1:spher, 2:exp, 3:gauss, 4:pow.
+    nugget, aa, sill, anis, bearing : float or array_like
+        Variogram parameters, each float or 1D array with shape (npts,).
+    threshold : float, default 0.0
+        Covariance threshold. Exponential and gaussian variograms are only
+        truncated if this is greater than zero, and power variograms are
+        never truncated.
+    format : {"csr", "coo"}, default "csr"
+        Sparse matrix format.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix or scipy.sparse.coo_matrix
+        Symmetric covariance matrix with shape (npts, npts).
+
+    Notes
+    -----
+    Where variogram parameters vary within a zone, the dense matrix from
+    :meth:`PestUtilsLib.build_covar_matrix_2d` is adjusted to be positive
+    definite. This adjustment is not applied to sparse matrices.
+    """
+    vario = _Variogram2D(ec, nc, zn, vartype, nugget, aa, sill, anis, bearing)
+    return _sparse_covar_matrix(vario, threshold, format)
+
+
+def build_sparse_covar_matrix_3d(
+    ec: npt.ArrayLike,
+    nc: npt.ArrayLike,
+    zc: npt.ArrayLike,
+    zn: int | npt.ArrayLike,
+    vartype: int | str | enum.VarioType,
+    nugget: float | npt.ArrayLike,
+    sill: float | npt.ArrayLike,
+    ahmax: float | npt.ArrayLike,
+    ahmin: float | npt.ArrayLike,
+    avert: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    dip: float | npt.ArrayLike,
+    rake: float | npt.ArrayLike,
+    threshold: float = 0.0,
+    format: str = "csr",
+):
+    """Calculate a sparse covariance matrix for a set of 3D pilot points.
+
+    Only pairs of points in the same zone that are within the range of the
+    variogram are evaluated, found with a neighbour search. Covariances with
+    an absolute value not greater than threshold are omitted.
+
+    Parameters
+    ----------
+    ec, nc, zc : array_like
+        Pilot point coordinates, each 1D array with shape (npts,).
+    zn : int or array_like
+        Pilot point zones, integer or 1D array with shape (npts,).
+    vartype : int, str or enum.VarioType
+        Variogram type, where 1:spher, 2:exp, 3:gauss, 4:pow.
+    nugget, sill : float or array_like
+        Variogram parameters, each float or 1D array with shape (npts,).
+    ahmax, ahmin, avert : float or array_like
+        Variogram a-values in 3 orientations, each float or 1D array with
+        shape (npts,).
+    bearing, dip, rake : float or array_like
+        Variogram angles, each float or 1D array with shape (npts,).
+    threshold : float, default 0.0
+        Covariance threshold. Exponential and gaussian variograms are only
+        truncated if this is greater than zero, and power variograms are
+        never truncated.
+    format : {"csr", "coo"}, default "csr"
+        Sparse matrix format.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix or scipy.sparse.coo_matrix
+        Symmetric covariance matrix with shape (npts, npts).
+
+    Notes
+    -----
+    Where variogram parameters vary within a zone, the dense matrix from
+    :meth:`PestUtilsLib.build_covar_matrix_3d` is adjusted to be positive
+    definite. This adjustment is not applied to sparse matrices.
+    """
+    vario = _Variogram3D(
+        ec,
+        nc,
+        zc,
+        zn,
+        vartype,
+        nugget,
+        sill,
+        ahmax,
+        ahmin,
+        avert,
+        bearing,
+        dip,
+        rake,
+    )
+    return _sparse_covar_matrix(vario, threshold, format)
+
+
+def build_covar_matrix_2d(
+    ec: npt.ArrayLike,
+    nc: npt.ArrayLike,
+    zn: int | npt.ArrayLike,
+    vartype: int | str | enum.VarioType,
+    nugget: float | npt.ArrayLike,
+    aa: float | npt.ArrayLike,
+    sill: float | npt.ArrayLike,
+    anis: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    storage: str = "full",
+    dtype: npt.DTypeLike = np.float64,
+    nthreads: int | None = None,
+):
+    """Calculate a covariance matrix for a set of 2D pilot points.
+
+    Parameters
+    ----------
+    ec, nc : array_like
+        Pilot point coordinates, each 1D array with shape (npts,).
+    zn : int or array_like
+        Pilot point zones, integer or 1D array with shape (npts,).
+    vartype : int, str or enum.VarioType
+        Variogram type, where 1:spher, 2:exp, 3:gauss, 4:pow.
+    nugget, aa, sill, anis, bearing : float or array_like
+        Variogram parameters, each float or 1D array with shape (npts,).
+    storage : {"full", "packed", "blocks"}, default "full"
+        Use "full" for a symmetric matrix with shape (npts, npts), "packed"
+        for the upper triangle in LAPACK packed storage with shape
+        (npts * (npts + 1) // 2,), or "blocks" for a list of covariance
+        matrices for each zone, since points in different zones do not
+        covary.
+    dtype : float32 or float64, default float64
+        Data type of returned matrices.
+    nthreads : int, optional
+        Number of threads used to evaluate tiles of the matrix. Default is
+        the number of CPUs.
+
+    Returns
+    -------
+    npt.NDArray or list of dict
+        Covariance matrix, or for "blocks" a list of dicts with keys "zone",
+        "index" (of points in the zone) and "covmat".
+
+    See Also
+    --------
+    PestUtilsLib.build_covar_matrix_2d : Equivalent function in the shared
+        library.
+    """
+    vario = _Variogram2D(ec, nc, zn, vartype, nugget, aa, sill, anis, bearing)
+    return _dense_covar_matrix(vario, storage, dtype, nthreads)
+
+
+def build_covar_matrix_3d(
+    ec: npt.ArrayLike,
+    nc: npt.ArrayLike,
+    zc: npt.ArrayLike,
+    zn: int | npt.ArrayLike,
+    vartype: int | str | enum.VarioType,
+    nugget: float | npt.ArrayLike,
+    sill: float | npt.ArrayLike,
+    ahmax: float | npt.ArrayLike,
+    ahmin: float | npt.ArrayLike,
+    avert: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    dip: float | npt.ArrayLike,
+    rake: float | npt.ArrayLike,
+    storage: str = "full",
+    dtype: npt.DTypeLike = np.float64,
+    nthreads: int | None = None,
+):
+    """Calculate a covariance matrix for a set of 3D pilot points.
+
+    Parameters
+    ----------
+    ec, nc, zc : array_like
+        Pilot point coordinates, each 1D array with shape (npts,).
+    zn : int or array_like
+        Pilot point zones, integer or 1D array with shape (npts,).
+    vartype : int, str or enum.VarioType
+        Variogram type, where 1:spher, 2:exp, 3:gauss, 4:pow.
+    nugget, sill : float or array_like
+        Variogram parameters, each float or 1D array with shape (npts,).
+    ahmax, ahmin, avert : float or array_like
+        Variogram a-values in 3 orientations, each float or 1D array with
+        shape (npts,).
+    bearing, dip, rake : float or array_like
+        Variogram angles, each float or 1D array with shape (npts,).
+    storage : {"full", "packed", "blocks"}, default "full"
+        Use "full" for a symmetric matrix with shape (npts, npts), "packed"
+        for the upper triangle in LAPACK packed storage with shape
+        (npts * (npts + 1) // 2,), or "blocks" for a list of covariance
+        matrices for each zone, since points in different zones do not
+        covary.
+    dtype : float32 or float64, default float64
+        Data type of returned matrices.
+    nthreads : int, optional
+        Number of threads used to evaluate tiles of the matrix. Default is
+        the number of CPUs.
+
+    Returns
+    -------
+    npt.NDArray or list of dict
+        Covariance matrix, or for "blocks" a list of dicts with keys "zone",
+        "index" (of points in the zone) and "covmat".
+
+    See Also
+    --------
+    PestUtilsLib.build_covar_matrix_3d : Equivalent function in the shared
+        library.
+    """
+    vario = _Variogram3D(
+        ec,
+        nc,
+        zc,
+        zn,
+        vartype,
+        nugget,
+        sill,
+        ahmax,
+        ahmin,
+        avert,
+        bearing,
+        dip,
+        rake,
+    )
+    return _dense_covar_matrix(vario, storage, dtype, nthreads)
+
+
+class CovarianceOperator:
+    """Pilot point covariance matrix as a linear operator.
+
+    The covariance matrix is not stored. Products are evaluated from tiles
+    of covariances of each zone, or from a sparse matrix truncated at a
+    covariance threshold, and realisations are drawn using the Cholesky
+    factor of each zone block, since points in different zones do not
+    covary. Use :meth:`from_2d` or :meth:`from_3d` to create an instance.
+
+    Parameters
+    ----------
+    vario : _Variogram
+        Variogram specifications of the pilot points.
+    threshold : float, optional
+        If specified, products use a sparse matrix with covariances that
+        have an absolute value greater than threshold (requires scipy).
+        Default evaluates all covariances in each zone.
+    nthreads : int, optional
+        Number of threads used to evaluate tiles. Default is the number of
+        CPUs.
+
+    Notes
+    -----
+    Cholesky factors are kept for repeated draws, and only need storage for
+    the block of each zone. Where variogram parameters vary within a zone,
+    factors are evaluated from the block adjusted to be positive definite, as
+    for :func:`build_covar_matrix_2d`, but products use covariances without
+    this adjustment.
+    """
+
+    def __init__(
+        self,
+        vario: _Variogram,
+        threshold: float | None = None,
+        nthreads: int | None = None,
+    ):
+        self._vario = vario
+        self.threshold = threshold
+        self.nthreads = _check_nthreads(nthreads)
+        self.zones = [int(zone) for zone in np.unique(vario.zn)]
+        self._index = {zone: np.flatnonzero(vario.zn == zone) for zone in self.zones}
+        self._sparse = None
+        self._factors = {}  # type: dict[int, npt.NDArray[np.float64]]
+        if threshold is not None:
+            self._sparse = _sparse_covar_matrix(vario, threshold, "csr")
+
+    @classmethod
+    def from_2d(
+        cls,
+        ec: npt.ArrayLike,
+        nc: npt.ArrayLike,
+        zn: int | npt.ArrayLike,
+        vartype: int | str | enum.VarioType,
+        nugget: float | npt.ArrayLike,
+        aa: float | npt.ArrayLike,
+        sill: float | npt.ArrayLike,
+        anis: float | npt.ArrayLike,
+        bearing: float | npt.ArrayLike,
+        threshold: float | None = None,
+        nthreads: int | None = None,
+    ) -> CovarianceOperator:
+        """Create a covariance operator for a set of 2D pilot points.
+
+        Parameters are as for :func:`build_covar_matrix_2d`, with threshold
+        and nthreads described for the class.
+        """
+        vario = _Variogram2D(ec, nc, zn, vartype, nugget, aa, sill, anis, bearing)
+        return cls(vario, threshold, nthreads)
+
+    @classmethod
+    def from_3d(
+        cls,
+        ec: npt.ArrayLike,
+        nc: npt.ArrayLike,
+        zc: npt.ArrayLike,
+        zn: int | npt.ArrayLike,
+        vartype: int | str | enum.VarioType,
+        nugget: float | npt.ArrayLike,
+        sill: float | npt.ArrayLike,
+        ahmax: float | npt.ArrayLike,
+        ahmin: float | npt.ArrayLike,
+        avert: float | npt.ArrayLike,
+        bearing: float | npt.ArrayLike,
+        dip: float | npt.ArrayLike,
+        rake: float | npt.ArrayLike,
+        threshold: float | None = None,
+        nthreads: int | None = None,
+    ) -> CovarianceOperator:
+        """Create a covariance operator for a set of 3D pilot points.
+
+        Parameters are as for :func:`build_covar_matrix_3d`, with threshold
+        and nthreads described for the class.
+        """
+        vario = _Variogram3D(
+            ec,
+            nc,
+            zc,
+            zn,
+            vartype,
+            nugget,
+            sill,
+            ahmax,
+            ahmin,
+            avert,
+            bearing,
+            dip,
+            rake,
+        )
+        return cls(vario, threshold, nthreads)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """Shape of the covariance matrix."""
+        return len(self._vario), len(self._vario)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Data type of the covariance matrix."""
+        return np.dtype(np.float64)
+
+    def zone_index(self, zone: int) -> npt.NDArray[np.intp]:
+        """Return indices of points in a zone."""
+        if zone not in self._index:
+            raise ValueError(f"zone {zone} not found")
+        return self._index[zone]
+
+    def diagonal(self) -> npt.NDArray[np.float64]:
+        """Return the variance of each point."""
+        return self._vario.diagonal()
+
+    def _zone_matvec(
+        self, idx: npt.NDArray[np.intp], x: npt.NDArray[np.float64]
+    ) -> npt.NDArray[np.float64]:
+        def product(r0, r1):
+            tile = _covariance_tile(self._vario, idx, r0, r1)
+            # the transpose of the tile right of the diagonal square
+            return r0, r1, tile @ x[r0:], tile[:, r1 - r0 :].T @ x[r0:r1]
+
+        y = np.zeros_like(x)
+        for r0, r1, rows, cols in _map_tiles(product, len(idx), self.nthreads):
+            y[r0:r1] += rows
+            y[r1:] += cols
+        return y
+
+    def matvec(self, x: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        """Multiply the covariance matrix by a vector or matrix.
+
+        Parameters
+        ----------
+        x : array_like
+            Array with shape (npts,) or (npts, k).
+
+        Returns
+        -------
+        npt.NDArray[np.float64]
+            Product with the same shape as x.
+        """
+        x = np.asarray(x, np.float64)
+        if x.ndim not in (1, 2) or x.shape[0] != self.shape[0]:
+            raise ValueError(
+                f"x must have shape ({self.shape[0]},) or ({self.shape[0]}, k)"
+            )
+        if self._sparse is not None:
+            return self._sparse @ x
+        y = np.empty_like(x)
+        for idx in self._index.values():
+            y[idx] = self._zone_matvec(idx, x[idx])
+        return y
+
+    def __matmul__(self, x: npt.ArrayLike) -> npt.NDArray[np.float64]:
+        return self.matvec(x)
+
+    def aslinearoperator(self):
+        """Return a :class:`scipy.sparse.linalg.LinearOperator` (requires scipy)."""
+        from scipy.sparse.linalg import LinearOperator
+
+        return LinearOperator(
+            self.shape,
+            matvec=self.matvec,
+            rmatvec=self.matvec,
+            matmat=self.matvec,
+            rmatmat=self.matvec,
+            dtype=self.dtype,
+        )
+
+    def cholesky(self, zone: int) -> npt.NDArray[np.float64]:
+        """Return the lower Cholesky factor of the covariance block of a zone.
+
+        Parameters
+        ----------
+        zone : int
+            Zone number. Rows and columns of the factor follow the points of
+            the zone, from :meth:`zone_index`.
+
+        Returns
+        -------
+        npt.NDArray[np.float64]
+            Lower triangular matrix L, where L @ L.T is the covariance block.
+        """
+        factor = self._factors.get(zone)
+        if factor is not None:
+            return factor
+        idx = self.zone_index(zone)
+        nz = len(idx)
+        block = np.empty((nz, nz))
+
+        def store(r0, r1, tile):
+            block[r0:r1, r0:] = tile
+            block[r0:, r0:r1] = tile.T
+
+        _zone_covariance(self._vario, idx, store, self.nthreads)
+        try:
+            factor = np.linalg.cholesky(block)
+        except np.linalg.LinAlgError:
+            raise ValueError(
+                f"covariance matrix of zone {zone} is not positive definite; "
+                "consider a nugget"
+            ) from None
+        self._factors[zone] = factor
+        return factor
+
+    def draw(
+        self,
+        nreal: int,
+        mean: float | npt.ArrayLike = 0.0,
+        seed: int | np.random.Generator | None = None,
+    ) -> npt.NDArray[np.float64]:
+        """Draw correlated realisations of the pilot point values.
+
+        Parameters
+        ----------
+        nreal : int
+            Number of realisations.
+        mean : float or array_like, default 0.0
+            Mean of each point, float or 1D array with shape (npts,).
+        seed : int or numpy.random.Generator, optional
+            Seed or generator for standard normal deviates.
+
+        Returns
+        -------
+        npt.NDArray[np.float64]
+            Realisations with shape (nreal, npts).
+        """
+        if nreal < 1:
+            raise ValueError("nreal must be 1 or more")
+        rng = np.random.default_rng(seed)
+        reals = np.empty((nreal, self.shape[0]))
+        for zone, idx in self._index.items():
+            factor = self.cholesky(zone)
+            reals[:, idx] = rng.standard_normal((nreal, len(idx))) @ factor.T
+        reals += np.broadcast_to(np.asarray(mean, np.float64), self.shape[:1])
+        return reals
@@ -1,7 +1,7 @@
 """Low-level Fortran-Python ctypes functions."""
 from __future__ import annotations
 
-from ctypes import ARRAY, CDLL, POINTER, c_char, c_double, c_int
+from ctypes import ARRAY, CDLL, CFUNCTYPE, POINTER, c_char, c_double, c_int
 
 from numpy.ctypeslib import ndpointer
 
@@ -14,6 +14,9 @@ _misc_lengths = {
     "LENFLOWTYPE": 17,
 }
 
+# int callback(int done, int total), used by set_progress_callback
+progress_callback_type = CFUNCTYPE(c_int, c_int, c_int)
+
 
 def get_dimvar_int(lib: CDLL, name: str) -> int:
     """Get dimvar constant integer from library instance.
@@ -149,6 +152,41 @@ def prototype(lib) -> None:
     )
     lib.interp_from_structured_grid.restype = c_int
 
+    # calc_structured_interp_factors(
+    #   gridname,npts,ecoord,ncoord,layer,factorfile,factorfiletype,
+    #   interp_success)
+    lib.calc_structured_interp_factors.argtypes = (
+        POINTER(gridname_t),  # gridname, in
+        POINTER(c_int),  # npts, in
+        ndpointer(c_double, ndim=1, flags="F"),  # ecoord, in
+        ndpointer(c_double, ndim=1, flags="F"),  # ncoord, in
+        ndpointer(c_int, ndim=1, flags="F"),  # layer, in
+        POINTER(filename_t),  # factorfile, in
+        POINTER(c_int),  # factorfiletype, in
+        ndpointer(c_int, ndim=1, flags=("F", "W")),  # interp_success, out
+    )
+    lib.calc_structured_interp_factors.restype = c_int
+
+    # interp_from_structured_grid_using_factors(
+    #   depvarfile,factorfile,factorfiletype,isim,iprec,ntime,vartype,
+    #   interpthresh,nointerpval,npts,nproctime,simtime,simstate)
+    lib.interp_from_structured_grid_using_factors.argtypes = (
+        POINTER(filename_t),  # depvarfile, in
+        POINTER(filename_t),  # factorfile, in
+        POINTER(c_int),  # factorfiletype, in
+        POINTER(c_int),  # isim, in
+        POINTER(c_int),  # iprec, in
+        POINTER(c_int),  # ntime, in
+        POINTER(vartype_t),  # vartype, in
+        POINTER(c_double),  # interpthresh, in
+        POINTER(c_double),  # nointerpval, in
+        POINTER(c_int),  # npts, in
+        POINTER(c_int),  # nproctime, out
+        ndpointer(c_double, ndim=1, flags=("F", "W")),  # simtime(ntime), out
+        ndpointer(c_double, ndim=2, flags=("F", "W")),  # simstate(ntime,npts), out
+    )
+    lib.interp_from_structured_grid_using_factors.restype = c_int
+
     # interp_to_obstime(
     #   nsimtime,nproctime,npts,simtime,simval,interpthresh,how_extrap,
     #   time_extrap,nointerpval,nobs,obspoint,obstime,obssimval)
@@ -483,6 +521,21 @@ def prototype(lib) -> None:
     lib.initialize_randgen.argtypes = (POINTER(c_int),)  # iseed, in
     lib.initialize_randgen.restype = c_int
 
+    # set_progress_callback(callback, interval)
+    lib.set_progress_callback.argtypes = (
+        progress_callback_type,  # callback, in
+        POINTER(c_int),  # interval, in
+    )
+    lib.set_progress_callback.restype = c_int
+
+    # set_num_threads(nthreads)
+    lib.set_num_threads.argtypes = (POINTER(c_int),)  # nthreads, in
+    lib.set_num_threads.restype = c_int
+
+    # get_num_threads(nthreads)
+    lib.get_num_threads.argtypes = (POINTER(c_int),)  # nthreads, out
+    lib.get_num_threads.restype = c_int
+
     # fieldgen2d_sva(
     #   nnode,ec,nc,area,active,mean,var,aa,anis,bearing,
     #   transtype,avetype,power,ldrand,nreal,randfield)
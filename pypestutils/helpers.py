@@ -1,11 +1,40 @@
 from __future__ import annotations
 
+import collections
+import contextlib
 import os
+import sys
+import tempfile
+import threading
+from typing import TYPE_CHECKING
+
 import numpy as np
-import pandas as pd
 
 from .pestutilslib import PestUtilsLib
 
+if TYPE_CHECKING:
+    # pandas is slow to import, so it is only imported by functions that use it
+    import pandas as pd
+
+
+def _is_dataframe(obj) -> bool:
+    """Check if obj is a pandas DataFrame, without importing pandas."""
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(obj, pd.DataFrame)
+
+
+def _intermediate_dir(fac_dir=None):
+    """Context manager for a per-call directory for intermediate files,
+    which is removed on exit.  The directory is created in the default
+    location of the tempfile module, which may be set with TMPDIR (for
+    example, to use tmpfs).  If fac_dir is given, it is created if needed
+    and used instead, and files remain there for inspection
+    """
+    if fac_dir is not None:
+        os.makedirs(fac_dir, exist_ok=True)
+        return contextlib.nullcontext(fac_dir)
+    return tempfile.TemporaryDirectory(prefix="pypestutils_")
+
 
 def mod2obs_mf6(gridinfo_fname: str,depvar_fname: str,obscsv_fname: str ,model_type: int,start_datetime: str | pd.TimeStamp,depvar_ftype=1,
                 depvar_name="head",interp_thresh=1.0e+30,no_interp_val=1.0e+30,model_timeunit="d",
@@ -44,6 +73,7 @@ def mod2obs_mf6(gridinfo_fname: str,depvar_fname: str,obscsv_fname: str ,model_t
     interpolated_results: pd.DataFrame
         temporally interpolated simulated results at observation locations (ie mod2obs)
     """
+    import pandas as pd
 
     for fname in [gridinfo_fname,depvar_fname]:
         assert os.path.exists(fname),"file {0} not found".format(fname)
@@ -80,11 +110,6 @@ def mod2obs_mf6(gridinfo_fname: str,depvar_fname: str,obscsv_fname: str ,model_t
     if isinstance(start_datetime,str):
         start_datetime = pd.to_datetime(start_datetime)
 
-    depvar_info = lib.inquire_modflow_binary_file_specs(depvar_fname,depvar_fname+".out.csv",model_type,depvar_ftype)    
-    depvar_df = pd.read_csv(depvar_fname+".out.csv")
-    depvar_df.columns = [c.lower() for c in depvar_df.columns]
-    #print(depvar_df)
-
     if isinstance(obscsv_fname,str):
         if not os.path.exists(obscsv_fname):
             raise Exception("obscsv_fname '{0}' not found".format(obscsv_fname))
@@ -100,16 +125,25 @@ def mod2obs_mf6(gridinfo_fname: str,depvar_fname: str,obscsv_fname: str ,model_t
         if req_col not in obsdf.columns:
             raise Exception("observation dataframe missing column '{0}'".format(req_col))
     usitedf = obsdf.groupby("site").first()
-    pth = os.path.split(depvar_fname)[0]
-    fac_file = os.path.join(pth,"obs_interp_fac.bin")
-    bln_file = fac_file.replace(".bin",".bln")
-    interp_fac_results = lib.calc_mf6_interp_factors("grid",usitedf.x.values,usitedf.y.values,usitedf.layer.values,fac_file,"binary",bln_file)
-    if 0 in interp_fac_results:
-        print("warning: the following site(s) failed to have interpolation factors calculated:")
-        fsites = usitedf.site.iloc[interp_fac_results==0].to_list()
-        print(fsites)
-    all_results = lib.interp_from_mf6_depvar_file(depvar_fname,fac_file,"binary",depvar_info["ntime"],"head",interp_thresh,True,
-        no_interp_val,usitedf.shape[0])
+
+    # intermediate files are written to a per-call directory, so that 
+    # concurrent calls do not overwrite each other
+    with _intermediate_dir() as tmp_dir:
+        depvar_csv = os.path.join(tmp_dir,os.path.basename(depvar_fname)+".out.csv")
+        depvar_info = lib.inquire_modflow_binary_file_specs(depvar_fname,depvar_csv,model_type,depvar_ftype)    
+        depvar_df = pd.read_csv(depvar_csv)
+        depvar_df.columns = [c.lower() for c in depvar_df.columns]
+        #print(depvar_df)
+
+        fac_file = os.path.join(tmp_dir,"obs_interp_fac.bin")
+        bln_file = fac_file.replace(".bin",".bln")
+        interp_fac_results = lib.calc_mf6_interp_factors("grid",usitedf.x.values,usitedf.y.values,usitedf.layer.values,fac_file,"binary",bln_file)
+        if 0 in interp_fac_results:
+            print("warning: the following site(s) failed to have interpolation factors calculated:")
+            fsites = usitedf.site.iloc[interp_fac_results==0].to_list()
+            print(fsites)
+        all_results = lib.interp_from_mf6_depvar_file(depvar_fname,fac_file,"binary",depvar_info["ntime"],"head",interp_thresh,True,
+            no_interp_val,usitedf.shape[0])
     datetimes = start_datetime+pd.to_timedelta(all_results["simtime"],unit=model_timeunit)
     allresults_df = pd.DataFrame(all_results["simstate"],index=datetimes,columns=usitedf.index)
     allresults_df.to_csv(depvar_fname+".all.csv")
@@ -132,22 +166,167 @@ def mod2obs_mf6(gridinfo_fname: str,depvar_fname: str,obscsv_fname: str ,model_t
     lib.free_all_memory()
     return {"all_results":allresults_df,"interpolated_results":obsdf}
 
-def get_grid_info_from_gridspec(gridspec_fname: str) -> dict:
-    """Read structured grid info from a PEST-style grid specificatin file
+# number of grids held by the GridInfo.from_file cache
+GRID_INFO_CACHE_SIZE = 8
+_grid_info_cache = collections.OrderedDict()
+_grid_info_lock = threading.Lock()
+
+
+def clear_grid_info_cache():
+    """Remove all grids from the GridInfo.from_file cache"""
+    with _grid_info_lock:
+        _grid_info_cache.clear()
+
+
+class GridInfo(object):
+    """Grid information from a MODFLOW-6 binary grid file or a
+    PEST-style grid specification file, which can be passed to the
+    helpers in place of a grid info file name
+
     Parameters
     ----------
-    gridspec_fname : str
-        PEST-style grid specification file
-    
-    Returns
-    -------
-    grid_info: dict
-        grid information
+    data: dict
+        grid information, as from `get_grid_info_from_mf6_grb` or
+        `get_grid_info_from_gridspec`
+    fname: str (optional)
+        the file the grid information was read from
+    geometry: dict (optional)
+        cell "area", "height" and "idomain" arrays of a MODFLOW-6 grid.
+        If None, these are read from `fname` on first use of the
+        `geometry` property
+
+    Note
+    ----
+    Arrays are read-only, as GridInfo objects are shared through the cache
+    of `GridInfo.from_file`.  The `get_*` helper functions return copies.
     """
 
-    if not os.path.exists(gridspec_fname):
-        raise FileNotFoundError(gridspec_fname)
-    sr = SpatialReference.from_gridspec(gridspec_fname)
+    def __init__(self, data: dict, fname=None, geometry=None):
+        self.fname = fname
+        self._data = _read_only(data)
+        self._geometry = None if geometry is None else _read_only(geometry)
+
+    @classmethod
+    def from_file(cls, fname, cache=True) -> GridInfo:
+        """Read grid info from a MODFLOW-6 binary grid file or a
+        PEST-style grid specification file.  Grids are cached by file
+        path, modification time and size, and the least recently used
+        grids are dropped beyond `GRID_INFO_CACHE_SIZE` grids
+        Parameters
+        ----------
+        fname: str
+            MODFLOW-6 binary grid file or grid specification file
+        cache: bool
+            flag to use the cache.  Default is True
+
+        Returns
+        -------
+        grid_info: GridInfo
+            grid information
+        """
+        fname = os.fspath(fname)
+        if not os.path.exists(fname):
+            raise FileNotFoundError(fname)
+        stat = os.stat(fname)
+        key = (os.path.abspath(fname), stat.st_mtime_ns, stat.st_size)
+        if cache:
+            with _grid_info_lock:
+                if key in _grid_info_cache:
+                    _grid_info_cache.move_to_end(key)
+                    return _grid_info_cache[key]
+        with open(fname, "rb") as f:
+            is_grb = f.read(4) == b"GRID"
+        # MODFLOW-6 binary grid files start with a "GRID DIS" or
+        # "GRID DISV" header, anything else is tried as a grid specification
+        if is_grb:
+            grid_info = cls(_read_mf6_grb(fname), fname)
+        else:
+            try:
+                sr = SpatialReference.from_gridspec(fname)
+            except Exception:
+                raise Exception("error getting grid info from file '{0}'".format(fname))
+            grid_info = cls(_sr_grid_info(sr), fname)
+        if cache and GRID_INFO_CACHE_SIZE > 0:
+            with _grid_info_lock:
+                _grid_info_cache[key] = grid_info
+                while len(_grid_info_cache) > GRID_INFO_CACHE_SIZE:
+                    _grid_info_cache.popitem(last=False)
+        return grid_info
+
+    @property
+    def is_mf6(self) -> bool:
+        """True if from a MODFLOW-6 binary grid file
+        """
+        return "idis" in self._data
+
+    @property
+    def geometry(self):
+        """cell "area", "height" and "idomain" arrays of a MODFLOW-6 grid,
+        read from the binary grid file when first used, or None if not
+        available
+        """
+        if self._geometry is None and self.is_mf6 and self.fname is not None:
+            self._geometry = _read_only(_get_mf6_cell_geometry(self.fname))
+        return self._geometry
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def keys(self):
+        return self._data.keys()
+
+    def to_dict(self) -> dict:
+        """grid information, with copies of arrays
+        """
+        return {
+            key: value.copy() if isinstance(value, np.ndarray) else value
+            for key, value in self._data.items()
+        }
+
+    def to_2d_dict(self, layer=None) -> dict:
+        """2-D grid information, as from `get_2d_grid_info_from_file`
+        Parameters
+        ----------
+        layer: int (optional)
+            the layer number to use for 2-D.  If None and
+            grid info is 3-D, a value of 1 is used
+
+        Returns
+        -------
+        grid_info: dict
+            grid information
+        """
+        if self.is_mf6:
+            return get_2d_grid_info_from_mf6_grb(self,layer=layer)
+        return self.to_dict()
+
+
+def _read_only(data: dict) -> dict:
+    """Copy of a dict, with read-only views of arrays"""
+    result = {}
+    for key, value in data.items():
+        if isinstance(value, np.ndarray):
+            value = value.view()
+            value.flags.writeable = False
+        result[key] = value
+    return result
+
+
+def _read_mf6_grb(grb_fname: str) -> dict:
+    """Read grid info and cell centres from a MODFLOW-6 binary grid file"""
+    lib = PestUtilsLib()
+    data = lib.install_mf6_grid_from_file("grid",grb_fname)
+    data["x"],data["y"],data["z"] = lib.get_cell_centres_mf6("grid",data["ncells"])
+    lib.uninstall_mf6_grid("grid")
+    lib.free_all_memory()
+    return data
+
+
+def _sr_grid_info(sr) -> dict:
+    """Grid info from a SpatialReference"""
     return {
         "x": sr.xcentergrid.flatten(),
         "y": sr.ycentergrid.flatten(),
@@ -159,11 +338,30 @@ def get_grid_info_from_gridspec(gridspec_fname: str) -> dict:
     }
 
 
+def get_grid_info_from_gridspec(gridspec_fname: str) -> dict:
+    """Read structured grid info from a PEST-style grid specificatin file
+    Parameters
+    ----------
+    gridspec_fname : str or GridInfo
+        PEST-style grid specification file
+    
+    Returns
+    -------
+    grid_info: dict
+        grid information
+    """
+    if not isinstance(gridspec_fname, GridInfo):
+        gridspec_fname = GridInfo.from_file(gridspec_fname)
+    if gridspec_fname.is_mf6:
+        raise Exception("grid info is not from a grid specification file")
+    return gridspec_fname.to_dict()
+
+
 def get_grid_info_from_mf6_grb(grb_fname: str) -> dict:
     """Read grid info from a MODFLOW-6 binary grid file
     Parameters
     ----------
-    grb_fname: str
+    grb_fname: str or GridInfo
         MODFLOW-6 binary grid file
     
     Returns
@@ -171,22 +369,19 @@ def get_grid_info_from_mf6_grb(grb_fname: str) -> dict:
     grid_info: dict
         grid information
     """
-    if not os.path.exists(grb_fname):
-        raise FileNotFoundError(grb_fname)
-    lib = PestUtilsLib()
-    data = lib.install_mf6_grid_from_file("grid",grb_fname)
-    data["x"],data["y"],data["z"] = lib.get_cell_centres_mf6("grid",data["ncells"])
-    lib.uninstall_mf6_grid("grid")
-    lib.free_all_memory()
-    return data
+    if not isinstance(grb_fname, GridInfo):
+        grb_fname = GridInfo.from_file(grb_fname)
+    if not grb_fname.is_mf6:
+        raise Exception("grid info is not from a MODFLOW-6 binary grid file")
+    return grb_fname.to_dict()
 
 def get_2d_grid_info_from_file(fname: str,layer=None) -> dict:
     """Try to read 2-D grid info from a variety of filename sources
     Parameters
     ----------
     fname: str
-        filename that stores 2-D grid info.  Optionally, a pandas DataFrame
-        at least columns 'x','y' and possibly 'layer'.
+        filename that stores 2-D grid info.  Optionally, a GridInfo, or
+        a pandas DataFrame at least columns 'x','y' and possibly 'layer'.
     layer: int (optional)
         the layer number to use for 2-D.  If None and 
         grid info is 3-D, a value of 1 is used
@@ -198,25 +393,23 @@ def get_2d_grid_info_from_file(fname: str,layer=None) -> dict:
     """ 
 
     grid_info = None
-    if isinstance(fname,str):
+    if isinstance(fname,GridInfo):
+        grid_info = fname.to_2d_dict(layer=layer)
+    elif isinstance(fname,(str,os.PathLike)):
+        fname = os.fspath(fname)
         if not os.path.exists(fname):
             raise FileNotFoundError(fname)
         if fname.lower().endswith(".csv"):
+            import pandas as pd
+
             grid_info = pd.read_csv(fname)
             grid_info.columns = [c.lower() for c in grid_info.columns]
             fname = grid_info # for  checks and processing below
             
         else:
-            try:
-                grid_info = get_grid_info_from_gridspec(fname)
-            except Exception as e1:
-                try:
-                    grid_info = get_2d_grid_info_from_mf6_grb(fname,layer=layer)
-                except Exception as e2:
-                    
-                    raise Exception("error getting grid info from file '{0}'".format(fname))
+            grid_info = GridInfo.from_file(fname).to_2d_dict(layer=layer)
         
-    if isinstance(fname,pd.DataFrame):
+    if _is_dataframe(fname):
         if 'x' not in fname.columns:
             raise Exception("required 'x' column not found in grid info dataframe")
         if 'y' not in fname.columns:
@@ -233,7 +426,7 @@ def get_2d_grid_info_from_mf6_grb(grb_fname: str,layer=None) -> dict:
     """Read grid info from a MODFLOW-6 binary grid file
     Parameters
     ----------
-    grb_fname: str
+    grb_fname: str or GridInfo
         MODFLOW-6 binary grid file
     layer: int (optional)
         the layer number to use for 2-D.  If None,
@@ -242,43 +435,40 @@ def get_2d_grid_info_from_mf6_grb(grb_fname: str,layer=None) -> dict:
     Returns
     -------
     grid_info: dict
-        grid information
+        grid information, with cell arrays of the layer
     """
-    grid_info = get_grid_info_from_mf6_grb(grb_fname)
-    nnodes = grid_info["ncells"]
-    x = grid_info["x"].copy()
-    y = grid_info["y"].copy()
-    nrow,ncol = None,None
-    if grid_info["idis"] == 1:
-        nlay = grid_info["ndim3"]
-        if layer is not None:
-            if layer > nlay:
-                raise Exception("user-supplied 'layer' {0} greater than nlay {1}".format(layer,nlay))
-        else:
-            layer = 1
-        nrow = grid_info["ndim2"]
-        ncol = grid_info["ndim1"]
-        x = x.reshape((nlay,nrow,ncol))[layer-1]
-        y = y.reshape((nlay,nrow,ncol))[layer-1]
-        grid_info["nnodes"] = nrow * ncol
-        grid_info["x"] = x
-        grid_info["y"] = y
+    if not isinstance(grb_fname, GridInfo):
+        grb_fname = GridInfo.from_file(grb_fname)
+    if not grb_fname.is_mf6:
+        raise Exception("grid info is not from a MODFLOW-6 binary grid file")
+    if grb_fname["idis"] not in (1,2):
+        return grb_fname.to_dict()
+    nlay = grb_fname["ndim3"]
+    if layer is not None:
+        if layer > nlay:
+            raise Exception("user-supplied 'layer' {0} greater than nlay {1}".format(layer,nlay))
+    else:
+        layer = 1
+    if grb_fname["idis"] == 1:
+        nrow = grb_fname["ndim2"]
+        ncol = grb_fname["ndim1"]
+        layer_shape = (nrow,ncol)
+    else:
+        layer_shape = (grb_fname["ndim1"],)
+    # cell arrays are sliced to the layer from the read-only arrays of the
+    # grid info, so that only the layer is copied
+    grid_info = {}
+    for key in grb_fname.keys():
+        value = grb_fname[key]
+        if isinstance(value, np.ndarray):
+            if value.shape == (grb_fname["ncells"],):
+                value = value.reshape((nlay,) + layer_shape)[layer-1]
+            value = value.copy()
+        grid_info[key] = value
+    grid_info["nnodes"] = int(np.prod(layer_shape))
+    if grb_fname["idis"] == 1:
         grid_info["nrow"] = nrow
         grid_info["ncol"] = ncol
-
-    elif grid_info["idis"] == 2:
-        nlay = grid_info["ndim3"]
-        if layer is not None:
-            if layer > nlay:
-                raise Exception("user-supplied 'layer' {0} greater than nlay {1}".format(layer,nlay))
-        else:
-            layer = 1
-        ncpl = grid_info["ndim1"]
-        x = x.reshape((nlay,ncpl))[layer-1]
-        y = y.reshape((nlay,ncpl))[layer-1]
-        grid_info["nnodes"] = ncpl
-        grid_info["x"] = x
-        grid_info["y"] = y
     return grid_info
 
 
@@ -289,15 +479,19 @@ def get_2d_pp_info_structured_grid(
     name_prefix="pp"
 ) -> pandas.DataFrame:
     """Create a grid of pilot point locations for a 
-    2-D structured grid
+    2-D structured grid, or a 2-D unstructured (DISV) grid
     Parameters
     ----------
     pp_space: int
-        row and column spacing for pilot point locations
-    gridinfo_fname: str
+        row and column spacing for pilot point locations.  For
+        unstructured grids, pilot points are placed at the active
+        cell nearest to the centre of each square bin, with sides of 
+        pp_space times the average cell spacing
+    gridinfo_fname: str or GridInfo
         file contain grid information
     array_dict: dict (optional)
-        a dict of 2-D grid-shape arrays used to populate 
+        a dict of 2-D grid-shape arrays (or 1-D arrays of shape 
+        (ncpl,) for unstructured grids) used to populate 
         pilot point attributes.  Special values include:
         "value","zone","bearing","aniso" and "corrlen", 
         although any number of arrays can be passed and will
@@ -308,66 +502,109 @@ def get_2d_pp_info_structured_grid(
     Returns
     -------
     ppdf: pd.DataaFrame
-        dataframe of pilot point information
+        dataframe of pilot point information, with columns "i" and "j"
+        for structured grids, or "node" for unstructured grids
 
     """
+    import pandas as pd
 
     grid_info = get_2d_grid_info_from_file(gridinfo_fname)
-    pname, px, py, pval = [], [], [], []
-    pi, pj = [], []
-    parr_dict = {k:[] for k in array_dict.keys()}
-    count = 0
-    nrow = grid_info["nrow"]
-    ncol = grid_info["ncol"]
+    nrow = grid_info.get("nrow",None)
+    ncol = grid_info.get("ncol",None)
     nlay = grid_info.get("nlay",1)
 
     zone_array = array_dict.get("zone",None)
 
-    x = grid_info['x']
-    y = grid_info['y']
-    x = x.reshape((nlay,nrow,ncol))[0,:,:]
-    y = y.reshape((nlay,nrow,ncol))[0,:,:]
-    if nrow is None:
-        raise Exception("unstructured grid loaded from gridinfo_fname '{0}'".format(gridspec_fname))
-    for i in range(int(pp_space / 2), nrow, pp_space):
-        for j in range(int(pp_space / 2), ncol, pp_space):
-            if zone_array is not None and zone_array[i, j] <= 0:
-                continue
-            px.append(x[i, j])
-            py.append(y[i, j])
-            #if zone_array is not None:
-            #    pzone.append(zone_array[i, j])
-            #else:
-            #    pzone.append(1)
-
-            pname.append(name_prefix + "{0}".format(count))
-            pi.append(i)
-            pj.append(j)
-            count += 1
-    df = pd.DataFrame(
-        {
-            "ppname": pname,
-            "x": px,
-            "y": py,
-            "i": pi,
-            "j": pj,
-        },
-        index=pname,
-    )
-    df.loc[:,"value"] = 1.0
-    df.loc[:, "bearing"] = 0.0
-    df.loc[:, "aniso"] = 1.0
-    delx = pp_space * 5 * int((x.max() - x.min()) / float(ncol))
-    dely = pp_space * 5 * int((y.max() - y.min()) / float(nrow))
-    df.loc[:, "corrlen"] = max(delx,dely)  # ?
-    df.loc[:,"zone"] = 1
+    x = np.asarray(grid_info['x'],dtype=float)
+    y = np.asarray(grid_info['y'],dtype=float)
+    if nrow is None or ncol is None:
+        x = x.ravel()
+        y = y.ravel()
+        spacing = _get_average_cell_spacing(x,y)
+        idx = _get_2d_pp_nodes_unstructured(pp_space,spacing,x,y,zone_array)
+        loc = {"node": idx}
+        delx = dely = pp_space * 5 * spacing
+    else:
+        x = x.reshape((nlay,nrow,ncol))[0,:,:]
+        y = y.reshape((nlay,nrow,ncol))[0,:,:]
+        pi, pj = np.meshgrid(
+            np.arange(int(pp_space / 2), nrow, pp_space),
+            np.arange(int(pp_space / 2), ncol, pp_space),
+            indexing="ij",
+        )
+        pi = pi.ravel()
+        pj = pj.ravel()
+        if zone_array is not None:
+            keep = np.asarray(zone_array)[pi, pj] > 0
+            pi = pi[keep]
+            pj = pj[keep]
+        idx = (pi, pj)
+        loc = {"i": pi, "j": pj}
+        delx = pp_space * 5 * int((x.max() - x.min()) / float(ncol))
+        dely = pp_space * 5 * int((y.max() - y.min()) / float(nrow))
+    px = x[idx]
+    pname = np.char.add(name_prefix, np.arange(len(px)).astype(str))
+    columns = {"ppname": pname, "x": px, "y": y[idx], **loc}
+    columns["value"] = 1.0
+    columns["bearing"] = 0.0
+    columns["aniso"] = 1.0
+    columns["corrlen"] = max(delx,dely)  # ?
+    columns["zone"] = 1
     for k,arr in array_dict.items():
-        df.loc[:,k] = arr[df.i,df.j]
+        columns[k] = np.asarray(arr)[idx]
+    df = pd.DataFrame(columns, index=pname)
     df["zone"] = df.zone.astype(int)
 
     return df
 
 
+def _get_average_cell_spacing(x, y):
+    """Estimate the average cell spacing of a 2-D grid from the extent
+    of cell centres, which is exact for a regular grid of square cells
+    """
+    n = len(x)
+    px = np.ptp(x)
+    py = np.ptp(y)
+    if n < 2 or px + py == 0.0:
+        return 1.0
+    # (px + d) * (py + d) = n * d ** 2
+    return ((px + py) + np.sqrt((px + py) ** 2 + 4 * (n - 1) * px * py)) / (2 * (n - 1))
+
+
+def _get_2d_pp_nodes_unstructured(pp_space, spacing, x, y, zone_array=None):
+    """Find the cells of an unstructured grid at which pilot points are placed,
+    the active cell nearest to the centre of each square bin that contains one.
+    Bins have sides of pp_space cells, starting from the upper left of the grid,
+    and are ordered by row from the top, then by column.
+    """
+    binsize = pp_space * spacing
+    dx = x - (x.min() - 0.5 * spacing)
+    dy = (y.max() + 0.5 * spacing) - y
+    col = np.floor(dx / binsize).astype(int)
+    row = np.floor(dy / binsize).astype(int)
+    dist = (dx - (col + 0.5) * binsize) ** 2 + (dy - (row + 0.5) * binsize) ** 2
+    ncol = col.max() + 1
+    ibin = row * ncol + col
+    nodes = np.arange(len(x))
+    if zone_array is not None:
+        nodes = nodes[np.asarray(zone_array).ravel() > 0]
+    order = nodes[np.lexsort((nodes, dist[nodes], ibin[nodes]))]
+    _, first = np.unique(ibin[order], return_index=True)
+    return order[first]
+
+
+def _kriging_backend(backend: str, name: str):
+    """Function calculating kriging factors with the "library" or "numpy"
+    backend."""
+    if backend == "library":
+        return getattr(PestUtilsLib(), name)
+    elif backend == "numpy":
+        from . import kriging
+
+        return getattr(kriging, name)
+    raise ValueError(f"backend must be 'library' or 'numpy' (was {backend!r})")
+
+
 def interpolate_with_sva_pilotpoints_2d(
     pp_info: pandas.DataFrame,
     gridinfo_fname: str,
@@ -379,7 +616,9 @@ def interpolate_with_sva_pilotpoints_2d(
     search_dist=1e30,
     zone_array=1,
     verbose=True,
-    layer=None
+    layer=None,
+    backend="library",
+    fac_dir=None,
 ) -> dict:
     """Perform 2-D pilot point interpolation using
     spatially varying geostatistical hyper-parameters
@@ -389,7 +628,7 @@ def interpolate_with_sva_pilotpoints_2d(
         dataframe with pilot point info.  Required columns 
         include: "x","y",and "value".  optional columns include:
         "zone","bearing","aniso",and "corrlen"    
-    gridinfo_fname: str
+    gridinfo_fname: str or GridInfo
         file name storing grid information
     vartype: str
         variogram type.  Default is "exp"onential
@@ -411,10 +650,21 @@ def interpolate_with_sva_pilotpoints_2d(
         integer type, a constant zone array of value "zone_array" is used.
         Default is 1
     verbose: bool
-        flag to output.  Default is True
+        flag to output.  If True, factor files are written in text format
+        and hyperparameter arrays are written to "<hyperpar>.txt" files in
+        the current working directory.  Default is True
     layer: int
         layer number to use if gridinfo_fname points to 3-D grid info.
         Default is None, which results in layer 1 being used
+    backend: str
+        how the kriging factors of "value" are calculated, either "library"
+        with the shared library, or "numpy" with
+        `pypestutils.kriging.calc_kriging_factors_2d`, which requires scipy
+        and is faster with many pilot points.  Default is "library"
+    fac_dir: str
+        directory to write and keep the factor files "temphyper.fac" and
+        "var.fac" in.  Default is None, which writes these to a per-call
+        temporary directory that is removed
 
     Returns
     -------
@@ -437,6 +687,7 @@ def interpolate_with_sva_pilotpoints_2d(
 
     if "zone" not in pp_info:
         pp_info.loc[:, "zone"] = 1
+    calc_kriging_factors_2d = _kriging_backend(backend, "calc_kriging_factors_2d")
 
     nnodes, nrow, ncol = None, None, None
     x, y, area = None, None, None
@@ -476,191 +727,349 @@ def interpolate_with_sva_pilotpoints_2d(
     hyperkrigtype = "ordinary"
     hypertrans = "none"
 
-    fac_files = []
     lib.logger.info("using bearing of %r and aniso of %r for hyperpar interpolation", hyperbearing, hyperaniso)
     lib.logger.info("using %r variogram with %r transform for hyperpar interpolation",hypervartype,hypertrans)
        
     results = {}    
 
-    bearing = np.zeros_like(x)
-    if "bearing" in pp_info.columns:
-        hypernoint = pp_info.bearing.mean()
-        lib.logger.info("using no-interpolation value of %r for 'bearing' hyperpar interpolation", hypernoint)
-        hyperfac_fname = "tempbearing.fac"
-        npts = lib.calc_kriging_factors_auto_2d(
-            pp_info.x.values,
-            pp_info.y.values,
-            pp_info.zone.values.astype(int),
-            x.flatten(),
-            y.flatten(),
-            zone_array.flatten().astype(int),
-            hyperkrigtype,
-            hyperaniso,
-            hyperbearing,
-            hyperfac_fname,
-            hyperfac_ftype,
-        )
-        result = lib.krige_using_file(
-            hyperfac_fname,
-            hyperfac_ftype,
-            nnodes,
-            hyperkrigtype,
-            hypertrans,
-            pp_info.bearing.values,
-            hypernoint,
-            hypernoint,
-        )
-        bearing = result["targval"]
-        fac_files.append(hyperfac_fname)
+    # factor files are written to a per-call directory, so that concurrent
+    # calls do not overwrite each other, unless fac_dir is given
+    with _intermediate_dir(fac_dir) as fac_dir:
+        # the hyperparameters share pilot points, zones, hyper-variogram and 
+        # targets, so the hyper-factors are calculated once and applied to each
+        hyperpars = [k for k in ["bearing","aniso","corrlen"] if k in pp_info.columns]
+        if len(hyperpars) > 0:
+            hyperfac_fname = os.path.join(fac_dir,"temphyper.fac")
+            npts = lib.calc_kriging_factors_auto_2d(
+                pp_info.x.values,
+                pp_info.y.values,
+                pp_info.zone.values.astype(int),
+                x.flatten(),
+                y.flatten(),
+                zone_array.flatten().astype(int),
+                hyperkrigtype,
+                hyperaniso,
+                hyperbearing,
+                hyperfac_fname,
+                hyperfac_ftype,
+            )
+            # the factor file is read once and applied to all hyperparameters,
+            # as krige_using_file would be to each of them
+            from .kriging import _krige_using_file
+
+            hypernoint = pp_info[hyperpars].mean().values
+            lib.logger.info("using no-interpolation values of %r for %r hyperpar interpolation", hypernoint, hyperpars)
+            hypervals = _krige_using_file(
+                hyperfac_fname,
+                hyperfac_ftype,
+                pp_info[hyperpars].values.astype(float),
+                hypernoint,
+            )
+        for i,hyperpar in enumerate(hyperpars):
+            results[hyperpar] = hypervals[:,i].copy()
+            if verbose:
+                if nrow is not None:
+                    np.savetxt(hyperpar+".txt",results[hyperpar].reshape(nrow,ncol),fmt="%15.6E")
+                else:
+                    np.savetxt(hyperpar+".txt",results[hyperpar],fmt="%15.6E")
+
+        bearing = results.setdefault("bearing",np.zeros_like(x))
+        aniso = results.setdefault("aniso",np.zeros_like(x))
+        corrlen = results.get("corrlen",None)
+        use_auto = False
+
+        # todo: maybe make these args?
+        fac_fname = os.path.join(fac_dir,"var.fac")
+        fac_ftype = "binary"
         if verbose:
-            if nrow is not None:
-                np.savetxt("bearing.txt",bearing.reshape(nrow,ncol),fmt="%15.6E")
-            else:
-                np.savetxt("bearing.txt",bearing,fmt="%15.6E")
-    results["bearing"] = bearing
-    
+            fac_ftype = "text"
+        noint = pp_info.loc[:, "value"].mean()
+        if use_auto:
+            npts = lib.calc_kriging_factors_auto_2d(
+                pp_info.x.values,
+                pp_info.y.values,
+                pp_info.zone.values,
+                x.flatten(),
+                y.flatten(),
+                zone_array.flatten().astype(int),
+                krigtype,
+                aniso.flatten(),
+                bearing.flatten(),
+                fac_fname,
+                fac_ftype,
+            )
+        else:
+            npts = calc_kriging_factors_2d(
+                pp_info.x.values,
+                pp_info.y.values,
+                pp_info.zone.values,
+                x.flatten(),
+                y.flatten(),
+                zone_array.flatten().astype(int),
+                vartype,
+                krigtype,
+                corrlen.flatten(),
+                aniso.flatten(),
+                bearing.flatten(),
+                search_dist,
+                max_pts,
+                min_pts,
+                fac_fname,
+                fac_ftype,
+            )
 
-    aniso = np.zeros_like(x)
-    if "aniso" in pp_info.columns:
-        hypernoint = pp_info.aniso.mean()
-        lib.logger.info("using no-interpolation value of %r for 'aniso' hyperpar interpolation", hypernoint)
-        
-        hyperfac_fname = "tempaniso.fac"
-        npts = lib.calc_kriging_factors_auto_2d(
-            pp_info.x.values,
-            pp_info.y.values,
-            pp_info.zone.values,
-            x.flatten(),
-            y.flatten(),
-            zone_array.flatten().astype(int),
-            hyperkrigtype,
-            hyperaniso,
-            hyperbearing,
-            hyperfac_fname,
-            hyperfac_ftype,
-        )
         result = lib.krige_using_file(
-            hyperfac_fname,
-            hyperfac_ftype,
+            fac_fname,
+            fac_ftype,
             nnodes,
-            hyperkrigtype,
-            hypertrans,
-            pp_info.aniso.values,
-            hypernoint,
-            hypernoint,
-        )
-        aniso = result["targval"]
-        if verbose:
-            if nrow is not None:
-                np.savetxt("aniso.txt",aniso.reshape(nrow,ncol),fmt="%15.6E")
-            else:
-                np.savetxt("aniso.txt",aniso,fmt="%15.6E")
-
-    results["aniso"] = aniso
-
-    use_auto = False
-    corrlen = None
-    if "corrlen" in pp_info.columns:
-        hypernoint = pp_info.corrlen.mean()
-        lib.logger.info("using no-interpolation value of %r for 'corrlen' hyperpar interpolation", hypernoint)
-        hyperfac_fname = "tempcorrlen.fac"
-        npts = lib.calc_kriging_factors_auto_2d(
-            pp_info.x.values,
-            pp_info.y.values,
-            pp_info.zone.values,
-            x.flatten(),
-            y.flatten(),
-            zone_array.flatten().astype(int),
-            hyperkrigtype,
-            hyperaniso,
-            hyperbearing,
-            hyperfac_fname,
-            hyperfac_ftype,
+            krigtype,
+            vartransform,
+            pp_info.loc[:, "value"].values,
+            noint,
+            noint,
         )
-        result = lib.krige_using_file(
-            hyperfac_fname,
-            hyperfac_ftype,
-            nnodes,
-            hyperkrigtype,
-            hypertrans,
-            pp_info.corrlen.values,
-            hypernoint,
-            hypernoint,
+        results["result"] = result["targval"]
+
+    if nrow is not None:
+        for k,v in results.items():
+            results[k] = v.reshape(nrow,ncol)
+
+    return results
+
+
+def _get_3d_grid_info(gridinfo_fname) -> tuple:
+    """Get cell centres, cell layers and the result shape from a MODFLOW-6
+    binary grid file or a pandas DataFrame with columns 'x','y','z' and
+    optionally 'layer'
+    """
+    if _is_dataframe(gridinfo_fname):
+        for col in ["x","y","z"]:
+            if col not in gridinfo_fname.columns:
+                raise Exception("required '{0}' column not found in grid info dataframe".format(col))
+        x,y,z = (gridinfo_fname[c].values.astype(float) for c in ["x","y","z"])
+        layer = None
+        if "layer" in gridinfo_fname.columns:
+            layer = gridinfo_fname["layer"].values.astype(int)
+        return x,y,z,layer,x.shape
+    grid_info = get_grid_info_from_mf6_grb(gridinfo_fname)
+    nlay = grid_info["ndim3"]
+    if grid_info["idis"] == 1:
+        shape = (nlay,grid_info["ndim2"],grid_info["ndim1"])
+    else:
+        shape = (nlay,grid_info["ndim1"])
+    layer = np.repeat(np.arange(1,nlay+1),grid_info["ncells"] // nlay)
+    return grid_info["x"],grid_info["y"],grid_info["z"],layer,shape
+
+
+def _zone_values(value, zones) -> np.NDArray:
+    """Get per-zone values from a scalar or a dict keyed by zone number"""
+    if isinstance(value, dict):
+        missing = set(zones.tolist()) - set(value)
+        if len(missing) > 0:
+            raise Exception("no value supplied for zone(s): {0}".format(",".join(str(z) for z in sorted(missing))))
+        return np.array([value[z] for z in zones])
+    return np.full(len(zones), value)
+
+
+def interpolate_with_pilotpoints_3d(
+    pp_info: pandas.DataFrame,
+    gridinfo_fname: str,
+    ahmax=None,
+    ahmin=None,
+    avert=None,
+    bearing=0.0,
+    dip=0.0,
+    rake=0.0,
+    vartype="exp",
+    krigtype="ordinary",
+    vartransform="none",
+    max_pts=50,
+    min_pts=1,
+    search_dist=1e30,
+    zone_array=1,
+    verbose=False,
+    backend="library",
+    fac_dir=None,
+) -> dict:
+    """Perform pilot point interpolation to all layers of a 3-D grid
+    with one set of kriging factors
+    Parameters
+    ----------
+    pp_info: pandas.DataFrame
+        dataframe with pilot point info.  Required columns
+        include: "ppname","x","y",and "value".  Optional columns include:
+        "zone", "z" and "layer".  If "z" is present, pilot points are
+        interpolated in 3-D to the cell centres.  Otherwise, each layer is
+        interpolated in 2-D from the pilot points in that "layer", or from
+        all pilot points if "layer" is not present
+    gridinfo_fname: str or GridInfo
+        MODFLOW-6 binary grid file.  Optionally, a pandas DataFrame with
+        columns 'x','y','z' and (for layer-wise interpolation) 'layer'
+    ahmax: float or dict
+        variogram "a" value in the direction of maximum continuity.  A
+        dict gives values for each pilot point zone.  Default is None,
+        which uses a tenth of the larger horizontal extent of the grid
+    ahmin: float or dict
+        variogram "a" value in the direction of minimum horizontal
+        continuity.  Default is None, which uses `ahmax`
+    avert: float or dict
+        vertical variogram "a" value, only used if "z" is in `pp_info`.
+        Default is None, which uses `ahmax`
+    bearing: float or dict
+        bearing of the direction of maximum continuity.  Default is 0.0
+    dip: float or dict
+        dip of the direction of maximum continuity.  Default is 0.0
+    rake: float or dict
+        twist about the direction of maximum continuity.  Default is 0.0
+    vartype: str or dict
+        variogram type.  Default is "exp"onential
+    krigtype: str
+        kriging type.  Default is "ordinary"
+    vartransform: str
+        variogram transformation.  Default is "none"
+    max_pts: int
+        maximum number of pilot points to use in interpolation.
+        Default is 50
+    min_pts: int
+        minimum number of pilot points to use in interplation.
+        Default is 1
+    search_dist: float
+        search distance to use when looking for nearby pilot points.
+        Default is 1.0e+30
+    zone_array: int | numpy.ndarray
+        the zone array to match up with "zone" value in `pp_info`, either
+        3-D or for one layer, which is used for all layers.  If integer type,
+        a constant zone array of value "zone_array" is used.  Cells without
+        pilot points in their zone (and layer) are assigned the mean pilot
+        point value.  Default is 1
+    verbose: bool
+        flag to output.  If True, the factor file is written in text
+        format.  Default is False
+    backend: str
+        how the kriging factors are calculated, either "library" with the
+        shared library, or "numpy" with
+        `pypestutils.kriging.calc_kriging_factors_3d`, which requires scipy
+        and is faster with many pilot points.  Default is "library"
+    fac_dir: str
+        directory to write and keep the factor file "var3d.fac" in.
+        Default is None, which writes it to a per-call temporary directory
+        that is removed
+
+    Returns
+    -------
+    results: dict
+        "result" array of the interpolated values, with shape
+        (nlay, nrow, ncol) for DIS grids or (nlay, ncpl) for DISV grids
+    """
+    req_cols = ["ppname", "x", "y", "value"]
+    missing = [req_col for req_col in req_cols if req_col not in pp_info.columns]
+    if len(missing) > 0:
+        raise Exception(
+            "the following required columns are not in pp_info:{0}".format(
+                ",".join(missing)
+            )
         )
-        corrlen = result["targval"]
-        fac_files.append(hyperfac_fname)
-        use_auto = False
-        if verbose:
-            if nrow is not None:
-                np.savetxt("corrlen.txt",corrlen.reshape(nrow,ncol),fmt="%15.6E")
-            else:
-                np.savetxt("corrlen.txt",corrlen,fmt="%15.6E")
-        results["corrlen"] = corrlen
-
-    if not verbose:
-        for fac_file in fac_files:
-            try:
-                os.remove(fac_file)
-            except Exception as e:
-                pass
+    if "zone" not in pp_info:
+        pp_info = pp_info.assign(zone=1)
+    calc_kriging_factors_3d = _kriging_backend(backend, "calc_kriging_factors_3d")
+
+    x,y,z,layer,shape = _get_3d_grid_info(gridinfo_fname)
+    znt = np.broadcast_to(np.asarray(zone_array).astype(int),shape).flatten()
+    zns = pp_info.zone.values.astype(int)
+    ppzones = np.unique(zns[zns != 0])
+    ecs = pp_info.x.values.astype(float)
+    ncs = pp_info.y.values.astype(float)
+    sourceval = pp_info.value.values.astype(float)
+
+    if "z" in pp_info.columns:
+        zcs = pp_info.z.values.astype(float)
+        zct = z
+    else:
+        # layers are kept apart with a zone for each layer and pilot point
+        # zone, so that all layers are interpolated from one factor file
+        if layer is None:
+            raise Exception("'layer' column required in grid info dataframe if 'z' not in pp_info")
+        if "layer" in pp_info.columns:
+            pplayer = pp_info.layer.values.astype(int)
+        else:
+            layers = np.unique(layer)
+            pplayer = np.repeat(layers,len(pp_info))
+            ecs,ncs,zns,sourceval = (np.tile(a,len(layers)) for a in [ecs,ncs,zns,sourceval])
+        nzone = len(ppzones)
+
+        def composite_zone(zone,lay):
+            rank = np.searchsorted(ppzones,zone)
+            found = (zone != 0) & (rank < nzone)
+            found[found] = ppzones[rank[found]] == zone[found]
+            return np.where(found,(lay - 1) * nzone + rank + 1,0)
+
+        zns = composite_zone(zns,pplayer)
+        znt = composite_zone(znt,layer)
+        zcs = np.zeros_like(ecs)
+        zct = np.zeros_like(x)
+
+    # zones without both pilot points and cells are not interpolated
+    zonenum = np.intersect1d(zns[zns != 0],znt[znt != 0])
+    if len(zonenum) == 0:
+        raise Exception("no grid cells share a zone with pilot points")
+    zns = np.where(np.isin(zns,zonenum),zns,0)
+    znt = np.where(np.isin(znt,zonenum),znt,0)
+    if "z" in pp_info.columns:
+        basezone = zonenum
+    else:
+        basezone = ppzones[(zonenum - 1) % len(ppzones)]
 
-    # todo: maybe make these args?
-    fac_fname = "var.fac"
+    if ahmax is None:
+        ahmax = max(x.max() - x.min(),y.max() - y.min()) / 10
+    if ahmin is None:
+        ahmin = ahmax
+    if avert is None:
+        avert = ahmax
+
+    lib = PestUtilsLib()
+    noint = pp_info.loc[:, "value"].mean()
     fac_ftype = "binary"
     if verbose:
         fac_ftype = "text"
-    noint = pp_info.loc[:, "value"].mean()
-    if use_auto:
-        npts = lib.calc_kriging_factors_auto_2d(
-            pp_info.x.values,
-            pp_info.y.values,
-            pp_info.zone.values,
-            x.flatten(),
-            y.flatten(),
-            zone_array.flatten().astype(int),
+    with _intermediate_dir(fac_dir) as fac_dir:
+        fac_fname = os.path.join(fac_dir,"var3d.fac")
+        calc_kriging_factors_3d(
+            ecs,
+            ncs,
+            zcs,
+            zns,
+            x,
+            y,
+            zct,
+            znt,
+            zonenum,
             krigtype,
-            aniso.flatten(),
-            bearing.flatten(),
-            fac_fname,
-            fac_ftype,
-        )
-    else:
-        npts = lib.calc_kriging_factors_2d(
-            pp_info.x.values,
-            pp_info.y.values,
-            pp_info.zone.values,
-            x.flatten(),
-            y.flatten(),
-            zone_array.flatten().astype(int),
-            vartype,
-            krigtype,
-            corrlen.flatten(),
-            aniso.flatten(),
-            bearing.flatten(),
+            _zone_values(vartype,basezone),
+            _zone_values(ahmax,basezone),
+            _zone_values(ahmin,basezone),
+            _zone_values(avert,basezone),
+            _zone_values(bearing,basezone),
+            _zone_values(dip,basezone),
+            _zone_values(rake,basezone),
+            search_dist,
+            search_dist,
             search_dist,
             max_pts,
             min_pts,
             fac_fname,
             fac_ftype,
         )
-
-    result = lib.krige_using_file(
-        fac_fname,
-        fac_ftype,
-        nnodes,
-        krigtype,
-        vartransform,
-        pp_info.loc[:, "value"].values,
-        noint,
-        noint,
-    )
-    results["result"] = result["targval"]
-
-    if nrow is not None:
-        for k,v in results.items():
-            results[k] = v.reshape(nrow,ncol)
-
-    return results
+        result = lib.krige_using_file(
+            fac_fname,
+            fac_ftype,
+            len(x),
+            krigtype,
+            vartransform,
+            sourceval,
+            noint,
+            noint,
+        )
+    return {"result": result["targval"].reshape(shape)}
 
 
 def generate_2d_grid_realizations(
@@ -682,7 +1091,7 @@ def generate_2d_grid_realizations(
     geostatistical hyper parameters.
     Parameters
     ----------
-    gridinfo_fname: str
+    gridinfo_fname: str or GridInfo
         file containing grid information
     num_real : int
         number of realizations to generate
@@ -786,6 +1195,208 @@ def generate_2d_grid_realizations(
         return reals.transpose()
 
 
+def _read_mf6_grb_arrays(grb_fname: str) -> dict:
+    """Read the scalars and arrays of a MODFLOW-6 binary grid file, keyed
+    by lower-case name
+    """
+    dtypes = {"INTEGER": "<i4", "DOUBLE": "<f8"}
+    with open(grb_fname, "rb") as f:
+        header = [f.read(50).decode() for _ in range(4)]
+        ntxt = int(header[2].split()[1])
+        lentxt = int(header[3].split()[1])
+        definitions = [f.read(lentxt).decode().split() for _ in range(ntxt)]
+        data = {"grid": header[0].split()[1]}
+        for definition in definitions:
+            name, dtype, ndim = definition[0], dtypes[definition[1]], int(definition[3])
+            # dimensions are in Fortran order
+            shape = tuple(int(d) for d in definition[4:4 + ndim])[::-1]
+            values = np.fromfile(f, dtype, int(np.prod(shape)))
+            data[name.lower()] = values.reshape(shape) if ndim > 0 else values[0]
+    return data
+
+
+def _get_mf6_cell_geometry(grb_fname: str) -> dict:
+    """Get cell areas, heights and idomain from a MODFLOW-6 DIS or DISV
+    binary grid file
+    """
+    data = _read_mf6_grb_arrays(grb_fname)
+    if data["grid"] == "DIS":
+        area = np.outer(data["delc"],data["delr"]).ravel()
+    elif data["grid"] == "DISV":
+        # shoelace formula, over the vertices of each cell in turn
+        ptr = data["iavert"] - 1
+        ivert = data["javert"] - 1
+        cell = np.repeat(np.arange(data["ncpl"]),np.diff(ptr))
+        inext = np.arange(1,len(ivert) + 1)
+        inext[ptr[1:] - 1] = ptr[:-1]
+        vx,vy = data["vertices"][:,0],data["vertices"][:,1]
+        cross = vx[ivert] * vy[ivert[inext]] - vx[ivert[inext]] * vy[ivert]
+        area = np.abs(np.bincount(cell,cross,minlength=data["ncpl"])) / 2.0
+    else:
+        raise Exception("unsupported grid type '{0}' in '{1}'".format(data["grid"],grb_fname))
+    nlay = data["nlay"]
+    top = np.concatenate([data["top"],data["botm"][:-len(data["top"])]])
+    return {
+        "area": np.tile(area,nlay),
+        "height": top - data["botm"],
+        "idomain": data["idomain"],
+    }
+
+
+def generate_3d_grid_realizations(
+    gridinfo_fname: str,
+    num_reals=100,
+    variotype="exp",
+    mean=1.0,
+    variance=1.0,
+    ahmax=None,
+    ahmin=None,
+    avert=None,
+    bearing=0.0,
+    dip=0.0,
+    rake=0.0,
+    variotransform="none",
+    active=None,
+    random_seed=12345,
+    filename=None,
+    reals_per_chunk=None,
+) -> np.NDArray[float]:
+    """draw 3-D realizations on a MODFLOW-6 DIS or DISV grid using
+    spatially varying geostatistical hyper parameters
+    Parameters
+    ----------
+    gridinfo_fname: str or GridInfo
+        MODFLOW-6 binary grid file, or a GridInfo read from one with
+        `GridInfo.from_file`, which has the cell areas and heights
+    num_reals : int
+        number of realizations to generate.  Default is 100
+    variotype: str
+        averaging function type.  Default is "exp"onential
+    mean: float or numpy.ndarray
+        field mean.  Either a scalar or array of grid shape.  Default is 1.0
+    variance: float or numpy.ndarray
+        field variance.  Either a scalar or array of grid shape.  Default is 1.0
+    ahmax: float or numpy.ndarray
+        correlation length in the direction of maximum continuity.  Either
+        a scalar or array of grid shape.  Default is None, which uses a tenth
+        of the larger horizontal extent of the grid
+    ahmin: float or numpy.ndarray
+        correlation length in the direction of minimum horizontal continuity.
+        Default is None, which uses `ahmax`
+    avert: float or numpy.ndarray
+        vertical correlation length.  Default is None, which uses `ahmax`
+    bearing: float or numpy.ndarray
+        bearing of the direction of maximum continuity.  Default is 0.0
+    dip: float or numpy.ndarray
+        dip of the direction of maximum continuity.  Default is 0.0
+    rake: float or numpy.ndarray
+        rotation of the direction of minimum continuity.  Default is 0.0
+    variotransform: str
+        variogram transform.  Default is "none".
+    active: numpy.ndarray
+        array of grid shape, where inactive cells are zero.  Default is
+        None, which uses IDOMAIN greater than zero
+    random_seed: int
+        the random seed.  Default is 12345
+    filename: str (optional)
+        a .npy file to write realizations to, layer by layer, so that
+        the ensemble is never held in memory.  Default is None, which
+        returns realizations in memory
+    reals_per_chunk: int (optional)
+        number of realizations generated at a time.  The realizations do not
+        depend on this, but the averaging is repeated for each chunk, so
+        larger chunks are faster and use more memory.  Default is None,
+        which generates all realizations at once, or 10 at a time if
+        `filename` is given
+
+    Returns
+    -------
+    results: numpy.ndarray(float)
+        realizations with shape (num_reals, nlay, nrow, ncol) for DIS grids
+        or (num_reals, nlay, ncpl) for DISV grids.  If `filename` is given,
+        this is a memory-mapped array of the file
+    """
+    if not isinstance(gridinfo_fname, GridInfo):
+        gridinfo_fname = GridInfo.from_file(gridinfo_fname)
+    grid_info = get_grid_info_from_mf6_grb(gridinfo_fname)
+    geometry = gridinfo_fname.geometry
+    if geometry is None:
+        raise Exception(
+            "cell areas and heights are not available; pass a MODFLOW-6 "
+            "binary grid file, or a GridInfo read from one with GridInfo.from_file"
+        )
+    nnodes = grid_info["ncells"]
+    nlay = grid_info["ndim3"]
+    if grid_info["idis"] == 1:
+        layer_shape = (grid_info["ndim2"],grid_info["ndim1"])
+    else:
+        layer_shape = (grid_info["ndim1"],)
+    x,y,z = grid_info["x"],grid_info["y"],grid_info["z"]
+
+    if ahmax is None:
+        ahmax = max(x.max() - x.min(),y.max() - y.min()) / 10
+    if ahmin is None:
+        ahmin = ahmax
+    if avert is None:
+        avert = ahmax
+    if active is None:
+        active = (geometry["idomain"] > 0).astype(int)
+
+    def node_values(value):
+        return np.broadcast_to(np.asarray(value,dtype=float).ravel(),(nnodes,))
+
+    pars = {
+        k: node_values(v) for k,v in zip(
+            ["mean","var","ahmax","ahmin","avert","bearing","dip","rake"],
+            [mean,variance,ahmax,ahmin,avert,bearing,dip,rake],
+        )
+    }
+    active = np.asarray(active).astype(int).ravel()
+
+    shape = (num_reals,nlay) + layer_shape
+    if filename is None:
+        reals = np.empty(shape)
+    else:
+        reals = np.lib.format.open_memmap(filename,mode="w+",dtype=np.float64,shape=shape)
+
+    if reals_per_chunk is None:
+        reals_per_chunk = num_reals if filename is None else 10
+    power = 1.0
+    ncpl = nnodes // nlay
+    lib = PestUtilsLib()
+    # realizations follow on from the random numbers of the previous chunk
+    lib.initialize_randgen(random_seed)
+    for ireal in range(0,num_reals,reals_per_chunk):
+        nreal = min(reals_per_chunk,num_reals - ireal)
+        chunk = lib.fieldgen3d_sva(
+            x,
+            y,
+            z,
+            geometry["area"],
+            geometry["height"],
+            active,
+            pars["mean"],
+            pars["var"],
+            pars["ahmax"],
+            pars["ahmin"],
+            pars["avert"],
+            pars["bearing"],
+            pars["dip"],
+            pars["rake"],
+            variotransform,
+            variotype,
+            power,
+            nreal,
+        )
+        for ilay in range(nlay):
+            reals[ireal:ireal + nreal,ilay] = chunk[ilay * ncpl:(ilay + 1) * ncpl].transpose().reshape((nreal,) + layer_shape)
+        del chunk
+    lib.free_all_memory()
+    if filename is not None:
+        reals.flush()
+    return reals
+
+
 class SpatialReference(object):
     """
     a class to locate a structured model grid in x-y space.
@@ -802,12 +1413,24 @@ class SpatialReference(object):
         The y coordinate of the upper left corner of the grid. Enter either xul and yul or xll and yll.
     rotation: float
         The counter-clockwise rotation (in degrees) of the grid
+    dtype: numpy.dtype
+        The float type of the 2-D coordinate arrays `xgrid`, `ygrid`,
+        `xcentergrid` and `ycentergrid`.  Use `np.float32` to halve their
+        memory for very large grids, at the cost of precision for large
+        real-world coordinates.  Default is `np.float64`
+
+    Note
+    ----
+    Derived arrays are evaluated on first use and cached.  The 2-D
+    coordinate arrays of unrotated grids are read-only broadcast views of
+    the 1-D coordinates.
     """
 
-    def __init__(self, delr, delc, xul, yul, rotation=0.0):
+    def __init__(self, delr, delc, xul, yul, rotation=0.0, dtype=np.float64):
         self.xul = float(xul)
         self.yul = float(yul)
         self.rotation = float(rotation)
+        self.dtype = np.dtype(dtype)
         for delrc in [delr, delc]:
             if isinstance(delrc, float) or isinstance(delrc, int):
                 msg = (
@@ -816,14 +1439,44 @@ class SpatialReference(object):
                 )
                 raise TypeError(msg)
 
-        self.delc = np.atleast_1d(np.array(delc)).astype(np.float64)
-        self.delr = np.atleast_1d(np.array(delr)).astype(np.float64)
+        self.delc = delc
+        self.delr = delr
 
+    def _reset(self):
+        """clear arrays that are derived from delr and delc
+        """
+        self._xedge = None
+        self._yedge = None
+        self._xcenter = None
+        self._ycenter = None
+        self._areagrid = None
         self._xgrid = None
         self._ygrid = None
         self._xcentergrid = None
         self._ycentergrid = None
 
+    @property
+    def delr(self)->np.NDArray[float]:
+        """spacings along a row
+        """
+        return self._delr
+
+    @delr.setter
+    def delr(self, delr):
+        self._delr = np.atleast_1d(np.array(delr)).astype(np.float64)
+        self._reset()
+
+    @property
+    def delc(self)->np.NDArray[float]:
+        """spacings along a column
+        """
+        return self._delc
+
+    @delc.setter
+    def delc(self, delc):
+        self._delc = np.atleast_1d(np.array(delc)).astype(np.float64)
+        self._reset()
+
     @property
     def xll(self)->float:
         """lower left x coord
@@ -863,40 +1516,23 @@ class SpatialReference(object):
         sr: SpatialReference
             sr instance
         """
-        f = open(gridspec_file, "r")
-        raw = f.readline().strip().split()
-        nrow = int(raw[0])
-        ncol = int(raw[1])
-        raw = f.readline().strip().split()
-        xul, yul, rot = float(raw[0]), float(raw[1]), float(raw[2])
-        delr = []
-        j = 0
-        while j < ncol:
+        with open(gridspec_file, "r") as f:
             raw = f.readline().strip().split()
-            for r in raw:
-                if "*" in r:
-                    rraw = r.split("*")
-                    for n in range(int(rraw[0])):
-                        delr.append(float(rraw[1]))
-                        j += 1
-                else:
-                    delr.append(float(r))
-                    j += 1
-        delc = []
-        i = 0
-        while i < nrow:
+            nrow = int(raw[0])
+            ncol = int(raw[1])
             raw = f.readline().strip().split()
-            for r in raw:
-                if "*" in r:
-                    rraw = r.split("*")
-                    for n in range(int(rraw[0])):
-                        delc.append(float(rraw[1]))
-                        i += 1
-                else:
-                    delc.append(float(r))
-                    i += 1
-        f.close()
-        return cls(np.array(delr), np.array(delc), xul=xul, yul=yul, rotation=rot)
+            xul, yul, rot = float(raw[0]), float(raw[1]), float(raw[2])
+            # any text after the delr and delc values is ignored
+            values = _expand_repeats(f.read(), ncol + nrow)
+        if values.shape[0] < ncol + nrow:
+            raise ValueError(
+                "gridspec file '{0}' has {1} delr and delc values, expected {2}".format(
+                    gridspec_file, values.shape[0], ncol + nrow
+                )
+            )
+        delr = values[:ncol]
+        delc = values[ncol : ncol + nrow]
+        return cls(delr, delc, xul=xul, yul=yul, rotation=rot)
 
     @property
     def theta(self)->float:
@@ -908,13 +1544,17 @@ class SpatialReference(object):
     def xedge(self)->np.NDArray[float]:
         """the xedge array of the grid
         """
-        return self.get_xedge_array()
+        if self._xedge is None:
+            self._xedge = self.get_xedge_array()
+        return self._xedge
 
     @property
     def yedge(self)->np.NDArray[float]:
         """the yedge array of the grid
         """
-        return self.get_yedge_array()
+        if self._yedge is None:
+            self._yedge = self.get_yedge_array()
+        return self._yedge
 
     @property
     def xgrid(self)->np.NDArray[float]:
@@ -936,13 +1576,17 @@ class SpatialReference(object):
     def xcenter(self)->np.NDArray[float]:
         """grid x center array
         """
-        return self.get_xcenter_array()
+        if self._xcenter is None:
+            self._xcenter = self.get_xcenter_array()
+        return self._xcenter
 
     @property
     def ycenter(self)->np.NDArray[float]:
         """grid y center array
         """
-        return self.get_ycenter_array()
+        if self._ycenter is None:
+            self._ycenter = self.get_ycenter_array()
+        return self._ycenter
 
     @property
     def ycentergrid(self)->np.NDArray[float]:
@@ -964,18 +1608,36 @@ class SpatialReference(object):
     def areagrid(self)->np.NDArray[float]:
         """area of grid nodes
         """
-        dr, dc = np.meshgrid(self.delr, self.delc)
-        return dr * dc
+        if self._areagrid is None:
+            self._areagrid = np.outer(self.delc, self.delr)
+        return self._areagrid
 
     def _set_xycentergrid(self):
-        self._xcentergrid, self._ycentergrid = np.meshgrid(self.xcenter, self.ycenter)
-        self._xcentergrid, self._ycentergrid = self.transform(
-            self._xcentergrid, self._ycentergrid
+        self._xcentergrid, self._ycentergrid = self._get_coordinate_grids(
+            self.xcenter, self.ycenter
         )
 
     def _set_xygrid(self):
-        self._xgrid, self._ygrid = np.meshgrid(self.xedge, self.yedge)
-        self._xgrid, self._ygrid = self.transform(self._xgrid, self._ygrid)
+        self._xgrid, self._ygrid = self._get_coordinate_grids(self.xedge, self.yedge)
+
+    def _get_coordinate_grids(self, x, y):
+        """real-world coordinates of the mesh of model space x and y vectors,
+        without the intermediate arrays of np.meshgrid
+        """
+        shape = (y.shape[0], x.shape[0])
+        if self.rotation == 0.0:
+            xw = (x + self.xll).astype(self.dtype)
+            yw = (y + self.yll).astype(self.dtype)
+            return np.broadcast_to(xw, shape), np.broadcast_to(yw[:, None], shape)
+        theta = self.rotation * np.pi / 180.0
+        cos, sin = np.cos(theta), np.sin(theta)
+        xw = np.add.outer(
+            (-sin * y).astype(self.dtype), (self.xll + cos * x).astype(self.dtype)
+        )
+        yw = np.add.outer(
+            (self.yll + cos * y).astype(self.dtype), (sin * x).astype(self.dtype)
+        )
+        return xw, yw
 
     def get_xedge_array(self)->np.NDArray[float]:
         """
@@ -1097,34 +1759,86 @@ class SpatialReference(object):
 
         return (xmin, xmax, ymin, ymax)
 
-    def get_vertices(self, i, j)->list[list[float]]:
-        """Get vertices for a single cell or sequence if i, j locations."""
-        pts = []
-        xgrid, ygrid = self.xgrid, self.ygrid
-        pts.append([xgrid[i, j], ygrid[i, j]])
-        pts.append([xgrid[i + 1, j], ygrid[i + 1, j]])
-        pts.append([xgrid[i + 1, j + 1], ygrid[i + 1, j + 1]])
-        pts.append([xgrid[i, j + 1], ygrid[i, j + 1]])
-        pts.append([xgrid[i, j], ygrid[i, j]])
-        if np.isscalar(i):
-            return pts
-        else:
-            vrts = np.array(pts).transpose([2, 0, 1])
-            return [v.tolist() for v in vrts]
+    def get_vertices(self, i, j)->np.NDArray[float]:
+        """Get vertices for a single cell or sequence if i, j locations.
 
-    def get_ij(self, x, y)->tuple(int):
+        Vertices are evaluated from the cell edges, so the `xgrid` and
+        `ygrid` arrays are not needed.  The closed polygon of each cell is
+        returned as an array with shape (5, 2) for a single cell, or
+        (n, 5, 2) for a sequence of n cells.
+        """
+        scalar = np.isscalar(i)
+        i = np.atleast_1d(i)
+        j = np.atleast_1d(j)
+        xedge, yedge = self.xedge, self.yedge
+        x0, x1 = xedge[j], xedge[j + 1]
+        y0, y1 = yedge[i], yedge[i + 1]
+        x = np.stack([x0, x0, x1, x1, x0], axis=1)
+        y = np.stack([y0, y1, y1, y0, y0], axis=1)
+        x, y = self.transform(x, y)
+        vrts = np.stack([x, y], axis=2)
+        if scalar:
+            return vrts[0]
+        return vrts
+
+    def get_ij(self, x, y, outside="raise")->tuple:
         """Return the row and column of a point or sequence of points
         in real-world coordinates.
 
+        Points are rotated back to model space and located on the cell
+        edges with a binary search.
+
+        Parameters
+        ----------
+        x, y: float or numpy.ndarray
+            real-world coordinates
+        outside: str
+            how points outside the grid are handled: "raise" raises a
+            ValueError, "clip" uses the nearest row and column, and "mask"
+            returns masked arrays, masked where outside.  Default is "raise"
+
+        Returns
+        -------
+        r, c: int or numpy.ndarray
+            zero-based row and column indices
+
         """
-        if np.isscalar(x):
-            c = (np.abs(self.xcentergrid[0] - x)).argmin()
-            r = (np.abs(self.ycentergrid[:, 0] - y)).argmin()
-        else:
-            xcp = np.array([self.xcentergrid[0]] * (len(x)))
-            ycp = np.array([self.ycentergrid[:, 0]] * (len(x)))
-            c = (np.abs(xcp.transpose() - x)).argmin(axis=0)
-            r = (np.abs(ycp.transpose() - y)).argmin(axis=0)
+        if outside not in ("raise", "clip", "mask"):
+            raise ValueError(
+                "outside must be 'raise', 'clip' or 'mask' (was {0!r})".format(outside)
+            )
+        scalar = np.isscalar(x)
+        xm, ym = self.transform(
+            np.atleast_1d(np.asarray(x, dtype=np.float64)),
+            np.atleast_1d(np.asarray(y, dtype=np.float64)),
+            inverse=True,
+        )
+        xedge = self.xedge
+        yedge = self.yedge
+        # xedge is increasing and yedge is decreasing; points on the
+        # last edge belong to the last column or row
+        c = np.searchsorted(xedge, xm, side="right") - 1
+        r = np.searchsorted(-yedge, -ym, side="right") - 1
+        c = np.clip(c, 0, self.ncol - 1)
+        r = np.clip(r, 0, self.nrow - 1)
+        inside = (
+            (xm >= xedge[0]) & (xm <= xedge[-1]) & (ym <= yedge[0]) & (ym >= yedge[-1])
+        )
+        if outside == "raise" and not inside.all():
+            first = np.flatnonzero(~inside)[0]
+            raise ValueError(
+                "point {0} ({1}, {2}) is outside the grid; use outside='clip' "
+                "or outside='mask' to locate points outside".format(
+                    first, np.atleast_1d(x)[first], np.atleast_1d(y)[first]
+                )
+            )
+        if outside == "mask":
+            r = np.ma.masked_array(r, ~inside)
+            c = np.ma.masked_array(c, ~inside)
+        if scalar:
+            if outside == "mask" and not inside[0]:
+                return np.ma.masked, np.ma.masked
+            return int(r[0]), int(c[0])
         return r, c
 
     def write_gridspec(self, filename):
@@ -1137,21 +1851,78 @@ class SpatialReference(object):
 
 
         """
-        f = open(filename, "w")
-        f.write("{0:10d} {1:10d}\n".format(self.delc.shape[0], self.delr.shape[0]))
-        f.write(
-            "{0:15.6E} {1:15.6E} {2:15.6E}\n".format(
-                self.xul,
-                self.yul,
-                self.rotation,
+        with open(filename, "w") as f:
+            f.write("{0:10d} {1:10d}\n".format(self.delc.shape[0], self.delr.shape[0]))
+            f.write(
+                "{0:15.6E} {1:15.6E} {2:15.6E}\n".format(
+                    self.xul,
+                    self.yul,
+                    self.rotation,
+                )
             )
-        )
-
-        for r in self.delr:
-            f.write("{0:15.6E} ".format(r))
-        f.write("\n")
-        for c in self.delc:
-            f.write("{0:15.6E} ".format(c))
-        f.write("\n")
+            for values in [self.delr, self.delc]:
+                tokens = _compress_repeats(values)
+                for i in range(0, len(tokens), 10):
+                    f.write(" ".join(tokens[i : i + 10]) + "\n")
         return
 
+
+def _expand_repeats(text: str, count=None) -> np.NDArray[float]:
+    """read values from PEST-style text, expanding "n*value" repeats
+    Parameters
+    ----------
+    text: str
+        whitespace-separated values, optionally with "n*value" repeats
+    count: int (optional)
+        number of values to read, ignoring any further text.  Default is
+        None, which reads all values
+
+    Returns
+    -------
+    values: numpy.ndarray(float)
+        expanded values, fewer than `count` if the text has fewer
+    """
+    tokens = text.split()
+    if count is not None:
+        if "*" not in " ".join(tokens[:count]):
+            tokens = tokens[:count]
+        else:
+            nvalue = 0
+            for ntoken, token in enumerate(tokens):
+                if nvalue >= count:
+                    tokens = tokens[:ntoken]
+                    break
+                head, sep, _ = token.partition("*")
+                nvalue += int(head) if sep else 1
+    if "*" not in text:
+        return np.array(tokens, dtype=np.float64)
+    parts = [token.partition("*") for token in tokens]
+    counts = np.array([int(head) if sep else 1 for head, sep, _ in parts], dtype=int)
+    values = np.array(
+        [tail if sep else head for head, sep, tail in parts], dtype=np.float64
+    )
+    return np.repeat(values, counts)[:count]
+
+
+def _compress_repeats(values: np.NDArray[float]) -> list[str]:
+    """format values as "n*value" tokens for runs of equal values
+    Parameters
+    ----------
+    values: numpy.ndarray(float)
+        values to format
+
+    Returns
+    -------
+    tokens: list[str]
+        formatted tokens
+    """
+    values = np.asarray(values)
+    if values.shape[0] == 0:
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(values[1:] != values[:-1]) + 1))
+    counts = np.diff(np.append(starts, values.shape[0]))
+    return [
+        "{0:.6E}".format(v) if n == 1 else "{0}*{1:.6E}".format(n, v)
+        for n, v in zip(counts.tolist(), values[starts].tolist())
+    ]
+
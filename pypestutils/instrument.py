@@ -0,0 +1,270 @@
+"""Opt-in timing and memory instrumentation of PestUtilsLib calls.
+
+Calls to :class:`PestUtilsLib` methods made while a :class:`Trace` is active
+are recorded with their wall time, argument sizes, the sizes of files read
+and written, and the increase in peak resident memory. Methods are only
+wrapped while a trace is active, so there is no cost otherwise::
+
+    with Trace() as trace:
+        helpers.interpolate_with_sva_pilotpoints_2d(...)
+    print(trace.summary())
+    trace.to_json("trace.json")
+
+A :class:`Trace` can also decorate a function. The JSON trace uses the Trace
+Event Format, which can be loaded into chrome://tracing, Perfetto or
+speedscope.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import ContextDecorator
+from os import PathLike
+
+import numpy as np
+
+from .pestutilslib import PestUtilsLib
+
+__all__ = ["Trace"]
+
+# methods that are called by other methods to report errors
+_untraced = {"create_char_array", "retrieve_error_message"}
+
+# argument sizes, from the first of these arguments of each method, where
+# arrays give their length
+_size_args = {
+    "npts": ["npts", "ecs", "ecoord"],
+    "mpts": ["mpts", "ect", "ec"],
+    "ntime": ["ntime"],
+    "nreal": ["nreal"],
+}
+
+_lock = threading.Lock()
+_local = threading.local()
+_active: list[Trace] = []
+_originals: dict = {}
+
+
+def _peak_rss() -> int | None:
+    """Peak resident memory of the process in bytes, or None if unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _file_stat(fname) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(fname)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _arg_sizes(arguments: dict) -> dict:
+    sizes = {}
+    for size, names in _size_args.items():
+        for name in names:
+            if arguments.get(name) is not None:
+                value = arguments[name]
+                sizes[size] = len(value) if np.ndim(value) > 0 else int(value)
+                break
+    return sizes
+
+
+def _file_args(arguments: dict) -> list:
+    """File name arguments, which are named ...file or file..."""
+    return [
+        os.fspath(value)
+        for name, value in arguments.items()
+        if (name.endswith("file") or name.startswith("file"))
+        and isinstance(value, (str, PathLike))
+        and os.fspath(value) != ""
+    ]
+
+
+def _wrap(name: str, func):
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        # a trace entered more than once, as by nested decorated functions,
+        # records each call once
+        traces = list(
+            dict.fromkeys(trace for trace in _active if trace.lib in (None, self))
+        )
+        if not traces:
+            return func(self, *args, **kwargs)
+        arguments = signature.bind(self, *args, **kwargs).arguments
+        files = {fname: _file_stat(fname) for fname in _file_args(arguments)}
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+        error = None
+        rss = _peak_rss()
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        except BaseException as err:
+            error = type(err).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            _local.depth = depth
+            bytes_read = bytes_written = 0
+            for fname, before in files.items():
+                after = _file_stat(fname)
+                if after is None:
+                    continue
+                elif after == before:
+                    bytes_read += after[0]
+                else:
+                    bytes_written += after[0]
+            rss_delta = None if rss is None else _peak_rss() - rss
+            record = {
+                "name": name,
+                "start": start,
+                "time": end - start,
+                "sizes": _arg_sizes(arguments),
+                "bytes_read": bytes_read,
+                "bytes_written": bytes_written,
+                "peak_rss_delta": rss_delta,
+                "depth": depth,
+                "thread": threading.get_ident(),
+                "error": error,
+            }
+            for trace in traces:
+                trace.records.append(record)
+
+    return wrapper
+
+
+def _enable(trace: Trace) -> None:
+    with _lock:
+        if not _active:
+            for name, func in vars(PestUtilsLib).items():
+                if name.startswith("_") or name in _untraced:
+                    continue
+                if inspect.isfunction(func):
+                    _originals[name] = func
+                    setattr(PestUtilsLib, name, _wrap(name, func))
+        _active.append(trace)
+
+
+def _disable(trace: Trace) -> None:
+    with _lock:
+        _active.remove(trace)
+        if not _active:
+            for name, func in _originals.items():
+                setattr(PestUtilsLib, name, func)
+            _originals.clear()
+
+
+class Trace(ContextDecorator):
+    """Record calls to PestUtilsLib methods while active.
+
+    Parameters
+    ----------
+    lib : PestUtilsLib, optional
+        Only record calls to this instance. Default None records calls to
+        all instances, including those created by the helpers.
+
+    Attributes
+    ----------
+    records : list of dict
+        Calls in order of completion, each with "name", "start" and "time"
+        (seconds), "sizes" (any of npts, mpts, ntime and nreal), the sizes
+        of files read and written in "bytes_read" and "bytes_written", the
+        increase in peak resident memory in "peak_rss_delta" (bytes, or None
+        if unknown), "depth" of calls within other calls, "thread" and
+        "error" (exception name or None).
+
+    Notes
+    -----
+    Calls made from all threads are recorded while a trace is active, not
+    only those of the thread that entered it. A trace may be entered again
+    while active, and records each call once.
+
+    A file argument is counted as written if it is created or modified by
+    the call, otherwise as read, so that partial reads are over-counted.
+    """
+
+    def __init__(self, lib: PestUtilsLib | None = None) -> None:
+        self.lib = lib
+        self.records = []
+        self._start = None
+
+    def __enter__(self) -> Trace:
+        if self._start is None:
+            self._start = time.perf_counter()
+        _enable(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _disable(self)
+
+    def summary(self) -> str:
+        """Table of calls, time, file sizes and peak memory by method.
+
+        Returns
+        -------
+        str
+        """
+        header = (
+            f"{'method':<40} {'calls':>6} {'total (s)':>10} {'max (s)':>10} "
+            f"{'read (MB)':>10} {'written (MB)':>12} {'peak RSS (MB)':>13}"
+        )
+        lines = [header, "-" * len(header)]
+        names = sorted(
+            {record["name"] for record in self.records},
+            key=lambda name: -sum(r["time"] for r in self.records if r["name"] == name),
+        )
+        for name in names:
+            records = [record for record in self.records if record["name"] == name]
+            times = [record["time"] for record in records]
+            rss = [record["peak_rss_delta"] for record in records]
+            rss_mb = "" if None in rss else f"{max(rss) / 1024**2:13.1f}"
+            read_mb = sum(record["bytes_read"] for record in records) / 1024**2
+            written_mb = sum(record["bytes_written"] for record in records) / 1024**2
+            lines.append(
+                f"{name:<40} {len(records):6d} {sum(times):10.3f} {max(times):10.3f} "
+                f"{read_mb:10.1f} {written_mb:12.1f} {rss_mb:>13}"
+            )
+        return "\n".join(lines)
+
+    def to_json(self, fname: str | PathLike) -> None:
+        """Write calls as complete events of the Trace Event Format.
+
+        Parameters
+        ----------
+        fname : str or PathLike
+            JSON file to write.
+        """
+        events = []
+        for record in self.records:
+            args = {
+                key: record[key]
+                for key in ["bytes_read", "bytes_written", "peak_rss_delta", "error"]
+            }
+            args.update(record["sizes"])
+            events.append(
+                {
+                    "name": record["name"],
+                    "cat": "PestUtilsLib",
+                    "ph": "X",
+                    "ts": (record["start"] - self._start) * 1e6,
+                    "dur": record["time"] * 1e6,
+                    "pid": os.getpid(),
+                    "tid": record["thread"],
+                    "args": args,
+                }
+            )
+        with open(fname, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
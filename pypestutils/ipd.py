@@ -0,0 +1,729 @@
+"""Inverse-power-of-distance interpolation evaluated with NumPy.
+
+Weights are evaluated with the same arithmetic as the shared library, so
+that results match :meth:`PestUtilsLib.ipd_interpolate_2d` and
+:meth:`PestUtilsLib.ipd_interpolate_3d` where all source points are used.
+The number of source points contributing to each target may be limited to
+the nearest neighbours within a search radius, found with a spatial index
+(requires scipy).
+
+Interpolation factors may also be written to a file in the format read by
+:meth:`PestUtilsLib.krige_using_file`, so that only source values need to be
+supplied when interpolating repeatedly.
+"""
+from __future__ import annotations
+
+import abc
+from os import PathLike
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from pypestutils import enum
+from pypestutils.data import ManyArrays, validate_scalar
+
+__all__ = [
+    "calc_ipd_factors_2d",
+    "calc_ipd_factors_3d",
+    "ipd_interpolate_2d",
+    "ipd_interpolate_3d",
+]
+
+# number of target-source pairs evaluated at a time
+CHUNK_SIZE = 1_000_000
+
+# degrees to radians, as used by the shared library
+DTOR = 3.1415926535898 / 180.0
+
+
+class _Ipd(abc.ABC):
+    """Source and target points for inverse-power-of-distance interpolation."""
+
+    ndim: int
+    src: npt.NDArray[np.float64]
+    tgt: npt.NDArray[np.float64]
+    zns: npt.NDArray[np.int32]
+    znt: npt.NDArray[np.int32]
+    invpow: npt.NDArray[np.float64]
+
+    def _check_zones(self) -> None:
+        if (self.zns == 0).all():
+            raise ValueError("all elements of the zns array are supplied as zero")
+        if (self.znt == 0).all():
+            raise ValueError("all elements of the znt array are supplied as zero")
+        missing = np.setdiff1d(self.znt[self.znt != 0], self.zns)
+        if len(missing) > 0:
+            raise ValueError(
+                f"zone {missing[0]} from the znt array is not represented in "
+                "the zns array"
+            )
+
+    def _check_invpow(self, active: npt.NDArray[np.bool_]) -> None:
+        if (self.invpow[active] < 0.0).any():
+            raise ValueError(
+                "at least one invpow value is less than zero for a target point "
+                "to which interpolation is required"
+            )
+
+    @abc.abstractmethod
+    def sqdist(
+        self, itgt: npt.NDArray[np.intp], jsrc: npt.NDArray[np.intp]
+    ) -> npt.NDArray[np.float64]:
+        """Squared anisotropic distance between pairs of targets and sources."""
+
+    @abc.abstractmethod
+    def scale(self, itgt: npt.NDArray[np.intp]) -> npt.NDArray[np.float64]:
+        """Smallest ratio of anisotropic to Euclidean distance for targets."""
+
+
+class _Ipd2D(_Ipd):
+    """Points for 2D interpolation, as for ipd_interpolate_2d."""
+
+    ndim = 2
+
+    def __init__(self, ecs, ncs, zns, ect, nct, znt, anis, bearing, invpow):
+        npta = ManyArrays({"ecs": ecs, "ncs": ncs}, int_any={"zns": zns})
+        mpta = ManyArrays(
+            {"ect": ect, "nct": nct},
+            {"anis": anis, "bearing": bearing, "invpow": invpow},
+            {"znt": znt},
+        )
+        self.src = np.column_stack([npta.ecs, npta.ncs])
+        self.tgt = np.column_stack([mpta.ect, mpta.nct])
+        self.zns = npta.zns
+        self.znt = mpta.znt
+        self._check_zones()
+        active = self.znt != 0
+        if (mpta.anis[active] <= 0.0).any():
+            raise ValueError(
+                "at least one anis value is zero or negative for a target point "
+                "to which interpolation is required"
+            )
+        bearing = mpta.bearing[active]
+        if ((bearing < -360.0) | (bearing > 360.0)).any():
+            raise ValueError(
+                "at least one bearing value is less than -360 or greater than "
+                "360 for a target point to which interpolation is required"
+            )
+        self.invpow = mpta.invpow
+        self._check_invpow(active)
+        self.anis = mpta.anis
+        angle = 90.0 - mpta.bearing + 90.0
+        self.cosang = np.cos(angle * DTOR)
+        self.sinang = np.sin(angle * DTOR)
+
+    def sqdist(self, itgt, jsrc) -> npt.NDArray[np.float64]:
+        dx = self.src[jsrc, 0] - self.tgt[itgt, 0]
+        dy = self.src[jsrc, 1] - self.tgt[itgt, 1]
+        cosang = self.cosang[itgt]
+        sinang = self.sinang[itgt]
+        dtempx = (dx * cosang + dy * sinang) * self.anis[itgt]
+        dtempy = -dx * sinang + dy * cosang
+        return dtempx * dtempx + dtempy * dtempy
+
+    def scale(self, itgt) -> npt.NDArray[np.float64]:
+        return np.minimum(self.anis[itgt], 1.0)
+
+
+class _Ipd3D(_Ipd):
+    """Points for 3D interpolation, as for ipd_interpolate_3d."""
+
+    ndim = 3
+
+    def __init__(
+        self,
+        ecs,
+        ncs,
+        zcs,
+        zns,
+        ect,
+        nct,
+        zct,
+        znt,
+        ahmax,
+        ahmin,
+        avert,
+        bearing,
+        dip,
+        rake,
+        invpow,
+    ):
+        npta = ManyArrays({"ecs": ecs, "ncs": ncs, "zcs": zcs}, int_any={"zns": zns})
+        mpta = ManyArrays(
+            {"ect": ect, "nct": nct, "zct": zct},
+            {
+                "ahmax": ahmax,
+                "ahmin": ahmin,
+                "avert": avert,
+                "bearing": bearing,
+                "dip": dip,
+                "rake": rake,
+                "invpow": invpow,
+            },
+            {"znt": znt},
+        )
+        self.src = np.column_stack([npta.ecs, npta.ncs, npta.zcs])
+        self.tgt = np.column_stack([mpta.ect, mpta.nct, mpta.zct])
+        self.zns = npta.zns
+        self.znt = mpta.znt
+        self._check_zones()
+        active = self.znt != 0
+        for name in ["ahmax", "ahmin", "avert"]:
+            if (getattr(mpta, name)[active] <= 0.0).any():
+                raise ValueError(
+                    f"at least one {name} value is zero or negative for a target "
+                    "point to which interpolation is required"
+                )
+        for name, limit in [("bearing", 360.0), ("dip", 180.0), ("rake", 90.0)]:
+            angle = getattr(mpta, name)[active]
+            if ((angle < -limit) | (angle > limit)).any():
+                raise ValueError(
+                    f"at least one {name} value is less than {-limit:g} degrees or "
+                    f"greater than {limit:g} degrees for a target point to which "
+                    "interpolation is required"
+                )
+        self.invpow = mpta.invpow
+        self._check_invpow(active)
+        angle = 90.0 - mpta.bearing
+        self.cosang1 = np.cos(angle * DTOR)
+        self.sinang1 = np.sin(angle * DTOR)
+        self.cosang2 = np.cos(mpta.dip * DTOR)
+        self.sinang2 = np.sin(mpta.dip * DTOR)
+        self.cosang3 = np.cos(mpta.rake * DTOR)
+        self.sinang3 = np.sin(mpta.rake * DTOR)
+        den_amid = mpta.ahmax / mpta.ahmin
+        den_avert = mpta.ahmax / mpta.avert
+        self.den_amid2 = den_amid * den_amid
+        self.den_avert2 = den_avert * den_avert
+        self._scale = np.minimum(1.0, np.minimum(den_amid, den_avert))
+
+    def sqdist(self, itgt, jsrc) -> npt.NDArray[np.float64]:
+        xdiff = self.src[jsrc, 0] - self.tgt[itgt, 0]
+        ydiff = self.src[jsrc, 1] - self.tgt[itgt, 1]
+        zdiff = self.src[jsrc, 2] - self.tgt[itgt, 2]
+        cosang1 = self.cosang1[itgt]
+        sinang1 = self.sinang1[itgt]
+        cosang2 = self.cosang2[itgt]
+        sinang2 = self.sinang2[itgt]
+        cosang3 = self.cosang3[itgt]
+        sinang3 = self.sinang3[itgt]
+        xd = xdiff * cosang1 + ydiff * sinang1
+        yd = -xdiff * sinang1 + ydiff * cosang1
+        xdd = xd * cosang2 + zdiff * sinang2
+        zdd = -xd * sinang2 + zdiff * cosang2
+        dmid = yd * cosang3 + zdd * sinang3
+        dvert = -yd * sinang3 + zdd * cosang3
+        return (
+            xdd * xdd * 1.0
+            + dmid * dmid * self.den_amid2[itgt]
+            + dvert * dvert * self.den_avert2[itgt]
+        )
+
+    def scale(self, itgt) -> npt.NDArray[np.float64]:
+        return self._scale[itgt]
+
+
+def _all_pairs(ipd: _Ipd, tgt: npt.NDArray[np.intp], src: npt.NDArray[np.intp]):
+    """Yield (itgt, jsrc) of all pairs, in chunks of targets."""
+    nrows = max(1, CHUNK_SIZE // len(src))
+    for r0 in range(0, len(tgt), nrows):
+        itgt = tgt[r0 : r0 + nrows]
+        yield np.repeat(itgt, len(src)), np.tile(src, len(itgt))
+
+
+def _nearest_pairs(
+    ipd: _Ipd,
+    tgt: npt.NDArray[np.intp],
+    src: npt.NDArray[np.intp],
+    max_pts: int | None,
+    search_radius: float | None,
+):
+    """Yield (itgt, jsrc) of nearest sources within search radius of targets.
+
+    Sources are found with a k-d tree in Euclidean space. Anisotropic
+    distances are not less than the Euclidean distances multiplied by a
+    scale, so candidates are gathered from balls enlarged by this scale.
+    """
+    from scipy.spatial import cKDTree
+
+    tree = cKDTree(ipd.src[src])
+    nsrc = len(src)
+    kpts = nsrc if max_pts is None else min(max_pts, nsrc)
+    nomatch = len(ipd.src)
+    # targets per chunk, assuming a few times kpts candidates within balls
+    nrows = max(1, CHUNK_SIZE // (4 * min(kpts, 256)))
+    for r0 in range(0, len(tgt), nrows):
+        itgt = tgt[r0 : r0 + nrows]
+        scale = ipd.scale(itgt)
+        # squared anisotropic search radius of each target
+        if search_radius is None:
+            sqradius = np.full(len(itgt), np.inf)
+        else:
+            sqradius = np.full(len(itgt), search_radius**2)
+        if kpts < nsrc:
+            # anisotropic distance to the kpts-th of the nearest Euclidean
+            # neighbours bounds that of the kpts-th nearest anisotropic one
+            _, near = tree.query(
+                ipd.tgt[itgt],
+                kpts,
+                distance_upper_bound=np.max(np.sqrt(sqradius) / scale),
+            )
+            near = near.reshape(len(itgt), kpts)
+            found = near < nsrc
+            sqd = ipd.sqdist(itgt[:, np.newaxis], src[np.where(found, near, 0)])
+            sqd[~found] = np.inf
+            sqradius = np.minimum(sqradius, sqd.max(axis=1))
+        # slightly enlarge balls to include candidates on their boundary
+        balls = tree.query_ball_point(
+            ipd.tgt[itgt], np.sqrt(sqradius) / scale * (1.0 + 1e-9) + 1e-12
+        )
+        counts = np.fromiter((len(ball) for ball in balls), np.intp, len(balls))
+        if counts.sum() == 0:
+            continue
+        # candidates of each target in a row, padded with infinite distance
+        local = np.repeat(np.arange(len(itgt)), counts)
+        col = np.arange(len(local)) - (np.cumsum(counts) - counts)[local]
+        jsrc = src[np.concatenate([ball for ball in balls if ball])]
+        sqd = ipd.sqdist(itgt[local], jsrc)
+        sqd[sqd > sqradius[local]] = np.inf
+        rowsqd = np.full((len(itgt), counts.max()), np.inf)
+        rowsqd[local, col] = sqd
+        rowsrc = np.zeros(rowsqd.shape, np.intp)
+        rowsrc[local, col] = jsrc
+        if max_pts is not None and rowsqd.shape[1] > max_pts:
+            nearest = np.argpartition(rowsqd, max_pts - 1, axis=1)[:, :max_pts]
+            rowsqd = np.take_along_axis(rowsqd, nearest, axis=1)
+            rowsrc = np.take_along_axis(rowsrc, nearest, axis=1)
+        # sources of each target in ascending order, as for the shared library
+        rowsrc[np.isinf(rowsqd)] = nomatch
+        rowsrc.sort(axis=1)
+        keep = rowsrc != nomatch
+        yield np.broadcast_to(itgt[:, np.newaxis], keep.shape)[keep], rowsrc[keep]
+
+
+def _ipd_pairs(
+    ipd: _Ipd, max_pts: int | None = None, search_radius: float | None = None
+):
+    """Yield (itgt, jsrc) of target-source pairs contributing to targets.
+
+    Pairs are grouped by target, with sources in ascending order.
+    """
+    if max_pts is not None:
+        validate_scalar("max_pts", max_pts, ge=1)
+    if search_radius is not None:
+        validate_scalar("search_radius", search_radius, gt=0.0)
+    for zone in np.unique(ipd.znt[ipd.znt != 0]):
+        tgt = np.flatnonzero(ipd.znt == zone)
+        src = np.flatnonzero(ipd.zns == zone)
+        if search_radius is None and (max_pts is None or max_pts >= len(src)):
+            yield from _all_pairs(ipd, tgt, src)
+        else:
+            yield from _nearest_pairs(ipd, tgt, src, max_pts, search_radius)
+
+
+def _ipd_factors(ipd: _Ipd, itgt, jsrc) -> npt.NDArray[np.float64]:
+    """Inverse-power-of-distance factors of target-source pairs."""
+    sqd = ipd.sqdist(itgt, jsrc)
+    power = np.sqrt(ipd.invpow[itgt])
+    with np.errstate(divide="ignore"):
+        fac = 1.0 / (sqd**power)
+    fac[sqd < 1.0e-30] = 1.0e30
+    return fac
+
+
+def _write_factor_header(
+    fp, binary: bool, acode: str, npts: int, mpts: int
+) -> None:
+    """Write the header of a factor file read by krige_using_file."""
+    if binary:
+        fp.write(acode.ljust(20).encode())
+        np.array([npts, mpts], np.int32).tofile(fp)
+    else:
+        fp.write(f"{acode}\n{npts:10d}{mpts:10d}\n")
+
+
+def _write_factor_records(
+    fp,
+    binary: bool,
+    npts: int,
+    mpts: int,
+    icell: npt.NDArray[np.intp],
+    na: npt.NDArray[np.intp],
+    rtemp: npt.ArrayLike,
+    jsrc: npt.NDArray[np.intp],
+    fac: npt.NDArray[np.floating],
+) -> None:
+    """Write records of targets, each with na consecutive source factors."""
+    if len(icell) == 0:
+        return
+    rtemp = np.broadcast_to(np.asarray(rtemp, np.float32), icell.shape)
+    first = np.cumsum(na) - na
+    if not binary:
+        # integer widths, as for calc_kriging_factors_2d
+        w1 = len(str(npts)) + 1
+        w2 = len(str(mpts)) + 1
+        for ipt, i0, n, rt in zip(icell, first, na, rtemp):
+            pairs = "".join(
+                f"{j + 1:{w1}d} {w:14.7E}"
+                for j, w in zip(jsrc[i0 : i0 + n], fac[i0 : i0 + n])
+            )
+            fp.write(f"{ipt + 1:{w2}d}{n:{w1}d} {rt:14.7E}{pairs}\n")
+        return
+    # records of icellno, na, rtemp and na pairs of index and factor,
+    # as 4 byte integers and single precision reals
+    start = np.cumsum(3 + 2 * na) - (3 + 2 * na)
+    words = np.zeros(start[-1] + 3 + 2 * na[-1], np.int32)
+    words[start] = icell + 1
+    words[start + 1] = na
+    words[start + 2] = rtemp.view(np.int32)
+    pos = np.repeat(start + 3 - 2 * first, na) + 2 * np.arange(len(jsrc))
+    words[pos] = jsrc + 1
+    words[pos + 1] = fac.astype(np.float32).view(np.int32)
+    words.tofile(fp)
+
+
+def _write_factor_file(
+    ipd: _Ipd,
+    factorfile: str | PathLike,
+    factorfiletype: int | str | enum.FactorFileType,
+    max_pts: int | None,
+    search_radius: float | None,
+) -> int:
+    """Write normalised factors in the format of ordinary kriging factors."""
+    if isinstance(factorfiletype, str):
+        factorfiletype = enum.FactorFileType.get_value(factorfiletype)
+    validate_scalar("factorfiletype", factorfiletype, enum=enum.FactorFileType)
+    npts = len(ipd.zns)
+    mpts = len(ipd.znt)
+    icount_interp = 0
+    binary = factorfiletype == enum.FactorFileType.binary
+    with Path(factorfile).open("wb" if binary else "w") as fp:
+        # weights sum to one for each target, as for ordinary kriging
+        _write_factor_header(fp, binary, f"{ipd.ndim}dko", npts, mpts)
+        for itgt, jsrc in _ipd_pairs(ipd, max_pts, search_radius):
+            fac = _ipd_factors(ipd, itgt, jsrc)
+            icell, first, na = np.unique(itgt, return_index=True, return_counts=True)
+            fac /= np.repeat(np.add.reduceat(fac, first), na)
+            icount_interp += len(icell)
+            _write_factor_records(fp, binary, npts, mpts, icell, na, 0.0, jsrc, fac)
+    return icount_interp
+
+
+def _ipd_interpolate(
+    ipd: _Ipd,
+    sourceval: npt.ArrayLike,
+    transtype: int | str | enum.TransType,
+    max_pts: int | None,
+    search_radius: float | None,
+    nointerpval: float,
+) -> npt.NDArray[np.float64]:
+    if isinstance(transtype, str):
+        transtype = enum.TransType.get_value(transtype)
+    validate_scalar("transtype", transtype, enum=enum.TransType)
+    sourceval = ManyArrays({"sourceval": sourceval}, ar_len=len(ipd.zns)).sourceval
+    if transtype == enum.TransType.log:
+        if (sourceval[ipd.zns != 0] <= 0.0).any():
+            raise ValueError(
+                "if transtype is log then all source values in non-zero zones "
+                "must be positive"
+            )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sourceval = np.log(sourceval)
+    mpts = len(ipd.znt)
+    num = np.zeros(mpts)
+    den = np.zeros(mpts)
+    for itgt, jsrc in _ipd_pairs(ipd, max_pts, search_radius):
+        fac = _ipd_factors(ipd, itgt, jsrc)
+        num += np.bincount(itgt, fac * sourceval[jsrc], mpts)
+        den += np.bincount(itgt, fac, mpts)
+    targval = np.full(mpts, nointerpval, np.float64)
+    interp = den > 0.0
+    targval[interp] = num[interp] / den[interp]
+    if transtype == enum.TransType.log:
+        targval[interp] = np.exp(targval[interp])
+    return targval
+
+
+def ipd_interpolate_2d(
+    ecs: npt.ArrayLike,
+    ncs: npt.ArrayLike,
+    zns: int | npt.ArrayLike,
+    sourceval: npt.ArrayLike,
+    ect: npt.ArrayLike,
+    nct: npt.ArrayLike,
+    znt: int | npt.ArrayLike,
+    transtype: int | str | enum.TransType,
+    anis: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    invpow: float | npt.ArrayLike,
+    max_pts: int | None = None,
+    search_radius: float | None = None,
+    nointerpval: float = 0.0,
+) -> npt.NDArray[np.float64]:
+    """Undertake 2D inverse-power-of-distance spatial interpolation.
+
+    Parameters
+    ----------
+    ecs, ncs : array_like
+        Source point coordinates, each 1D array with shape (npts,).
+    zns : int or array_like
+        Source point zones, integer or 1D array with shape (npts,).
+    sourceval : array_like
+        Source values, 1D array with shape (npts,).
+    ect, nct : array_like
+        Target point coordinates, each 1D array with shape (mpts,).
+    znt : int or array_like
+        Target point zones, integer or 1D array with shape (mpts,).
+    transtype : int, str, enum.TransType
+        Tranformation type, where 0 is none and 1 is log.
+    anis : float or array_like
+        Local anisotropy, float or 1D array with shape (mpts,).
+    bearing : float or array_like
+        Local anisotropy bearing, float or 1D array with shape (mpts,).
+    invpow : float or array_like
+        Local inverse power of distance, float or 1D array with shape (mpts,).
+    max_pts : int, optional
+        Maximum number of nearest source points used for each target.
+        Default uses all source points in the zone of the target.
+    search_radius : float, optional
+        Maximum anisotropic distance of source points used for each target.
+        Default is unlimited.
+    nointerpval : float, default 0.0
+        Value for targets in zone zero, or without source points within the
+        search radius.
+
+    Returns
+    -------
+    npt.NDArray[np.float64]
+        Values calculated for targets.
+
+    See Also
+    --------
+    PestUtilsLib.ipd_interpolate_2d : Equivalent function in the shared
+        library, which uses all source points.
+    """
+    ipd = _Ipd2D(ecs, ncs, zns, ect, nct, znt, anis, bearing, invpow)
+    return _ipd_interpolate(
+        ipd, sourceval, transtype, max_pts, search_radius, nointerpval
+    )
+
+
+def ipd_interpolate_3d(
+    ecs: npt.ArrayLike,
+    ncs: npt.ArrayLike,
+    zcs: npt.ArrayLike,
+    zns: int | npt.ArrayLike,
+    sourceval: npt.ArrayLike,
+    ect: npt.ArrayLike,
+    nct: npt.ArrayLike,
+    zct: npt.ArrayLike,
+    znt: int | npt.ArrayLike,
+    transtype: int | str | enum.TransType,
+    ahmax: float | npt.ArrayLike,
+    ahmin: float | npt.ArrayLike,
+    avert: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    dip: float | npt.ArrayLike,
+    rake: float | npt.ArrayLike,
+    invpow: float | npt.ArrayLike,
+    max_pts: int | None = None,
+    search_radius: float | None = None,
+    nointerpval: float = 0.0,
+) -> npt.NDArray[np.float64]:
+    """Undertake 3D inverse-power-of-distance spatial interpolation.
+
+    Parameters
+    ----------
+    ecs, ncs, zcs : array_like
+        Source point coordinates, each 1D array with shape (npts,).
+    zns : int or array_like
+        Source point zones, integer or 1D array with shape (npts,).
+    sourceval : array_like
+        Source values, 1D array with shape (npts,).
+    ect, nct, zct : array_like
+        Target point coordinates, each 1D array with shape (mpts,).
+    znt : int or array_like
+        Target point zones, integer or 1D array with shape (mpts,).
+    transtype : int, str, enum.TransType
+        Tranformation type, where 0 is none and 1 is log.
+    ahmax, ahmin, avert : float or array_like
+        Relative correlation lengths, float or 1D array with shape (mpts,).
+    bearing, dip, rake : float or array_like
+        Correlation directions, float or 1D array with shape (mpts,).
+    invpow : float or array_like
+        Local inverse power of distance, float or 1D array with shape (mpts,).
+    max_pts : int, optional
+        Maximum number of nearest source points used for each target.
+        Default uses all source points in the zone of the target.
+    search_radius : float, optional
+        Maximum anisotropic distance of source points used for each target,
+        in units of distance along the ahmax direction. Default is unlimited.
+    nointerpval : float, default 0.0
+        Value for targets in zone zero, or without source points within the
+        search radius.
+
+    Returns
+    -------
+    npt.NDArray[np.float64]
+        Values calculated for targets.
+
+    See Also
+    --------
+    PestUtilsLib.ipd_interpolate_3d : Equivalent function in the shared
+        library, which uses all source points.
+    """
+    ipd = _Ipd3D(
+        ecs,
+        ncs,
+        zcs,
+        zns,
+        ect,
+        nct,
+        zct,
+        znt,
+        ahmax,
+        ahmin,
+        avert,
+        bearing,
+        dip,
+        rake,
+        invpow,
+    )
+    return _ipd_interpolate(
+        ipd, sourceval, transtype, max_pts, search_radius, nointerpval
+    )
+
+
+def calc_ipd_factors_2d(
+    ecs: npt.ArrayLike,
+    ncs: npt.ArrayLike,
+    zns: int | npt.ArrayLike,
+    ect: npt.ArrayLike,
+    nct: npt.ArrayLike,
+    znt: int | npt.ArrayLike,
+    anis: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    invpow: float | npt.ArrayLike,
+    factorfile: str | PathLike,
+    factorfiletype: int | str | enum.FactorFileType,
+    max_pts: int | None = None,
+    search_radius: float | None = None,
+) -> int:
+    """Calculate 2D inverse-power-of-distance interpolation factors.
+
+    Factors are written as for ordinary kriging, and are applied with
+    :meth:`PestUtilsLib.krige_using_file` with krigtype "ordinary".
+
+    Parameters
+    ----------
+    ecs, ncs : array_like
+        Source point coordinates, each 1D array with shape (npts,).
+    zns : int or array_like
+        Source point zones, integer or 1D array with shape (npts,).
+    ect, nct : array_like
+        Target point coordinates, each 1D array with shape (mpts,).
+    znt : int or array_like
+        Target point zones, integer or 1D array with shape (mpts,).
+    anis : float or array_like
+        Local anisotropy, float or 1D array with shape (mpts,).
+    bearing : float or array_like
+        Local anisotropy bearing, float or 1D array with shape (mpts,).
+    invpow : float or array_like
+        Local inverse power of distance, float or 1D array with shape (mpts,).
+    factorfile : str or PathLike
+        File for interpolation factors.
+    factorfiletype : int, str or enum.FactorFileType
+        Factor file type, where 0:binary, 1:text.
+    max_pts : int, optional
+        Maximum number of nearest source points used for each target.
+        Default uses all source points in the zone of the target.
+    search_radius : float, optional
+        Maximum anisotropic distance of source points used for each target.
+        Default is unlimited.
+
+    Returns
+    -------
+    int
+        Number of interp points.
+    """
+    ipd = _Ipd2D(ecs, ncs, zns, ect, nct, znt, anis, bearing, invpow)
+    return _write_factor_file(ipd, factorfile, factorfiletype, max_pts, search_radius)
+
+
+def calc_ipd_factors_3d(
+    ecs: npt.ArrayLike,
+    ncs: npt.ArrayLike,
+    zcs: npt.ArrayLike,
+    zns: int | npt.ArrayLike,
+    ect: npt.ArrayLike,
+    nct: npt.ArrayLike,
+    zct: npt.ArrayLike,
+    znt: int | npt.ArrayLike,
+    ahmax: float | npt.ArrayLike,
+    ahmin: float | npt.ArrayLike,
+    avert: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    dip: float | npt.ArrayLike,
+    rake: float | npt.ArrayLike,
+    invpow: float | npt.ArrayLike,
+    factorfile: str | PathLike,
+    factorfiletype: int | str | enum.FactorFileType,
+    max_pts: int | None = None,
+    search_radius: float | None = None,
+) -> int:
+    """Calculate 3D inverse-power-of-distance interpolation factors.
+
+    Factors are written as for ordinary kriging, and are applied with
+    :meth:`PestUtilsLib.krige_using_file` with krigtype "ordinary".
+
+    Parameters
+    ----------
+    ecs, ncs, zcs : array_like
+        Source point coordinates, each 1D array with shape (npts,).
+    zns : int or array_like
+        Source point zones, integer or 1D array with shape (npts,).
+    ect, nct, zct : array_like
+        Target point coordinates, each 1D array with shape (mpts,).
+    znt : int or array_like
+        Target point zones, integer or 1D array with shape (mpts,).
+    ahmax, ahmin, avert : float or array_like
+        Relative correlation lengths, float or 1D array with shape (mpts,).
+    bearing, dip, rake : float or array_like
+        Correlation directions, float or 1D array with shape (mpts,).
+    invpow : float or array_like
+        Local inverse power of distance, float or 1D array with shape (mpts,).
+    factorfile : str or PathLike
+        File for interpolation factors.
+    factorfiletype : int, str or enum.FactorFileType
+        Factor file type, where 0:binary, 1:text.
+    max_pts : int, optional
+        Maximum number of nearest source points used for each target.
+        Default uses all source points in the zone of the target.
+    search_radius : float, optional
+        Maximum anisotropic distance of source points used for each target,
+        in units of distance along the ahmax direction. Default is unlimited.
+
+    Returns
+    -------
+    int
+        Number of interp points.
+    """
+    ipd = _Ipd3D(
+        ecs,
+        ncs,
+        zcs,
+        zns,
+        ect,
+        nct,
+        zct,
+        znt,
+        ahmax,
+        ahmin,
+        avert,
+        bearing,
+        dip,
+        rake,
+        invpow,
+    )
+    return _write_factor_file(ipd, factorfile, factorfiletype, max_pts, search_radius)
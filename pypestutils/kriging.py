@@ -0,0 +1,757 @@
+"""Kriging factors calculated with NumPy.
+
+Factors are calculated as by the GSLIB routines of the shared library, with
+the same single precision variogram arithmetic, so that factor files match
+those written by :meth:`PestUtilsLib.calc_kriging_factors_2d` and
+:meth:`PestUtilsLib.calc_kriging_factors_3d`, and are applied with
+:meth:`PestUtilsLib.krige_using_file`. Rather than searching for source
+points and solving the kriging system of each target in turn, the nearest
+source points of many targets are found with a k-d tree and their kriging
+systems are solved together (requires scipy).
+"""
+from __future__ import annotations
+
+import abc
+import re
+from os import PathLike
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from pypestutils import enum
+from pypestutils.covariance import _f32, _Variogram2D, _Variogram3D
+from pypestutils.data import ManyArrays, validate_scalar
+from pypestutils.ipd import _write_factor_header, _write_factor_records
+from pypestutils.overlay import _pair_index
+
+__all__ = ["calc_kriging_factors_2d", "calc_kriging_factors_3d"]
+
+# number of kriging matrix elements evaluated at a time
+CHUNK_SIZE = 1_000_000
+
+# largest search radius, as used by the shared library
+MAX_RADIUS = np.float32(1.0e15)
+
+
+class _Zone(abc.ABC):
+    """Source and target points of a zone, with variogram and search.
+
+    Coordinates are single precision, relative to an origin, as for the
+    shared library. Targets are indexed within the zone.
+    """
+
+    ndim: int
+    # whether covariances between sources are evaluated from their
+    # displacements from the target, rather than from their coordinates
+    relative: bool
+
+    def __init__(self, isrc, itgt, src, tgt, origin, radius, maxpts, minpts):
+        self.isrc = isrc
+        self.itgt = itgt
+        self.src = _f32(src[isrc] - origin)
+        self.tgt = _f32(tgt[itgt] - origin)
+        self.sqradius = radius * radius
+        self.kpts = min(maxpts, len(isrc))
+        self.minpts = minpts
+
+    @abc.abstractmethod
+    def search_coords(self, coords: npt.NDArray[np.float32]) -> npt.NDArray[np.float64]:
+        """Coordinates in which search distances are Euclidean."""
+
+    @abc.abstractmethod
+    def sqdist(
+        self, itgt: npt.NDArray[np.intp], jsrc: npt.NDArray[np.intp]
+    ) -> npt.NDArray[np.float32]:
+        """Squared search distance between pairs of targets and sources."""
+
+    @abc.abstractmethod
+    def cova(
+        self, itgt: npt.NDArray[np.intp], d: npt.NDArray[np.float32]
+    ) -> npt.NDArray[np.float32]:
+        """Covariance of displacements d, with shape (..., ndim), of targets."""
+
+    @abc.abstractmethod
+    def unbias(self, itgt: npt.NDArray[np.intp]) -> npt.NDArray[np.float32]:
+        """Covariance at zero distance of targets."""
+
+    def select(
+        self, jsrc: npt.NDArray[np.intp], sqd: npt.NDArray[np.float32]
+    ) -> npt.NDArray[np.bool_]:
+        """Select the nearest of candidate sources of targets.
+
+        Candidates jsrc, with squared distances sqd, are in order of
+        increasing distance, then of source, and include all sources as near
+        as the last of kpts nearest. Unavailable candidates have infinite
+        distance. Returns whether each candidate is selected.
+        """
+        keep = np.isfinite(sqd)
+        keep[:, self.kpts :] = False
+        return keep
+
+
+class _Zone2D(_Zone):
+    """Zone for 2D kriging, as for kb2d, with variograms of targets."""
+
+    ndim = 2
+    relative = False
+
+    def __init__(self, isrc, itgt, src, tgt, origin, vario, kvario, radius, *search):
+        super().__init__(isrc, itgt, src, tgt, origin, radius, *search)
+        self.vario = vario
+        self.kvario = kvario[itgt]
+
+    def search_coords(self, coords) -> npt.NDArray[np.float64]:
+        return coords.astype(np.float64)
+
+    def sqdist(self, itgt, jsrc) -> npt.NDArray[np.float32]:
+        dx = self.src[jsrc, 0] - self.tgt[itgt, 0]
+        dy = self.src[jsrc, 1] - self.tgt[itgt, 1]
+        return dx * dx + dy * dy
+
+    def cova(self, itgt, d) -> npt.NDArray[np.float32]:
+        return self.vario._cova2(self.kvario[itgt], d[..., 0], d[..., 1])
+
+    def unbias(self, itgt) -> npt.NDArray[np.float32]:
+        return self.vario.maxcov[self.kvario[itgt]]
+
+    def select(self, jsrc, sqd) -> npt.NDArray[np.bool_]:
+        # kb2d considers sources in turn, and one as near as the last of the
+        # kpts nearest replaces it, so sources as near as the last behave as
+        # a stack: those found before kpts are found are pushed, each nearer
+        # source found after pops, and each found after replaces the top
+        kpts = self.kpts
+        if sqd.shape[1] <= kpts:
+            return np.isfinite(sqd)
+        last = sqd[:, kpts - 1 : kpts]
+        found = np.isfinite(sqd) & (sqd <= last)
+        nearer = sqd < last
+        tied = found & ~nearer
+        # number of sources found when each candidate is found
+        key = np.where(found, jsrc, len(self.isrc))
+        count = np.argsort(np.argsort(key, axis=1), axis=1) + 1
+        after = count > kpts
+        pushed = (tied & ~after).sum(axis=1, keepdims=True)
+        popped = (nearer & after).sum(axis=1, keepdims=True)
+        last_pop = np.where(nearer & after, count, kpts).max(axis=1, keepdims=True)
+        replaced = np.where(tied & (count > last_pop), count, 0)
+        rank = np.cumsum(tied, axis=1)
+        top = np.where(
+            replaced.any(axis=1, keepdims=True),
+            replaced == replaced.max(axis=1, keepdims=True),
+            tied & (rank == pushed - popped),
+        )
+        return nearer | (tied & (rank < pushed - popped)) | (tied & top)
+
+
+class _Zone3D(_Zone):
+    """Zone for 3D kriging, as for kt3d, with a variogram and search of the
+    zone."""
+
+    ndim = 3
+    relative = True
+
+    def __init__(self, isrc, itgt, src, tgt, origin, vario, search, radius, *pts):
+        super().__init__(isrc, itgt, src, tgt, origin, radius, *pts)
+        self.vario = vario
+        self.rotmat = search.rotmat[0]
+
+    def search_coords(self, coords) -> npt.NDArray[np.float64]:
+        return coords.astype(np.float64) @ self.rotmat.T
+
+    def sqdist(self, itgt, jsrc) -> npt.NDArray[np.float32]:
+        d = (self.tgt[itgt] - self.src[jsrc]).astype(np.float64)
+        return _f32(((d @ self.rotmat.T) ** 2).sum(axis=-1))
+
+    def cova(self, itgt, d) -> npt.NDArray[np.float32]:
+        d = d.astype(np.float64)
+        return self.vario._cova3(0, d[..., 0], d[..., 1], d[..., 2])
+
+    def unbias(self, itgt) -> npt.NDArray[np.float32]:
+        return np.broadcast_to(self.vario.cmax[0], np.shape(itgt))
+
+
+def _enum_value(name: str, value, cls: type[enum.ParamEnum]) -> int:
+    if isinstance(value, str):
+        value = cls.get_value(value)
+    validate_scalar(name, value, enum=cls)
+    return int(value)
+
+
+def _check_search(maxpts: int, minpts: int) -> None:
+    validate_scalar("maxpts", maxpts, gt=0)
+    validate_scalar("minpts", minpts, gt=0)
+    if maxpts < minpts:
+        raise ValueError("maxpts must not be less than minpts")
+
+
+def _check_zones(zns: npt.NDArray[np.int32], znt: npt.NDArray[np.int32]) -> None:
+    if (zns == 0).all():
+        raise ValueError("all elements of the zns array are supplied as zero")
+    if (znt == 0).all():
+        raise ValueError("all elements of the znt array are supplied as zero")
+
+
+def _nearest_sources(zone: _Zone, tree, itgt: npt.NDArray[np.intp]):
+    """Find the nearest sources of targets within the search radius.
+
+    Candidates are found with a k-d tree, then accepted and ordered by the
+    squared distances of the shared library, with ties in order of source.
+    Where further candidates are about as near as the last of the nearest
+    sources, all are found, then selected as by the shared library.
+
+    Returns
+    -------
+    near : npt.NDArray[np.intp]
+        Sources of each target, with shape (len(itgt), kpts), in order of
+        increasing distance, and padded with the number of sources.
+    na : npt.NDArray[np.intp]
+        Number of sources found for each target.
+    """
+    kpts = zone.kpts
+    nsrc = len(zone.isrc)
+    coords = zone.search_coords(zone.tgt[itgt])
+    near = np.empty((len(itgt), kpts), np.intp)
+    na = np.empty(len(itgt), np.intp)
+    rows = np.arange(len(itgt))
+    # one more candidate than needed, to find targets with further sources
+    # that may be as near in single precision, which are searched again with
+    # more candidates
+    kquery = min(kpts + 1, nsrc)
+    while len(rows):
+        # slightly enlarge the radius to include candidates on its boundary
+        dist, jsrc = tree.query(
+            coords[rows],
+            kquery,
+            distance_upper_bound=np.sqrt(float(zone.sqradius)) * (1.0 + 1e-6),
+        )
+        dist = dist.reshape(len(rows), kquery)
+        jsrc = jsrc.reshape(len(rows), kquery)
+        more = np.zeros(len(rows), bool)
+        if kquery < nsrc:
+            more = np.isfinite(dist[:, -1]) & (
+                dist[:, -1] <= dist[:, kpts - 1] * (1.0 + 1e-6)
+            )
+        done = rows[~more]
+        itgt_done = itgt[done, np.newaxis]
+        jsrc = jsrc[~more]
+        found = jsrc < nsrc
+        sqd = zone.sqdist(itgt_done, np.where(found, jsrc, 0))
+        sqd[~found | (sqd > zone.sqradius)] = np.inf
+        order = np.lexsort((jsrc, sqd), axis=1)
+        jsrc = np.take_along_axis(jsrc, order, axis=1)
+        keep = zone.select(jsrc, np.take_along_axis(sqd, order, axis=1))
+        order = np.argsort(~keep, axis=1, kind="stable")[:, :kpts]
+        near[done] = np.take_along_axis(jsrc, order, axis=1)
+        na[done] = keep.sum(axis=1)
+        rows = rows[more]
+        kquery = min(2 * kquery, nsrc)
+    near[np.arange(kpts) >= na[:, np.newaxis]] = nsrc
+    return near, na
+
+
+def _kriging_weights(
+    zone: _Zone, itgt: npt.NDArray[np.intp], jsrc: npt.NDArray[np.intp], krigtype
+) -> npt.NDArray[np.float32]:
+    """Solve the kriging systems of targets, each with na sources.
+
+    Returns weights with the shape of jsrc, (len(itgt), na), or NaN for
+    targets with singular kriging matrices.
+    """
+    ntgt, na = jsrc.shape
+    xsrc = zone.src[jsrc]
+    dsrc = xsrc - zone.tgt[itgt, np.newaxis, :]
+    # right hand side covariances, between sources and target
+    cb = zone.cova(itgt[:, np.newaxis], dsrc)
+    unbias = zone.unbias(itgt)
+    if na == 1:
+        if krigtype == enum.KrigType.simple:
+            return cb / unbias[:, np.newaxis]
+        return np.ones((ntgt, 1), np.float32)
+    neq = na + krigtype
+    if zone.relative:
+        xsrc = dsrc
+    # left hand side covariances, from pairs of sources above the diagonal
+    # and the covariance at zero distance on it
+    iu, ju = np.triu_indices(na, 1)
+    cov = zone.cova(itgt[:, np.newaxis], xsrc[:, ju, :] - xsrc[:, iu, :])
+    a = np.zeros((ntgt, neq, neq))
+    a[:, iu, ju] = cov
+    a[:, ju, iu] = cov
+    a[:, np.arange(na), np.arange(na)] = unbias[:, np.newaxis]
+    r = np.zeros((ntgt, neq, 1))
+    r[:, :na, 0] = cb
+    if krigtype == enum.KrigType.ordinary:
+        # unbiasedness constraint
+        a[:, na, :na] = unbias[:, np.newaxis]
+        a[:, :na, na] = unbias[:, np.newaxis]
+        r[:, na, 0] = unbias
+    try:
+        s = np.linalg.solve(a, r)[:, :na, 0]
+    except np.linalg.LinAlgError:
+        # solve each system, to find those that are singular
+        s = np.full((ntgt, na), np.nan)
+        for i in range(ntgt):
+            try:
+                s[i] = np.linalg.solve(a[i], r[i])[:na, 0]
+            except np.linalg.LinAlgError:
+                pass
+    return s.astype(np.float32)
+
+
+def _unestimated(element: int, reason: str) -> ValueError:
+    return ValueError(
+        "interpolation cannot take place to all target points; the first "
+        f"element for which interpolation cannot take place is element number "
+        f"{element}; {reason}"
+    )
+
+
+def _write_zone_factors(
+    fp, binary: bool, npts: int, mpts: int, zone: _Zone, krigtype: int
+) -> None:
+    """Write kriging factors of the targets of a zone."""
+    from scipy.spatial import cKDTree
+
+    tree = cKDTree(zone.search_coords(zone.src))
+    kpts = zone.kpts
+    # targets per chunk, with kriging matrices of up to kpts + 1 equations
+    nrows = max(1, CHUNK_SIZE // (kpts + 1) ** 2)
+    for r0 in range(0, len(zone.itgt), nrows):
+        itgt = np.arange(r0, min(r0 + nrows, len(zone.itgt)))
+        near, na = _nearest_sources(zone, tree, itgt)
+        short = na < zone.minpts
+        if short.any():
+            raise _unestimated(
+                zone.itgt[itgt[short][0]] + 1,
+                "check that the search radius is large enough",
+            )
+        weights = np.zeros(near.shape, np.float32)
+        for n in np.unique(na):
+            rows = np.flatnonzero(na == n)
+            s = _kriging_weights(zone, itgt[rows], near[rows, :n], krigtype)
+            singular = np.isnan(s).any(axis=1)
+            if singular.any():
+                raise _unestimated(
+                    zone.itgt[itgt[rows[singular][0]]] + 1,
+                    "the kriging matrix is singular; check that no "
+                    "interpolation source points are coincident; if you are "
+                    "using a Gaussian variogram, try using another",
+                )
+            weights[rows, :n] = s
+        if krigtype == enum.KrigType.simple:
+            # sum of single precision weights in order, as the shared library
+            sumw = np.zeros(len(itgt), np.float32)
+            for k in range(kpts):
+                sumw += weights[:, k]
+            rtemp = np.float32(1.0) - sumw
+        else:
+            rtemp = np.float32(0.0)
+        keep = np.arange(kpts) < na[:, np.newaxis]
+        _write_factor_records(
+            fp,
+            binary,
+            npts,
+            mpts,
+            zone.itgt[itgt],
+            na,
+            rtemp,
+            zone.isrc[near[keep]],
+            weights[keep],
+        )
+
+
+def _write_factor_file(
+    zones: list[_Zone],
+    factorfile: str | PathLike,
+    factorfiletype: int | str | enum.FactorFileType,
+    npts: int,
+    mpts: int,
+    krigtype: int,
+) -> int:
+    factorfiletype = _enum_value("factorfiletype", factorfiletype, enum.FactorFileType)
+    binary = factorfiletype == enum.FactorFileType.binary
+    acode = f"{zones[0].ndim}dk" + ("s" if krigtype == enum.KrigType.simple else "o")
+    icount_interp = 0
+    with Path(factorfile).open("wb" if binary else "w") as fp:
+        _write_factor_header(fp, binary, acode, npts, mpts)
+        for zone in zones:
+            _write_zone_factors(fp, binary, npts, mpts, zone, krigtype)
+            icount_interp += len(zone.itgt)
+    return icount_interp
+
+
+def _read_factor_records(
+    factorfile: str | PathLike, factorfiletype: int | str | enum.FactorFileType
+) -> tuple:
+    """Read a factor file of ordinary kriging factors.
+
+    Returns the number of source and target points, the zero-based target
+    index and number of factors of each record, and the zero-based source
+    index and factor of each pair, in the order of records.
+    """
+    factorfile = Path(factorfile)
+    if not factorfile.is_file():
+        raise FileNotFoundError(f"could not find factorfile {factorfile}")
+    factorfiletype = _enum_value("factorfiletype", factorfiletype, enum.FactorFileType)
+    if factorfiletype == enum.FactorFileType.binary:
+        data = factorfile.read_bytes()
+        acode = data[:20].decode(errors="replace")
+        npts, mpts = (int(item) for item in np.frombuffer(data, "<i4", 2, 20))
+        # records of icellno, na, rtemp and na pairs of index and factor,
+        # as 4 byte integers and single precision reals
+        units = np.frombuffer(data, "<i4", (len(data) - 28) // 4, 28)
+        factors = units.view("<f4")
+    else:
+        with factorfile.open() as fp:
+            acode = fp.readline()
+            npts, mpts = (int(item) for item in fp.readline().split())
+            text = fp.read()
+        # exponents of more than two digits are written without an "E"
+        text = re.sub(r"(?<=\d)([+-]\d{3})\b", r"E\1", text)
+        units = np.array(text.split(), np.float64)
+        # factors are read as single precision by the shared library
+        factors = units.astype(np.float32)
+    if acode[:2] not in ("2d", "3d") or acode[2:4] != "ko":
+        raise ValueError(f"file {factorfile} does not have ordinary kriging factors")
+    # records are found in turn from the number of pairs that each holds,
+    # indexing a memoryview of integers, which is quicker than the array
+    view = memoryview(units if units.dtype.kind == "i" else units.astype(np.intp))
+    nunit = len(units)
+    starts = []
+    append = starts.append
+    pos = 0
+    while pos + 3 <= nunit:
+        append(pos)
+        pos += 3 + 2 * view[pos + 1]
+    if pos != nunit:
+        raise ValueError(f"premature end encountered to factor file {factorfile}")
+    starts = np.array(starts, np.intp)
+    icell = units[starts].astype(np.intp) - 1
+    counts = units[starts + 1].astype(np.intp)
+    idx = _pair_index(starts + 3, 2 * counts)[::2]
+    jsrc = units[idx].astype(np.intp) - 1
+    fac = factors[idx + 1].astype(np.float64)
+    if ((icell < 0) | (icell >= mpts)).any() or ((jsrc < 0) | (jsrc >= npts)).any():
+        raise ValueError(f"out-of-range array index in factor file {factorfile}")
+    return npts, mpts, icell, counts, jsrc, fac
+
+
+def _krige_using_file(
+    factorfile: str | PathLike,
+    factorfiletype: int | str | enum.FactorFileType,
+    sourceval: npt.ArrayLike,
+    nointerpval: float | npt.ArrayLike,
+) -> npt.NDArray[np.float64]:
+    """Apply ordinary kriging factors to columns of source values.
+
+    This is :meth:`PestUtilsLib.krige_using_file` without transformation,
+    except that the factor file is read once for all columns of sourceval,
+    with shape (npts, ncol), and each column has a no-interpolation value.
+    Values are summed in the order of the shared library, so that results
+    are the same.
+    """
+    npts, mpts, icell, counts, jsrc, fac = _read_factor_records(
+        factorfile, factorfiletype
+    )
+    sourceval = np.asarray(sourceval, np.float64)
+    if sourceval.ndim != 2 or sourceval.shape[0] != npts:
+        raise ValueError(
+            f"expected 'sourceval' array with shape ({npts}, ncol) "
+            f"(was {sourceval.shape})"
+        )
+    ncol = sourceval.shape[1]
+    targval = np.empty((mpts, ncol), np.float64)
+    targval[:] = np.broadcast_to(nointerpval, (ncol,))
+    # records in order of decreasing number of pairs, so that the k-th
+    # pairs of records are added to the leading records with more than k
+    order = np.argsort(-counts, kind="stable")
+    first = (np.cumsum(counts) - counts)[order]
+    nrecs = np.bincount(counts, minlength=1)[::-1].cumsum()[::-1]
+    total = np.zeros((len(order), ncol), np.float64)
+    for k in range(1, len(nrecs)):
+        pos = first[: nrecs[k]] + (k - 1)
+        total[: nrecs[k]] += sourceval[jsrc[pos]] * fac[pos, np.newaxis]
+    targval[icell[order]] = total
+    return targval
+
+
+def calc_kriging_factors_2d(
+    ecs: npt.ArrayLike,
+    ncs: npt.ArrayLike,
+    zns: int | npt.ArrayLike,
+    ect: npt.ArrayLike,
+    nct: npt.ArrayLike,
+    znt: int | npt.ArrayLike,
+    vartype: int | str | enum.VarioType,
+    krigtype: int | str | enum.KrigType,
+    aa: float | npt.ArrayLike,
+    anis: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    searchrad: float,
+    maxpts: int,
+    minpts: int,
+    factorfile: str | PathLike,
+    factorfiletype: int | str | enum.FactorFileType,
+) -> int:
+    """Calculate 2D kriging factors.
+
+    Source points are searched for within a circle, as for the shared
+    library, and up to maxpts of the nearest are used.
+
+    Parameters
+    ----------
+    ecs, ncs : array_like
+        Source point coordinates, each 1D array with shape (npts,).
+    zns : int or array_like
+        Source point zones, integer or 1D array with shape (npts,).
+    ect, nct : array_like
+        Target point coordinates, each 1D array with shape (mpts,).
+    znt : int or array_like
+        Target point zones, integer or 1D array with shape (mpts,).
+    vartype : int, str or enum.VarioType
+        Variogram type, where 1:spher, 2:exp, 3:gauss, 4:pow.
+    krigtype : int, str, or enum.KrigType,
+        Kriging type, where 0:simple, 1:ordinary.
+    aa : float or array_like
+        Variogram "a" value, float or 1D array with shape (mpts,).
+    anis : float or array_like
+        Variogram anisotropies, float or 1D array with shape (mpts,).
+    bearing : float or array_like
+        Variogram bearings, float or 1D array with shape (mpts,).
+    searchrad : float
+        Search radius.
+    maxpts, minpts : int
+        Search specifications.
+    factorfile : str or PathLike
+        File for kriging factors.
+    factorfiletype : int, str or enum.FactorFileType
+        Factor file type, where 0:binary, 1:text.
+
+    Returns
+    -------
+    int
+        Number of interp points.
+
+    See Also
+    --------
+    PestUtilsLib.calc_kriging_factors_2d : Equivalent function in the
+        shared library.
+    """
+    npta = ManyArrays({"ecs": ecs, "ncs": ncs}, int_any={"zns": zns})
+    mpta = ManyArrays(
+        {"ect": ect, "nct": nct},
+        {"aa": aa, "anis": anis, "bearing": bearing},
+        {"znt": znt},
+    )
+    vartype = _enum_value("vartype", vartype, enum.VarioType)
+    krigtype = _enum_value("krigtype", krigtype, enum.KrigType)
+    validate_scalar("searchrad", searchrad, gt=0.0)
+    _check_search(maxpts, minpts)
+    _check_zones(npta.zns, mpta.znt)
+    active = mpta.znt != 0
+    if (mpta.anis[active] <= 0.0).any():
+        raise ValueError(
+            "at least one anis value is zero or negative at a point to which "
+            "interpolation is required"
+        )
+    bearing = mpta.bearing[active]
+    if ((bearing < -360.0) | (bearing > 360.0)).any():
+        raise ValueError(
+            "at least one bearing value is less than -360 or greater than 360 "
+            "at a point to which interpolation is required"
+        )
+    # variograms of targets, where cova2 does not use locations
+    nactive = active.sum()
+    vario = _Variogram2D(
+        np.arange(nactive, dtype=np.float64),
+        np.zeros(nactive),
+        1,
+        vartype,
+        0.0,
+        mpta.aa[active],
+        1.0,
+        mpta.anis[active],
+        bearing,
+    )
+    kvario = np.cumsum(active) - 1
+    src = np.column_stack([npta.ecs, npta.ncs])
+    tgt = np.column_stack([mpta.ect, mpta.nct])
+    origin = tgt.min(axis=0)
+    radius = min(np.float32(searchrad), MAX_RADIUS)
+    zones = []
+    # zones in order of first appearance in znt, as for the shared library
+    znt_zones, first = np.unique(mpta.znt[active], return_index=True)
+    for zone in znt_zones[np.argsort(first)]:
+        isrc = np.flatnonzero(npta.zns == zone)
+        if len(isrc) == 0:
+            raise ValueError(
+                f"zone {zone} from the znt array is not represented in the " "zns array"
+            )
+        itgt = np.flatnonzero(mpta.znt == zone)
+        zones.append(
+            _Zone2D(
+                isrc,
+                itgt,
+                src,
+                tgt,
+                origin,
+                vario,
+                kvario,
+                radius,
+                maxpts,
+                min(minpts, len(isrc)),
+            )
+        )
+    return _write_factor_file(
+        zones, factorfile, factorfiletype, len(npta), len(mpta), krigtype
+    )
+
+
+def calc_kriging_factors_3d(
+    ecs: npt.ArrayLike,
+    ncs: npt.ArrayLike,
+    zcs: npt.ArrayLike,
+    zns: int | npt.ArrayLike,
+    ect: npt.ArrayLike,
+    nct: npt.ArrayLike,
+    zct: npt.ArrayLike,
+    znt: int | npt.ArrayLike,
+    zonenum: int | npt.ArrayLike,
+    krigtype: int | str | enum.KrigType,
+    vartype: int | str | enum.VarioType | npt.ArrayLike,
+    ahmax: float | npt.ArrayLike,
+    ahmin: float | npt.ArrayLike,
+    avert: float | npt.ArrayLike,
+    bearing: float | npt.ArrayLike,
+    dip: float | npt.ArrayLike,
+    rake: float | npt.ArrayLike,
+    srhmax: float,
+    srhmin: float,
+    srvert: float,
+    maxpts: int,
+    minpts: int,
+    factorfile: str | PathLike,
+    factorfiletype: int | str | enum.FactorFileType,
+) -> int:
+    """Calculate 3D kriging factors.
+
+    Source points are searched for within an ellipsoid with the orientation
+    of the variogram of each zone, as for the shared library, and up to
+    maxpts of the nearest are used.
+
+    Parameters
+    ----------
+    ecs, ncs, zcs : array_like
+        Source point coordinates, each 1D array with shape (npts,).
+    zns : int or array_like
+        Source point zones, integer or 1D array with shape (npts,).
+    ect, nct, zct : array_like
+        Target point coordinates, each 1D array with shape (mpts,).
+    znt : int or array_like
+        Target point zones, integer or 1D array with shape (mpts,).
+    zonenum : int or array_like
+        Zone numbers, integer or 1D array with shape (nzone,).
+    krigtype : int, str or enum.KrigType
+        Kriging type, where 0:simple, 1:ordinary.
+    vartype : int, str, enum.VarioType or array_like
+        Variogram type, where 1:spher, 2:exp, 3:gauss, 4:pow. If array,
+        then it should have shape (nzone,).
+    ahmax, ahmin, avert : float or array_like
+        Variogram "a" values in 3 orthogonal directions (hmax, hmin, vert).
+        Each can be a float or 1D array with shape (nzone,).
+    bearing : float or array_like
+        Bearing of hmax, float or 1D array with shape (nzone,).
+    dip : float or array_like
+        Dip of hmax, float or 1D array with shape (nzone,).
+    rake : float or array_like
+        Twist about hmax axis, float or 1D array with shape (nzone,).
+    srhmax, srhmin, srvert : float
+        Search radius in hmax, hmin, and vert directions.
+    maxpts, minpts : int
+        Search specifications.
+    factorfile : str or PathLike
+        File for kriging factors.
+    factorfiletype : int, str or enum.FactorFileType
+        Factor file type, where 0:binary, 1:text.
+
+    Returns
+    -------
+    int
+        Number of interp points.
+
+    See Also
+    --------
+    PestUtilsLib.calc_kriging_factors_3d : Equivalent function in the
+        shared library.
+    """
+    npta = ManyArrays({"ecs": ecs, "ncs": ncs, "zcs": zcs}, int_any={"zns": zns})
+    mpta = ManyArrays({"ect": ect, "nct": nct, "zct": zct}, int_any={"znt": znt})
+    krigtype = _enum_value("krigtype", krigtype, enum.KrigType)
+    vartype = np.array(vartype)
+    if np.issubdtype(vartype.dtype, str):
+        vartype = np.vectorize(enum.VarioType.get_value)(vartype)
+    if not np.issubdtype(vartype.dtype, np.integer):
+        raise ValueError("expected 'vartype' to be integer, str or enum.VarioType")
+    nzone = ManyArrays(
+        float_any={
+            "ahmax": ahmax,
+            "ahmin": ahmin,
+            "avert": avert,
+            "bearing": bearing,
+            "dip": dip,
+            "rake": rake,
+        },
+        int_any={"zonenum": zonenum, "vartype": vartype},
+    )
+    for name, value in [("srhmax", srhmax), ("srhmin", srhmin), ("srvert", srvert)]:
+        validate_scalar(name, value, gt=0.0)
+    _check_search(maxpts, minpts)
+    _check_zones(npta.zns, mpta.znt)
+    for name, zn in [("zns", npta.zns), ("znt", mpta.znt)]:
+        missing = np.setdiff1d(zn[zn != 0], nzone.zonenum)
+        if len(missing) > 0:
+            raise ValueError(
+                f"zone {missing[0]} features in the {name} array, but does not "
+                "feature in the zonenum array"
+            )
+    src = np.column_stack([npta.ecs, npta.ncs, npta.zcs])
+    tgt = np.column_stack([mpta.ect, mpta.nct, mpta.zct])
+    origin = tgt[mpta.znt != 0].min(axis=0)
+    radii = [min(np.float32(value), MAX_RADIUS) for value in [srhmax, srhmin, srvert]]
+    zones = []
+    for izone, zone in enumerate(nzone.zonenum):
+        if zone == 0:
+            continue
+        isrc = np.flatnonzero(npta.zns == zone)
+        itgt = np.flatnonzero(mpta.znt == zone)
+        for name, index in [("zns", isrc), ("znt", itgt)]:
+            if len(index) == 0:
+                raise ValueError(
+                    f"zone {zone} features in the zonenum array, but does not "
+                    f"feature in the {name} array"
+                )
+        angles = [nzone.bearing[izone], nzone.dip[izone], nzone.rake[izone]]
+        vario = _Variogram3D(
+            [0.0],
+            [0.0],
+            [0.0],
+            zone,
+            nzone.vartype[izone],
+            0.0,
+            1.0,
+            nzone.ahmax[izone],
+            nzone.ahmin[izone],
+            nzone.avert[izone],
+            *angles,
+        )
+        # the search ellipsoid has the orientation of the variogram
+        search = _Variogram3D([0.0], [0.0], [0.0], zone, 1, 0.0, 1.0, *radii, *angles)
+        zones.append(
+            _Zone3D(
+                isrc, itgt, src, tgt, origin, vario, search, radii[0], maxpts, minpts
+            )
+        )
+    return _write_factor_file(
+        zones, factorfile, factorfiletype, len(npta), len(mpta), krigtype
+    )
@@ -0,0 +1,364 @@
+"""Structural overlay factors held in memory.
+
+Factors calculated by :meth:`PestUtilsLib.calc_structural_overlay_factors`
+are read once into an :class:`OverlayFactors` object, which blends source
+values into background values as for
+:meth:`PestUtilsLib.interpolate_blend_using_file`. Source and background
+values may have a second dimension, so that the factors are applied to all
+realisations of an ensemble in one call.
+"""
+from __future__ import annotations
+
+import re
+from os import PathLike
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import numpy.typing as npt
+
+from pypestutils import enum
+from pypestutils.data import validate_scalar
+
+__all__ = ["OverlayFactors", "calc_structural_overlay_factors"]
+
+# number of source values blended at a time
+CHUNK_SIZE = 1_000_000
+
+# characters in the factor file code, as for LENFACCODE in the shared library
+LENFACCODE = 20
+
+# binary factor file records are a header followed by pairs of a source
+# index and a factor, each of which are 12 bytes
+_HEAD_DTYPE = np.dtype([("ipt", "<i4"), ("na", "<i4"), ("rtemp", "<f4")])
+_PAIR_DTYPE = np.dtype([("isrc", "<i4"), ("fac", "<f8")])
+
+
+def _yes_no(name: str, value: str | bool) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("y", "n"):
+        return value.lower() == "y"
+    raise ValueError(f"{name} must be 'y' or 'n' or bool (was {value!r})")
+
+
+def _record_starts(
+    units: npt.NDArray, num: int, offset: int, width: int, step: int
+) -> npt.NDArray[np.intp]:
+    """Find the start of each record from the number of pairs it holds.
+
+    Records are width units, followed by step units for each pair, where
+    the number of pairs is offset units from the start of the record.
+    """
+    starts = np.empty(num, np.intp)
+    pos = 0
+    for irec in range(num):
+        if pos + width > len(units):
+            raise ValueError("premature end encountered to factor file")
+        starts[irec] = pos
+        pos += width + step * int(units[pos + offset])
+    if pos > len(units):
+        raise ValueError("premature end encountered to factor file")
+    return starts
+
+
+def _pair_index(starts: npt.NDArray, counts: npt.NDArray) -> npt.NDArray:
+    """Index of each pair of records that start at starts."""
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+
+def _check_acode(factorfile: Path, acode: str) -> None:
+    if acode[:2] not in ("2d", "3d") or acode[2:4] != "bl":
+        raise ValueError(
+            f"file {factorfile} is incompatible with structural overlay factors"
+        )
+
+
+class OverlayFactors:
+    """Structural overlay factors for blending source values into targets.
+
+    Records are held in the order that they are applied, as for a factor
+    file; there is a record for each active target for each structure.
+
+    Parameters
+    ----------
+    npts, mpts : int
+        Number of source and target points.
+    target : array_like
+        Zero-based target index of each record, 1D array with shape (nrec,).
+    indptr : array_like
+        Start of the factors for each record, 1D array with shape (nrec + 1,).
+    source : array_like
+        Zero-based source index of each factor, 1D array with shape (nfac,).
+    factor : array_like
+        Blending factors, 1D array with shape (nfac,).
+    """
+
+    def __init__(
+        self,
+        npts: int,
+        mpts: int,
+        target: npt.ArrayLike,
+        indptr: npt.ArrayLike,
+        source: npt.ArrayLike,
+        factor: npt.ArrayLike,
+    ):
+        self.npts = int(npts)
+        self.mpts = int(mpts)
+        self.target = np.asarray(target, np.intp)
+        self.indptr = np.asarray(indptr, np.intp)
+        self.source = np.asarray(source, np.intp)
+        self.factor = np.asarray(factor, np.float64)
+        if len(self.indptr) != len(self.target) + 1 or self.indptr[0] != 0:
+            raise ValueError("indptr must start at zero and have one more element")
+        if (np.diff(self.indptr) < 0).any() or self.indptr[-1] != len(self.source):
+            raise ValueError("indptr must increase to the number of factors")
+        if len(self.factor) != len(self.source):
+            raise ValueError("source and factor must have the same length")
+        if ((self.target < 0) | (self.target >= self.mpts)).any() or (
+            (self.source < 0) | (self.source >= self.npts)
+        ).any():
+            raise ValueError("out-of-range array index in overlay factors")
+        # records that may be applied at the same time, as each target is
+        # blended by each structure in turn
+        order = np.argsort(self.target, kind="stable")
+        _, first, counts = np.unique(
+            self.target[order], return_index=True, return_counts=True
+        )
+        self._sweep = np.empty(len(self.target), np.intp)
+        self._sweep[order] = np.arange(len(order)) - np.repeat(first, counts)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}: npts={self.npts}, mpts={self.mpts}, "
+            f"icount_interp={self.icount_interp}, nfac={len(self.factor)}>"
+        )
+
+    @property
+    def icount_interp(self) -> int:
+        """Number of interpolation records."""
+        return len(self.target)
+
+    @classmethod
+    def from_file(
+        cls,
+        factorfile: str | PathLike,
+        factorfiletype: int | str | enum.FactorFileType,
+    ) -> OverlayFactors:
+        """Read factors written by calc_structural_overlay_factors.
+
+        Parameters
+        ----------
+        factorfile : str or PathLike
+            File for kriging factors.
+        factorfiletype : int, str or enum.FactorFileType
+            Factor file type, where 0:binary, 1:text.
+
+        Returns
+        -------
+        OverlayFactors
+        """
+        factorfile = Path(factorfile)
+        if not factorfile.is_file():
+            raise FileNotFoundError(f"could not find factorfile {factorfile}")
+        if isinstance(factorfiletype, str):
+            factorfiletype = enum.FactorFileType.get_value(factorfiletype)
+        validate_scalar("factorfiletype", factorfiletype, enum=enum.FactorFileType)
+        if factorfiletype == enum.FactorFileType.binary:
+            data = factorfile.read_bytes()
+            _check_acode(factorfile, data[:LENFACCODE].decode(errors="replace"))
+            npts, mpts, num2 = np.frombuffer(data, "<i4", 3, LENFACCODE)
+            start = LENFACCODE + 12
+            nunit = (len(data) - start) // 12
+            heads = np.frombuffer(data, _HEAD_DTYPE, nunit, start)
+            pairs = np.frombuffer(data, _PAIR_DTYPE, nunit, start)
+            starts = _record_starts(heads["na"], num2, 0, 1, 1)
+            target = heads["ipt"][starts]
+            counts = heads["na"][starts]
+            idx = _pair_index(starts + 1, counts)
+            source = pairs["isrc"][idx]
+            factor = pairs["fac"][idx]
+        else:
+            with factorfile.open() as fp:
+                _check_acode(factorfile, fp.readline())
+                npts, mpts, num2 = (int(item) for item in fp.readline().split())
+                text = fp.read()
+            # exponents of more than two digits are written without an "E"
+            text = re.sub(r"(?<=\d)([+-]\d{3})\b", r"E\1", text)
+            values = np.array(text.split(), np.float64)
+            starts = _record_starts(values, num2, 1, 3, 2)
+            target = values[starts].astype(np.intp)
+            counts = values[starts + 1].astype(np.intp)
+            idx = _pair_index(starts + 3, 2 * counts)[::2]
+            source = values[idx].astype(np.intp)
+            factor = values[idx + 1]
+        indptr = np.zeros(len(starts) + 1, np.intp)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(npts, mpts, target - 1, indptr, source - 1, factor)
+
+    def apply(
+        self,
+        sourceval: npt.ArrayLike,
+        targval: npt.ArrayLike,
+        transtype: int | str | enum.TransType = "none",
+        lt_target: str | bool = True,
+        gt_target: str | bool = True,
+    ) -> npt.NDArray[np.float64]:
+        """Blend source values into target values.
+
+        Parameters
+        ----------
+        sourceval : array_like
+            Values at sources, array with shape (npts,) or (npts, nreal).
+        targval : array_like
+            Values at targets, array with shape (mpts,) or (mpts, nreal).
+            This array is not modified.
+        transtype : int, str, enum.TransType, default "none"
+            Tranformation type, where 0 is none and 1 is log.
+        lt_target, gt_target : str or bool, default True
+            Whether to undercut or exceed target, use "Y"/"N" or bool.
+
+        Returns
+        -------
+        npt.NDArray[np.float64]
+            Values calculated for targets, with shape (mpts,) if both
+            sourceval and targval are 1D, otherwise (mpts, nreal).
+        """
+        if isinstance(transtype, str):
+            transtype = enum.TransType.get_value(transtype)
+        validate_scalar("transtype", transtype, enum=enum.TransType)
+        lt_target = _yes_no("lt_target", lt_target)
+        gt_target = _yes_no("gt_target", gt_target)
+        sourceval = np.asarray(sourceval, np.float64)
+        targval = np.asarray(targval, np.float64)
+        for name, ar, num in [
+            ("sourceval", sourceval, self.npts),
+            ("targval", targval, self.mpts),
+        ]:
+            if ar.ndim not in (1, 2) or ar.shape[0] != num:
+                raise ValueError(
+                    f"expected '{name}' array with shape ({num},) or ({num}, nreal)"
+                    f" (was {ar.shape})"
+                )
+        ndim = max(sourceval.ndim, targval.ndim)
+        sourceval = sourceval.reshape(self.npts, -1)
+        targval = targval.reshape(self.mpts, -1)
+        nreal = max(sourceval.shape[1], targval.shape[1])
+        if sourceval.shape[1] not in (1, nreal) or targval.shape[1] not in (1, nreal):
+            raise ValueError(
+                "sourceval and targval have a different number of realisations"
+            )
+        targval = np.broadcast_to(targval, (self.mpts, nreal)).copy()
+        log = transtype == enum.TransType.log
+        if log:
+            if (sourceval[self.source] <= 0.0).any():
+                raise ValueError(
+                    "if transtype is log then all source values must be positive"
+                )
+            if (targval[self.target] <= 0.0).any():
+                raise ValueError(
+                    "if transtype is log then all target values must be positive"
+                )
+            sourceval = np.log10(sourceval)
+            targval[self.target] = np.log10(targval[self.target])
+        counts = np.diff(self.indptr)
+        if len(self._sweep) > 0:
+            nsweep = self._sweep.max() + 1
+        else:
+            nsweep = 0
+        for isweep in range(nsweep):
+            recs = np.flatnonzero(self._sweep == isweep)
+            # records with about CHUNK_SIZE pairs of values are blended at a time
+            ends = np.cumsum(np.maximum(counts[recs], 1)) * nreal
+            bounds = np.searchsorted(ends, np.arange(CHUNK_SIZE, ends[-1], CHUNK_SIZE))
+            for chunk in np.split(recs, np.unique(bounds)):
+                self._blend(
+                    chunk, counts[chunk], sourceval, targval, lt_target, gt_target
+                )
+        if log:
+            if (targval[self.target] > 300.0).any():
+                raise ValueError("out of range value calculated for target array")
+            targval[self.target] = 10.0 ** targval[self.target]
+        if ndim == 1:
+            return targval[:, 0]
+        return targval
+
+    def _blend(self, recs, counts, sourceval, targval, lt_target, gt_target) -> None:
+        """Blend records with distinct targets into targval, in place."""
+        if len(recs) == 0:
+            return
+        itgt = self.target[recs]
+        dval0 = targval[itgt]
+        dsum = np.zeros_like(dval0)
+        nonzero = counts > 0
+        if nonzero.any():
+            idx = _pair_index(self.indptr[recs[nonzero]], counts[nonzero])
+            diff = sourceval[self.source[idx]] - np.repeat(
+                dval0[nonzero], counts[nonzero], axis=0
+            )
+            diff *= self.factor[idx, np.newaxis]
+            offsets = np.cumsum(counts[nonzero]) - counts[nonzero]
+            dsum[nonzero] = np.add.reduceat(diff, offsets, axis=0)
+        if not gt_target:
+            targval[itgt] = np.minimum(dsum + dval0, dval0)
+        elif not lt_target:
+            targval[itgt] = np.maximum(dsum + dval0, dval0)
+        else:
+            targval[itgt] = dsum + dval0
+
+
+def calc_structural_overlay_factors(
+    ecs: npt.ArrayLike,
+    ncs: npt.ArrayLike,
+    ids: int | npt.ArrayLike,
+    conwidth: npt.ArrayLike,
+    aa: npt.ArrayLike,
+    structype: int | str | enum.StrucType,
+    inverse_power: float,
+    ect: npt.ArrayLike,
+    nct: npt.ArrayLike,
+    active: int | npt.ArrayLike,
+) -> OverlayFactors:
+    """Calculate structural overlay factors, held in memory.
+
+    Parameters
+    ----------
+    ecs, ncs : array_like
+        Source point coordinates, each 1D array with shape (npts,).
+    ids : int or array_like
+        Source point structure number, integer or 1D array with shape (npts,).
+    conwidth, aa : float or array_like
+        Blending parameters, float or 1D array with shape (npts,).
+    structype : int, str or enum.StrucType
+        Structure type, where 0 is polylinear and 1 is polygonal.
+    inverse_power : float
+        Inverse power of distance.
+    ect, nct : array_like
+        Target point coordinates, each 1D array with shape (mpts,).
+    active : int or array_like
+        Target point activity, integer or 1D array with shape (mpts,).
+
+    Returns
+    -------
+    OverlayFactors
+    """
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    with TemporaryDirectory(prefix="pypestutils_") as tmpdir:
+        factorfile = Path(tmpdir) / "overlay_factors.bin"
+        PestUtilsLib().calc_structural_overlay_factors(
+            ecs,
+            ncs,
+            ids,
+            conwidth,
+            aa,
+            structype,
+            inverse_power,
+            ect,
+            nct,
+            active,
+            factorfile,
+            enum.FactorFileType.binary,
+        )
+        return OverlayFactors.from_file(factorfile, enum.FactorFileType.binary)
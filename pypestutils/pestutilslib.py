@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 import logging
-from ctypes import byref, c_char, c_double, c_int, create_string_buffer
+from collections.abc import Callable
+from ctypes import CDLL, byref, c_char, c_double, c_int, create_string_buffer
 from os import PathLike
 from pathlib import Path
 
@@ -19,24 +20,49 @@ class PestUtilsLibError(BaseException):
     pass
 
 
+# Shared library instance, loaded and prototyped once per process
+_pestutils = None
+# ctypes progress callback held by the shared library
+_progress_callback = None
+
+
+def _load_pestutils() -> CDLL:
+    """Load and prototype the pestutils shared library on first use."""
+    global _pestutils
+    if _pestutils is None:
+        from .ctypes_declarations import prototype
+        from .finder import load
+
+        lib = load()
+        prototype(lib)
+        _pestutils = lib
+    return _pestutils
+
+
 class PestUtilsLib:
     """Mid-level Fortran-Python handler for pestutils library via ctypes.
 
+    The shared library is not loaded until the first method that needs it
+    is called, after which it is shared by all instances in the process.
+
     Parameters
     ----------
     logger_level : int, str, default 20 (INFO)
     """
 
     def __init__(self, *, logger_level=logging.INFO) -> None:
-        from .ctypes_declarations import prototype
-        from .finder import load
         from .logger import get_logger
 
         self.logger = get_logger(self.__class__.__name__, logger_level)
-        self.pestutils = load()
-        self.logger.debug("loaded %s", self.pestutils)
-        prototype(self.pestutils)
-        self.logger.debug("added prototypes")
+        self._pestutils = None
+
+    @property
+    def pestutils(self) -> CDLL:
+        """Loaded and prototyped shared library."""
+        if self._pestutils is None:
+            self._pestutils = _load_pestutils()
+            self.logger.debug("loaded %s with prototypes", self._pestutils)
+        return self._pestutils
 
     # def __del__(self):
     #    """Clean-up library instance."""
@@ -342,6 +368,146 @@ class PestUtilsLib:
             "simstate": simstate.copy("A"),
         }
 
+    def calc_structured_interp_factors(
+        self,
+        gridname: str,
+        # npts: int,  # determined from ecoord.shape[0]
+        ecoord: npt.ArrayLike,
+        ncoord: npt.ArrayLike,
+        layer: int | npt.ArrayLike,
+        factorfile: str | PathLike,
+        factorfiletype: int | str | enum.FactorFileType,
+    ) -> npt.NDArray[np.int32]:
+        """Calculate interpolation factors from a structured grid.
+
+        Parameters
+        ----------
+        gridname : str
+            Name of installed structured grid.
+        ecoord, ncoord : array_like
+            X/Y or Easting/Northing coordinates for points with shape (npts,).
+        layer : int or array_like
+            Layers of points with shape (npts,).
+        factorfile : str or PathLike
+            File for interpolation factors to write.
+        factorfiletype : int, str or enum.FactorFileType
+            Factor file type, where 0:binary, 1:text.
+
+        Returns
+        -------
+        npt.NDArray[np.int32]
+            Array interp_success(npts), where 1 is success and 0 is failure.
+        """
+        pta = ManyArrays({"ecoord": ecoord, "ncoord": ncoord}, int_any={"layer": layer})
+        npts = len(pta)
+        factorfile = Path(factorfile)
+        if isinstance(factorfiletype, str):
+            factorfiletype = enum.FactorFileType.get_value(factorfiletype)
+        interp_success = np.zeros(npts, np.int32, order="F")
+        res = self.pestutils.calc_structured_interp_factors(
+            byref(self.create_char_array(gridname, "LENGRIDNAME")),
+            byref(c_int(npts)),
+            pta.ecoord,
+            pta.ncoord,
+            pta.layer,
+            byref(self.create_char_array(bytes(factorfile), "LENFILENAME")),
+            byref(c_int(factorfiletype)),
+            interp_success,
+        )
+        if res != 0:
+            raise PestUtilsLibError(self.retrieve_error_message())
+        self.logger.info("calculated structured interp factors for %r", gridname)
+        return interp_success.copy("A")
+
+    def interp_from_structured_grid_using_factors(
+        self,
+        depvarfile: str | PathLike,
+        factorfile: str | PathLike,
+        factorfiletype: int | str | enum.FactorFileType,
+        isim: int,
+        iprec: int | str | enum.Prec,
+        ntime: int,
+        vartype: str,
+        interpthresh: float,
+        nointerpval: float,
+        npts: int,
+    ) -> dict:
+        """Spatial interpolate points using previously-calculated factors.
+
+        Parameters
+        ----------
+        depvarfile : str or PathLike
+            Name of binary file to read.
+        factorfile : str or PathLike
+            File containing spatial interpolation factors, written by
+            :meth:`calc_structured_interp_factors`.
+        factorfiletype : int, str or enum.FactorFileType
+            Use 0 for binary; 1 for text.
+        isim : int
+            Specify -1 for MT3D; 1 for MODFLOW.
+        iprec : int, str or enum.Prec
+            Specify 1 or "single", 2 or "double", or use enum.Prec.
+        ntime : int
+            Number of output times.
+        vartype : str
+            Only read arrays of this type.
+        interpthresh : float
+            Absolute threshold for dry or inactive.
+        nointerpval : float
+            Value to use where interpolation is not possible.
+        npts : int
+            Number of points for interpolation.
+
+        Returns
+        -------
+        nproctime : int
+            Number of processed simulation times.
+        simtime : npt.NDArray[np.float64]
+            Simulation times, with shape (ntime,).
+        simstate : npt.NDArray[np.float64]
+            Interpolated system states, with shape (ntime, npts).
+        """
+        depvarfile = Path(depvarfile)
+        if not depvarfile.is_file():
+            raise FileNotFoundError(f"could not find depvarfile {depvarfile}")
+        factorfile = Path(factorfile)
+        if not factorfile.is_file():
+            raise FileNotFoundError(f"could not find factorfile {factorfile}")
+        if isinstance(factorfiletype, str):
+            factorfiletype = enum.FactorFileType.get_value(factorfiletype)
+        if isinstance(iprec, str):
+            iprec = enum.Prec.get_value(iprec)
+        simtime = np.zeros(ntime, np.float64, order="F")
+        simstate = np.zeros((ntime, npts), np.float64, order="F")
+        nproctime = c_int()
+        res = self.pestutils.interp_from_structured_grid_using_factors(
+            byref(self.create_char_array(bytes(depvarfile), "LENFILENAME")),
+            byref(self.create_char_array(bytes(factorfile), "LENFILENAME")),
+            byref(c_int(factorfiletype)),
+            byref(c_int(isim)),
+            byref(c_int(iprec)),
+            byref(c_int(ntime)),
+            byref(self.create_char_array(vartype, "LENVARTYPE")),
+            byref(c_double(interpthresh)),
+            byref(c_double(nointerpval)),
+            byref(c_int(npts)),
+            byref(nproctime),
+            simtime,
+            simstate,
+        )
+        if res != 0:
+            raise PestUtilsLibError(self.retrieve_error_message())
+        self.logger.info(
+            "interpolated %d points from structured depvar file %r",
+            npts,
+            depvarfile.name,
+        )
+        return {
+            "nproctime": nproctime.value,
+            "simtime": simtime.copy("A"),
+            "simstate": simstate.copy("A"),
+        }
+
     def interp_to_obstime(
         self,
         # nsimtime: int,  # determined from simval.shape[0]
@@ -1215,7 +1381,7 @@ class PestUtilsLib:
         if res != 0:
             raise PestUtilsLibError(self.retrieve_error_message())
         self.logger.info("calculated covariance matrix for %d 2D pilot points", npts)
-        return covmat.copy("A")
+        return covmat
 
     def build_covar_matrix_3d(
         self,
@@ -1299,7 +1465,7 @@ class PestUtilsLib:
         if res != 0:
             raise PestUtilsLibError(self.retrieve_error_message())
         self.logger.info("calculated covariance matrix for %d 3D pilot points", npts)
-        return covmat.copy("A")
+        return covmat
 
     def calc_structural_overlay_factors(
         self,
@@ -1435,6 +1601,8 @@ class PestUtilsLib:
         npts = len(npta)
         mpta = ManyArrays({"targval": targval})
         mpts = len(mpta)
+        # targval is modified in place, so do not modify the input array
+        targval = mpta.targval.copy(order="F")
         icount_interp = c_int()
         res = self.pestutils.interpolate_blend_using_file(
             byref(self.create_char_array(bytes(factorfile), "LENFILENAME")),
@@ -1445,14 +1613,14 @@ class PestUtilsLib:
             byref(c_char(lt_target.encode())),
             byref(c_char(gt_target.encode())),
             npta.sourceval,
-            mpta.targval,
+            targval,
             byref(icount_interp),
         )
         if res != 0:
             raise PestUtilsLibError(self.retrieve_error_message())
         self.logger.info("applied interpolation factors from %r", factorfile.name)
         return {
-            "targval": mpts.targval.copy("A"),
+            "targval": targval,
             "icount_interp": icount_interp.value,
         }
 
@@ -1647,6 +1815,95 @@ class PestUtilsLib:
             raise PestUtilsLibError(self.retrieve_error_message())
         self.logger.info("initialized the random number generator")
 
+    def set_progress_callback(
+        self, callback: Callable[[int, int], bool | None] | None, interval: int = 1000
+    ) -> None:
+        """
+        Set a function to report progress of, and to cancel, lengthy calls.
+
+        The callback is called with ``(done, total)`` every `interval` target
+        points, nodes or simulation times (and at the last one) by the
+        kriging factor, field generation, MF6 dependent variable
+        interpolation and cell-by-cell flow extraction functions. If it
+        returns True the call is cancelled, raising PestUtilsLibError.
+        Exceptions raised by the callback, including KeyboardInterrupt, are
+        logged and also cancel the call.
+
+        The callback is shared by all instances in the process, and may be
+        called from other threads if the library was built with OpenMP. For
+        time steps, `total` is the maximum number of times requested, not
+        the number in the file.
+
+        Parameters
+        ----------
+        callback : callable or None
+            Function ``callback(done, total)``, or None to remove it.
+        interval : int, default 1000
+            Number of steps between calls to `callback`.
+        """
+        global _progress_callback
+        from .ctypes_declarations import progress_callback_type
+
+        if callback is None:
+            c_callback = progress_callback_type()
+        else:
+            logger = self.logger
+
+            def wrapper(done, total):
+                try:
+                    return 1 if callback(done, total) else 0
+                except BaseException as err:
+                    logger.error("progress callback raised %r; cancelling", err)
+                    return 1
+
+            c_callback = progress_callback_type(wrapper)
+        res = self.pestutils.set_progress_callback(c_callback, byref(c_int(interval)))
+        if res != 0:
+            raise PestUtilsLibError(self.retrieve_error_message())
+        # keep a reference, since the library holds a pointer to it
+        _progress_callback = c_callback
+        if callback is None:
+            self.logger.info("removed the progress callback")
+        else:
+            self.logger.info("set the progress callback every %d steps", interval)
+
+    def set_num_threads(self, nthreads: int) -> None:
+        """
+        Set the number of threads used by functions parallelised with OpenMP.
+
+        These are the IPD interpolation and field generation functions. The
+        setting is shared by all instances, and applies to calls made from
+        the calling thread. It has no effect if the library was built
+        without OpenMP (the default), see `get_num_threads`.
+
+        Parameters
+        ----------
+        nthreads : int
+            Number of threads, which must be greater than zero.
+        """
+        res = self.pestutils.set_num_threads(byref(c_int(nthreads)))
+        if res != 0:
+            raise PestUtilsLibError(self.retrieve_error_message())
+        self.logger.info("set the number of threads to %d", nthreads)
+
+    def get_num_threads(self) -> int:
+        """
+        Get the number of threads used by functions parallelised with OpenMP.
+
+        Returns
+        -------
+        int
+            Number of threads, which is 1 if the library was built without
+            OpenMP. Otherwise the default is set by the OMP_NUM_THREADS
+            environment variable, or the number of processors.
+        """
+        nthreads = c_int()
+        res = self.pestutils.get_num_threads(byref(nthreads))
+        if res != 0:
+            raise PestUtilsLibError(self.retrieve_error_message())
+        self.logger.info("number of threads is %d", nthreads.value)
+        return nthreads.value
+
     def fieldgen2d_sva(
         self,
         # nnode: int,  # determined from ec.shape[0]
@@ -10,6 +10,8 @@ pestutils_function_names = {
     "uninstall_structured_grid": 1,
     "free_all_memory": 0,
     "interp_from_structured_grid": 15,
+    "calc_structured_interp_factors": 8,
+    "interp_from_structured_grid_using_factors": 13,
     "interp_to_obstime": 13,
     "install_mf6_grid_from_file": 7,
     "get_cell_centres_mf6": 5,
@@ -28,6 +30,9 @@ pestutils_function_names = {
     "ipd_interpolate_2d": 14,
     "ipd_interpolate_3d": 20,
     "initialize_randgen": 1,
+    "set_progress_callback": 2,
+    "set_num_threads": 1,
+    "get_num_threads": 1,
     "fieldgen2d_sva": 16,
     "fieldgen3d_sva": 21,
 }
@@ -1 +1,29 @@
 """Fixtures for pytest. Other common functions are in common.py."""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def pts():
+    """Source and target points in zones 1 and 2, with targets also in zone 0,
+    and source values and interpolation parameters of each target."""
+    rng = np.random.default_rng(1)
+    npts = 150
+    mpts = 400
+    return {
+        "ecs": rng.uniform(0.0, 1000.0, npts),
+        "ncs": rng.uniform(0.0, 1000.0, npts),
+        "zcs": rng.uniform(0.0, 50.0, npts),
+        "zns": rng.integers(1, 3, npts),
+        "sourceval": rng.uniform(1.0, 10.0, npts),
+        "ect": rng.uniform(0.0, 1000.0, mpts),
+        "nct": rng.uniform(0.0, 1000.0, mpts),
+        "zct": rng.uniform(0.0, 50.0, mpts),
+        "znt": rng.integers(0, 3, mpts),
+        "anis": rng.uniform(0.3, 3.0, mpts),
+        "bearing": rng.uniform(-100.0, 100.0, mpts),
+        "dip": rng.uniform(-30.0, 30.0, mpts),
+        "rake": rng.uniform(-30.0, 30.0, mpts),
+        "invpow": rng.uniform(0.5, 3.0, mpts),
+        "aa": rng.uniform(100.0, 300.0, mpts),
+    }
@@ -0,0 +1,215 @@
+"""Tests for covariance module."""
+
+import numpy as np
+import pytest
+
+from pypestutils.pestutilslib import PestUtilsLib
+
+pytest.importorskip("scipy")
+
+from pypestutils.covariance import (  # noqa: E402
+    CovarianceOperator,
+    build_covar_matrix_2d,
+    build_covar_matrix_3d,
+    build_sparse_covar_matrix_2d,
+    build_sparse_covar_matrix_3d,
+)
+
+# libm single precision functions may differ by one ulp from NumPy
+rtol = 2e-7
+
+
+@pytest.fixture
+def pts():
+    rng = np.random.default_rng(1)
+    npts = 300
+    return {
+        "ec": rng.uniform(0.0, 1000.0, npts),
+        "nc": rng.uniform(0.0, 1000.0, npts),
+        "zc": rng.uniform(0.0, 100.0, npts),
+        "zn": rng.integers(1, 4, npts),
+    }
+
+
+@pytest.mark.parametrize("vartype", ["spher", "exp", "gauss", "pow"])
+def test_build_sparse_covar_matrix_2d(pts, vartype):
+    aa = 1.2 if vartype == "pow" else 250.0
+    args = (pts["ec"], pts["nc"], pts["zn"], vartype, 0.1, aa, 2.0, 1.5, 35.0)
+    exp = PestUtilsLib().build_covar_matrix_2d(*args, len(pts["ec"]))
+    res = build_sparse_covar_matrix_2d(*args, format="coo")
+    assert res.format == "coo"
+    np.testing.assert_allclose(res.toarray(), exp, rtol=rtol)
+    # only non-zero covariances between points in the same zone are stored
+    assert (pts["zn"][res.row] == pts["zn"][res.col]).all()
+    assert res.nnz == np.count_nonzero(exp)
+
+
+@pytest.mark.parametrize("vartype", ["spher", "exp", "gauss", "pow"])
+def test_build_sparse_covar_matrix_3d(pts, vartype):
+    ahmax = 1.2 if vartype == "pow" else 300.0
+    args = (pts["ec"], pts["nc"], pts["zc"], pts["zn"], vartype, 0.1, 2.0)
+    args += (ahmax, 150.0, 20.0, 35.0, 10.0, 5.0)
+    exp = PestUtilsLib().build_covar_matrix_3d(*args, len(pts["ec"]))
+    res = build_sparse_covar_matrix_3d(*args)
+    assert res.format == "csr"
+    np.testing.assert_allclose(res.toarray(), exp, rtol=rtol)
+    assert res.nnz == np.count_nonzero(exp)
+
+
+@pytest.mark.parametrize("vartype", ["exp", "gauss"])
+def test_build_sparse_covar_matrix_threshold(pts, vartype):
+    args = (pts["ec"], pts["nc"], pts["zn"], vartype, 0.0, 100.0, 1.0, 2.0, 0.0)
+    exp = PestUtilsLib().build_covar_matrix_2d(*args, len(pts["ec"]))
+    threshold = 0.01
+    res = build_sparse_covar_matrix_2d(*args, threshold=threshold)
+    assert res.nnz < np.count_nonzero(exp)
+    assert (np.abs(res.data) > threshold).all()
+    np.testing.assert_allclose(res.toarray(), exp, rtol=rtol, atol=threshold)
+    expected_nnz = np.count_nonzero(np.abs(exp) > threshold)
+    assert abs(res.nnz - expected_nnz) <= 2  # may differ by rounding
+
+
+def test_build_sparse_covar_matrix_errors(pts):
+    ec, nc = pts["ec"], pts["nc"]
+    with pytest.raises(ValueError, match="must be nonzero"):
+        build_sparse_covar_matrix_2d(ec, nc, 0, 1, 0.0, 100.0, 1.0, 1.0, 0.0)
+    with pytest.raises(ValueError, match="at the same location"):
+        build_sparse_covar_matrix_2d(
+            [1.0, 2.0, 1.0], [3.0, 4.0, 3.0], 1, 1, 0.0, 100.0, 1.0, 1.0, 0.0
+        )
+    with pytest.raises(ValueError, match="anis array"):
+        build_sparse_covar_matrix_2d(ec, nc, 1, 1, 0.0, 100.0, 1.0, 0.0, 0.0)
+    with pytest.raises(ValueError, match="VarioType"):
+        build_sparse_covar_matrix_2d(ec, nc, 1, "lin", 0.0, 100.0, 1.0, 1.0, 0.0)
+    with pytest.raises(ValueError, match="format"):
+        build_sparse_covar_matrix_2d(
+            ec, nc, 1, 1, 0.0, 100.0, 1.0, 1.0, 0.0, format="csc"
+        )
+    # points at the same location are allowed in different zones
+    res = build_sparse_covar_matrix_2d(
+        [1.0, 2.0, 1.0], [3.0, 4.0, 3.0], [1, 1, 2], 1, 0.0, 100.0, 1.0, 1.0, 0.0
+    )
+    assert res.shape == (3, 3)
+
+
+@pytest.mark.parametrize("uniform", [True, False])
+@pytest.mark.parametrize("vartype", ["spher", "exp", "gauss", "pow"])
+def test_build_covar_matrix_2d(pts, vartype, uniform):
+    npts = len(pts["ec"])
+    aa = 1.2 if vartype == "pow" else 250.0
+    if not uniform:
+        aa *= np.linspace(0.8, 1.2, npts)
+    args = (pts["ec"], pts["nc"], pts["zn"], vartype, 0.1, aa, 2.0, 1.5, 35.0)
+    exp = PestUtilsLib().build_covar_matrix_2d(*args, npts)
+    res = build_covar_matrix_2d(*args)
+    assert res.shape == (npts, npts)
+    assert res.dtype == np.float64
+    # differences of one ulp are spread by the positive definite adjustment
+    atol = 1e-10 if uniform else 1e-6 * np.abs(exp).max()
+    np.testing.assert_allclose(res, exp, rtol=rtol, atol=atol)
+
+
+@pytest.mark.parametrize("uniform", [True, False])
+@pytest.mark.parametrize("vartype", ["spher", "exp", "gauss", "pow"])
+def test_build_covar_matrix_3d(pts, vartype, uniform):
+    npts = len(pts["ec"])
+    ahmax = 1.2 if vartype == "pow" else 300.0
+    if not uniform:
+        ahmax *= np.linspace(0.8, 1.2, npts)
+    args = (pts["ec"], pts["nc"], pts["zc"], pts["zn"], vartype, 0.1, 2.0)
+    args += (ahmax, 150.0, 20.0, 35.0, 10.0, 5.0)
+    exp = PestUtilsLib().build_covar_matrix_3d(*args, npts)
+    res = build_covar_matrix_3d(*args)
+    # differences of one ulp are spread by the positive definite adjustment
+    atol = 1e-10 if uniform else 1e-6 * np.abs(exp).max()
+    np.testing.assert_allclose(res, exp, rtol=rtol, atol=atol)
+
+
+@pytest.mark.parametrize("uniform", [True, False])
+def test_build_covar_matrix_storage(pts, uniform):
+    npts = len(pts["ec"])
+    aa = 250.0 if uniform else np.linspace(200.0, 300.0, npts)
+    args = (pts["ec"], pts["nc"], pts["zn"], "exp", 0.1, aa, 2.0, 1.5, 35.0)
+    full = build_covar_matrix_2d(*args)
+    # LAPACK upper packed storage is column-major
+    packed = build_covar_matrix_2d(*args, storage="packed")
+    assert packed.shape == (npts * (npts + 1) // 2,)
+    jpt, ipt = np.tril_indices(npts)
+    np.testing.assert_array_equal(packed, full[ipt, jpt])
+    packed32 = build_covar_matrix_2d(*args, storage="packed", dtype=np.float32)
+    assert packed32.dtype == np.float32
+    np.testing.assert_array_equal(packed32, packed.astype(np.float32))
+    blocks = build_covar_matrix_2d(*args, storage="blocks", dtype="float32")
+    assert [block["zone"] for block in blocks] == [1, 2, 3]
+    assert sum(len(block["index"]) for block in blocks) == npts
+    for block in blocks:
+        idx = block["index"]
+        assert (pts["zn"][idx] == block["zone"]).all()
+        assert block["covmat"].dtype == np.float32
+        np.testing.assert_array_equal(
+            block["covmat"], full[np.ix_(idx, idx)].astype(np.float32)
+        )
+    with pytest.raises(ValueError, match="storage"):
+        build_covar_matrix_2d(*args, storage="lower")
+    with pytest.raises(ValueError, match="dtype"):
+        build_covar_matrix_2d(*args, dtype=np.int32)
+
+
+@pytest.mark.parametrize("storage", ["full", "packed"])
+def test_build_covar_matrix_nthreads(pts, storage):
+    npts = len(pts["ec"])
+    args = (pts["ec"], pts["nc"], pts["zc"], pts["zn"], "spher", 0.1, 2.0)
+    args += (np.linspace(250.0, 350.0, npts), 150.0, 20.0, 35.0, 10.0, 5.0)
+    serial = build_covar_matrix_3d(*args, storage=storage, nthreads=1)
+    threaded = build_covar_matrix_3d(*args, storage=storage, nthreads=3)
+    np.testing.assert_array_equal(threaded, serial)
+    with pytest.raises(ValueError, match="nthreads"):
+        build_covar_matrix_3d(*args, nthreads=0)
+
+
+@pytest.mark.parametrize("threshold", [None, 0.0])
+def test_covariance_operator_2d(pts, threshold):
+    npts = len(pts["ec"])
+    args = (pts["ec"], pts["nc"], pts["zn"], "exp", 0.1, 250.0, 2.0, 1.5, 35.0)
+    covmat = build_covar_matrix_2d(*args)
+    op = CovarianceOperator.from_2d(*args, threshold=threshold, nthreads=2)
+    assert op.shape == (npts, npts)
+    np.testing.assert_array_equal(op.diagonal(), np.diag(covmat))
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=npts)
+    np.testing.assert_allclose(op.matvec(x), covmat @ x, rtol=1e-12)
+    x = rng.normal(size=(npts, 3))
+    np.testing.assert_allclose(op @ x, covmat @ x, rtol=1e-12)
+    np.testing.assert_allclose(
+        op.aslinearoperator().matvec(x[:, 0]), covmat @ x[:, 0], rtol=1e-12
+    )
+    with pytest.raises(ValueError, match="shape"):
+        op.matvec(np.ones(npts + 1))
+
+
+def test_covariance_operator_draw(pts):
+    npts = len(pts["ec"])
+    args = (pts["ec"], pts["nc"], pts["zc"], pts["zn"], "spher", 0.1, 2.0)
+    args += (np.linspace(250.0, 350.0, npts), 150.0, 20.0, 35.0, 10.0, 5.0)
+    covmat = build_covar_matrix_3d(*args)
+    op = CovarianceOperator.from_3d(*args)
+    for zone in op.zones:
+        idx = op.zone_index(zone)
+        factor = op.cholesky(zone)
+        np.testing.assert_allclose(
+            factor @ factor.T, covmat[np.ix_(idx, idx)], atol=1e-12
+        )
+    reals = op.draw(5, mean=1.0, seed=3)
+    assert reals.shape == (5, npts)
+    np.testing.assert_array_equal(reals, op.draw(5, mean=1.0, seed=3))
+    # points in different zones are independent
+    mean = np.arange(npts)
+    reals = op.draw(4000, mean=mean, seed=4)
+    np.testing.assert_allclose(reals.mean(axis=0), mean, atol=0.2)
+    np.testing.assert_allclose(np.cov(reals.T), covmat, atol=0.3)
+    with pytest.raises(ValueError, match="zone 5"):
+        op.cholesky(5)
+    with pytest.raises(ValueError, match="positive definite"):
+        CovarianceOperator.from_2d(
+            np.arange(50.0), np.zeros(50), 1, "gauss", 0.0, 100.0, 1.0, 1.0, 0.0
+        ).cholesky(1)
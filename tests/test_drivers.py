@@ -308,6 +308,52 @@ def test_driver2(spc, nlay, crd, depvar, ntime, fileout):
     pd.testing.assert_frame_equal(pts_df, res_df)
 
 
+@pytest.mark.parametrize("factorfiletype", ["binary", "text"])
+@pytest.mark.parametrize(
+    "spc, nlay, crd, depvar, ntime",
+    [
+        pytest.param("rect.spc", 1, "wells.crd", "rect_sgl.hds", 1, id="a"),
+        pytest.param("coast.spc", 15, "coastwells.crd", "coast_r.hds", 4, id="b_r"),
+        pytest.param("lockyer.spc", 1, "lock_bore.csv", "lock_r.hds", 4, id="c_r"),
+    ],
+)
+def test_structured_interp_factors(
+    tmp_path, spc, nlay, crd, depvar, ntime, factorfiletype
+):
+    pytest.importorskip("flopy")
+    lib = PestUtilsLib()
+    gridname = "grid1"
+    install_structured_grid(lib, data_dir / spc, gridname, nlay)
+    crd_df = read_crd(data_dir / crd)
+    exp_d = interp_from_structured_grid(lib, crd_df, data_dir / depvar, gridname, ntime)
+    factorfile = tmp_path / "factors.bin"
+    interp_success = lib.calc_structured_interp_factors(
+        gridname, crd_df.ee, crd_df.nn, crd_df.layer, factorfile, factorfiletype
+    )
+    lib.uninstall_structured_grid(gridname)
+    assert interp_success.shape == (len(crd_df),)
+    assert interp_success.any()
+    # factors are applied without an installed grid
+    res_d = lib.interp_from_structured_grid_using_factors(
+        data_dir / depvar,
+        factorfile,
+        factorfiletype,
+        1,
+        enum.Prec.single,
+        ntime,
+        "head",
+        1e20,
+        1.1e30,
+        len(crd_df),
+    )
+    assert res_d["nproctime"] == exp_d["nproctime"]
+    np.testing.assert_array_equal(res_d["simtime"], exp_d["simtime"])
+    if factorfiletype == "binary":
+        np.testing.assert_array_equal(res_d["simstate"], exp_d["simstate"])
+    else:  # text factors are written with 16 significant digits
+        np.testing.assert_allclose(res_d["simstate"], exp_d["simstate"], rtol=1e-12)
+
+
 # driver3 inputs
 @pytest.mark.parametrize(
     "spc, nlay, crd, depvar, ntime, obsdat, time_extrap, fileout",
@@ -0,0 +1,542 @@
+"""Tests for helpers module."""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from pypestutils.helpers import SpatialReference
+
+from .common import data_dir
+
+
+def test_import_is_lazy():
+    # pandas and the shared library should only be loaded when needed
+    code = (
+        "import sys, pypestutils.helpers, pypestutils.pestutilslib as pl; "
+        "assert 'pandas' not in sys.modules, 'pandas'; "
+        "assert pl._pestutils is None, 'pestutils'"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+@pytest.mark.parametrize("rotation", [0.0, 30.0, -115.0])
+def test_spatialreference_get_ij(rotation):
+    delr = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    delc = np.array([10.0, 5.0, 2.5, 5.0])
+    sr = SpatialReference(delr, delc, xul=100.0, yul=200.0, rotation=rotation)
+    r, c = sr.get_ij(sr.xcentergrid.ravel(), sr.ycentergrid.ravel())
+    rr, cc = np.indices((sr.nrow, sr.ncol))
+    np.testing.assert_array_equal(r, rr.ravel())
+    np.testing.assert_array_equal(c, cc.ravel())
+    assert sr.get_ij(sr.xcentergrid[2, 3], sr.ycentergrid[2, 3]) == (2, 3)
+    # upper left corner is inside, points beyond the extent are not
+    assert sr.get_ij(sr.xul, sr.yul) == (0, 0)
+    x, y = sr.transform(np.array([-1.0, 7.5, 16.0]), np.array([5.0, 23.0, 5.0]))
+    with pytest.raises(ValueError, match="point 0 .* is outside the grid"):
+        sr.get_ij(x, y)
+    with pytest.raises(ValueError, match="outside the grid"):
+        sr.get_ij(x[1], y[1])
+    # indexing with the result is never silently wrong
+    arr = np.arange(sr.nrow * sr.ncol).reshape(sr.nrow, sr.ncol)
+    r, c = sr.get_ij(x, y, outside="clip")
+    np.testing.assert_array_equal(arr[r, c], arr[[3, 0, 3], [0, 3, 4]])
+    r, c = sr.get_ij(np.append(x, sr.xul), np.append(y, sr.yul), outside="mask")
+    np.testing.assert_array_equal(r.mask, [True, True, True, False])
+    values = np.ma.masked_array(arr[r.filled(0), c.filled(0)], r.mask)
+    assert values.count() == 1 and values[-1] == arr[0, 0]
+    assert sr.get_ij(x[0], y[0], outside="mask") == (np.ma.masked, np.ma.masked)
+    with pytest.raises(ValueError, match="outside must be"):
+        sr.get_ij(x, y, outside="nearest")
+
+
+@pytest.mark.parametrize(
+    "spc, nrow, ncol",
+    [("coast.spc", 25, 50), ("lockyer.spc", 100, 150), ("rect.spc", 80, 50)],
+)
+def test_spatialreference_from_gridspec(spc, nrow, ncol):
+    sr = SpatialReference.from_gridspec(data_dir / spc)
+    assert sr.nrow == nrow
+    assert sr.ncol == ncol
+    assert (sr.delr > 0).all()
+    assert (sr.delc > 0).all()
+
+
+def test_spatialreference_gridspec_roundtrip(tmp_path):
+    delr = np.array([5.0] * 20 + [2.5, 1.0] + [3.0] * 7)
+    delc = np.array([1.0, 2.0, 3.0] + [4.0] * 30)
+    sr = SpatialReference(delr, delc, xul=1000.0, yul=5000.0, rotation=12.5)
+    spc = tmp_path / "grid.spc"
+    sr.write_gridspec(spc)
+    lines = spc.read_text().splitlines()
+    assert lines[2].split() == ["20*5.000000E+00", "2.500000E+00", "1.000000E+00"] + [
+        "7*3.000000E+00"
+    ]
+    sr2 = SpatialReference.from_gridspec(spc)
+    np.testing.assert_array_equal(sr2.delr, delr)
+    np.testing.assert_array_equal(sr2.delc, delc)
+    assert (sr2.xul, sr2.yul, sr2.rotation) == (1000.0, 5000.0, 12.5)
+    # text after the delr and delc values is ignored
+    text = spc.read_text()
+    spc.write_text(text + "not a value\n")
+    np.testing.assert_array_equal(SpatialReference.from_gridspec(spc).delc, delc)
+    # bad and missing values
+    for bad, match in [
+        (text.replace("2.500000E+00", "2.5x"), "2.5x"),
+        (text.replace("7*3.000000E+00", "7*3.0x"), "3.0x"),
+        (text.replace("7*3.000000E+00", "6*3.000000E+00"), "has 61 delr"),
+    ]:
+        spc.write_text(bad)
+        with pytest.raises(ValueError, match=match):
+            SpatialReference.from_gridspec(spc)
+
+
+def test_spatialreference_cache_reset():
+    sr = SpatialReference([1.0, 2.0], [3.0, 4.0, 5.0], xul=0.0, yul=12.0)
+    np.testing.assert_array_equal(sr.xedge, [0.0, 1.0, 3.0])
+    np.testing.assert_array_equal(sr.areagrid, [[3.0, 6.0], [4.0, 8.0], [5.0, 10.0]])
+    assert sr.xedge is sr.xedge
+    sr.delr = [2.0, 2.0]
+    np.testing.assert_array_equal(sr.xedge, [0.0, 2.0, 4.0])
+    np.testing.assert_array_equal(sr.areagrid[0], [6.0, 6.0])
+
+
+@pytest.mark.parametrize("rotation", [0.0, 30.0])
+def test_spatialreference_coordinate_grids(rotation):
+    delr = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    delc = np.array([10.0, 5.0, 2.5, 5.0])
+    sr = SpatialReference(delr, delc, xul=100.0, yul=200.0, rotation=rotation)
+    xc, yc = sr.transform(*np.meshgrid(sr.xcenter, sr.ycenter))
+    np.testing.assert_allclose(sr.xcentergrid, xc)
+    np.testing.assert_allclose(sr.ycentergrid, yc)
+    xe, ye = sr.transform(*np.meshgrid(sr.xedge, sr.yedge))
+    np.testing.assert_allclose(sr.xgrid, xe)
+    np.testing.assert_allclose(sr.ygrid, ye)
+    sr32 = SpatialReference(delr, delc, 100.0, 200.0, rotation, dtype=np.float32)
+    assert sr32.xcentergrid.dtype == np.float32
+    np.testing.assert_allclose(sr32.ycentergrid, yc, rtol=1e-6)
+    vrts = sr.get_vertices(np.array([0, 3]), np.array([1, 4]))
+    assert vrts.shape == (2, 5, 2)
+    np.testing.assert_allclose(vrts[1, 0], [xe[3, 4], ye[3, 4]])
+    np.testing.assert_allclose(vrts[1, 2], [xe[4, 5], ye[4, 5]])
+    np.testing.assert_allclose(sr.get_vertices(3, 4), vrts[1])
+
+
+def test_get_2d_pp_info_structured_grid(tmp_path):
+    pytest.importorskip("pandas")
+    from pypestutils.helpers import get_2d_pp_info_structured_grid
+
+    sr = SpatialReference(np.full(23, 10.0), np.full(17, 20.0), xul=0.0, yul=340.0)
+    spc = tmp_path / "grid.spc"
+    sr.write_gridspec(spc)
+    zone = np.ones((17, 23), dtype=int)
+    zone[:8, :10] = 0
+    value = np.arange(17 * 23.0).reshape((17, 23))
+    ppdf = get_2d_pp_info_structured_grid(
+        4, str(spc), array_dict={"zone": zone, "value": value}, name_prefix="p"
+    )
+    ii, jj = np.meshgrid(np.arange(2, 17, 4), np.arange(2, 23, 4), indexing="ij")
+    keep = zone[ii, jj] > 0
+    assert list(ppdf.columns[:5]) == ["ppname", "x", "y", "i", "j"]
+    assert list(ppdf.index) == [f"p{n}" for n in range(keep.sum())]
+    np.testing.assert_array_equal(ppdf.i, ii[keep])
+    np.testing.assert_array_equal(ppdf.j, jj[keep])
+    np.testing.assert_array_equal(ppdf.x, sr.xcentergrid[ii, jj][keep])
+    np.testing.assert_array_equal(ppdf.value, value[ii, jj][keep])
+    assert (ppdf.zone == 1).all()
+
+
+def test_get_2d_pp_info_unstructured_grid():
+    pd = pytest.importorskip("pandas")
+    from pypestutils.helpers import get_2d_pp_info_structured_grid
+
+    # cell centres of a shuffled 30 by 20 grid with unit spacing
+    rng = np.random.default_rng(1)
+    y, x = np.divmod(rng.permutation(600), 30)
+    x = x + 0.5
+    y = y + 0.5
+    zone = np.where(x < 5.0, 0, 2)
+    ppdf = get_2d_pp_info_structured_grid(
+        5, pd.DataFrame({"x": x, "y": y}), array_dict={"zone": zone, "extra": x * y}
+    )
+    assert "node" in ppdf.columns and "i" not in ppdf.columns
+    # one pilot point in each active bin of 5 by 5 cells, ordered from the top
+    assert len(ppdf) == 5 * 4
+    np.testing.assert_allclose(ppdf.x % 5.0, 2.5)
+    np.testing.assert_allclose(ppdf.y % 5.0, 2.5)
+    assert (np.diff(ppdf.y.values) <= 0.0).all()
+    np.testing.assert_array_equal(ppdf.x, x[ppdf.node])
+    np.testing.assert_array_equal(ppdf.extra, ppdf.x * ppdf.y)
+    assert (ppdf.zone == 2).all()
+    np.testing.assert_allclose(ppdf.corrlen, 25.0)
+    # cell spacing less than one, as with geographic coordinates
+    ppdf = get_2d_pp_info_structured_grid(5, pd.DataFrame({"x": x / 10, "y": y / 10}))
+    np.testing.assert_allclose(ppdf.corrlen, 2.5)
+
+
+def test_interpolate_with_sva_pilotpoints_2d(tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    from pypestutils.helpers import (
+        get_2d_pp_info_structured_grid,
+        interpolate_with_sva_pilotpoints_2d,
+    )
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    monkeypatch.chdir(tmp_path)
+    spc = str(data_dir / "rect.spc")
+    sr = SpatialReference.from_gridspec(spc)
+    ppdf = get_2d_pp_info_structured_grid(10, spc)
+    rng = np.random.default_rng(1)
+    ppdf["value"] = rng.uniform(1.0, 5.0, len(ppdf))
+    ppdf["bearing"] = rng.uniform(0.0, 90.0, len(ppdf))
+    ppdf["aniso"] = rng.uniform(1.0, 3.0, len(ppdf))
+    ppdf["corrlen"] = rng.uniform(500.0, 2000.0, len(ppdf))
+    results = interpolate_with_sva_pilotpoints_2d(ppdf, spc, verbose=False)
+    assert list(results) == ["bearing", "aniso", "corrlen", "result"]
+    # factor files are written to a temporary directory
+    assert list(tmp_path.iterdir()) == []
+    # hyperparameters are each interpolated with the same factors
+    lib = PestUtilsLib()
+    x, y = sr.xcentergrid.ravel(), sr.ycentergrid.ravel()
+    args = (ppdf.x.values, ppdf.y.values, 1, x, y, 1, "ordinary", 1.0, 0.0)
+    lib.calc_kriging_factors_auto_2d(*args, "hyper.fac", "binary")
+    for hyperpar in ["bearing", "aniso", "corrlen"]:
+        noint = ppdf[hyperpar].mean()
+        exp = lib.krige_using_file(
+            "hyper.fac",
+            "binary",
+            len(x),
+            "ordinary",
+            "none",
+            ppdf[hyperpar].values,
+            noint,
+            noint,
+        )
+        assert results[hyperpar].shape == (sr.nrow, sr.ncol)
+        np.testing.assert_array_equal(results[hyperpar].ravel(), exp["targval"])
+    # verbose writes text factor files and hyperparameter arrays, while
+    # factor files are only kept if fac_dir is given
+    before = set(tmp_path.iterdir())
+    verbose_results = interpolate_with_sva_pilotpoints_2d(ppdf, spc, verbose=True)
+    assert sorted(p.name for p in set(tmp_path.iterdir()) - before) == [
+        "aniso.txt",
+        "bearing.txt",
+        "corrlen.txt",
+    ]
+    np.testing.assert_allclose(verbose_results["result"], results["result"], rtol=1e-5)
+    interpolate_with_sva_pilotpoints_2d(ppdf, spc, verbose=False, fac_dir="fac")
+    for fname in ["temphyper.fac", "var.fac"]:
+        assert (tmp_path / "fac" / fname).is_file()
+
+
+def test_interpolate_with_pilotpoints_3d(tmp_path, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    from pypestutils.helpers import interpolate_with_pilotpoints_3d
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(1)
+    nlay, nrow, ncol = 3, 15, 20
+    lay, yy, xx = np.indices((nlay, nrow, ncol))
+    grid = pd.DataFrame(
+        {
+            "x": 50.0 * xx.ravel() + 25.0,
+            "y": 50.0 * yy.ravel() + 25.0,
+            "z": -10.0 * lay.ravel() - 5.0,
+            "layer": lay.ravel() + 1,
+        }
+    )
+    npp = 12
+    ppdf = pd.DataFrame(
+        {
+            "ppname": [f"pp{i}" for i in range(nlay * npp)],
+            "x": rng.uniform(0.0, 1000.0, nlay * npp),
+            "y": rng.uniform(0.0, 750.0, nlay * npp),
+            "value": rng.uniform(1.0, 5.0, nlay * npp),
+            "layer": np.repeat([1, 2, 3], npp),
+        }
+    )
+    kwargs = {"ahmax": 400.0, "ahmin": 200.0, "bearing": 30.0, "max_pts": 8}
+    res = interpolate_with_pilotpoints_3d(ppdf, grid, **kwargs)["result"]
+    assert res.shape == (nlay * nrow * ncol,)
+    # factor files are written to a temporary directory
+    assert list(tmp_path.iterdir()) == []
+    # each layer matches kriging from the pilot points of that layer
+    lib = PestUtilsLib()
+    for ilay in range(1, nlay + 1):
+        pp = ppdf[ppdf.layer == ilay]
+        cells = grid[grid.layer == ilay]
+        lib.calc_kriging_factors_3d(
+            pp.x.values,
+            pp.y.values,
+            np.zeros(npp),
+            1,
+            cells.x.values,
+            cells.y.values,
+            np.zeros(len(cells)),
+            1,
+            1,
+            "ordinary",
+            "exp",
+            400.0,
+            200.0,
+            400.0,
+            30.0,
+            0.0,
+            0.0,
+            1e30,
+            1e30,
+            1e30,
+            8,
+            1,
+            "layer.fac",
+            "binary",
+        )
+        exp = lib.krige_using_file(
+            "layer.fac",
+            "binary",
+            len(cells),
+            "ordinary",
+            "none",
+            pp.value.values,
+            0.0,
+            0.0,
+        )
+        np.testing.assert_array_equal(res[cells.index], exp["targval"])
+    # pilot points without a layer are used for all layers, and cells
+    # without pilot points in their zone get the mean pilot point value
+    zone_array = np.ones((nrow, ncol), dtype=int)
+    zone_array[:, :5] = 2
+    res = interpolate_with_pilotpoints_3d(
+        ppdf.drop(columns="layer"),
+        grid,
+        zone_array=np.tile(zone_array.ravel(), nlay),
+        **kwargs,
+    )["result"].reshape(nlay, nrow, ncol)
+    np.testing.assert_array_equal(res[0], res[2])
+    np.testing.assert_allclose(res[:, :, :5], ppdf.value.mean())
+    # true 3-D pilot points
+    ppdf["z"] = rng.uniform(-30.0, 0.0, len(ppdf))
+    res = interpolate_with_pilotpoints_3d(
+        ppdf,
+        grid.drop(columns="layer"),
+        avert=20.0,
+        verbose=True,
+        fac_dir=str(tmp_path),
+        **kwargs,
+    )["result"]
+    assert (tmp_path / "var3d.fac").is_file()
+    assert not np.array_equal(res[:300], res[600:])
+    with pytest.raises(Exception, match="layer"):
+        interpolate_with_pilotpoints_3d(
+            ppdf.drop(columns="z"), grid.drop(columns="layer")
+        )
+
+
+def test_interpolate_with_pilotpoints_numpy_backend():
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("scipy")
+    from pypestutils.helpers import (
+        get_2d_pp_info_structured_grid,
+        interpolate_with_pilotpoints_3d,
+        interpolate_with_sva_pilotpoints_2d,
+    )
+
+    spc = str(data_dir / "rect.spc")
+    ppdf = get_2d_pp_info_structured_grid(10, spc)
+    rng = np.random.default_rng(1)
+    ppdf["value"] = rng.uniform(1.0, 5.0, len(ppdf))
+    ppdf["corrlen"] = rng.uniform(500.0, 2000.0, len(ppdf))
+    kwargs = {"max_pts": 10, "verbose": False}
+    exp = interpolate_with_sva_pilotpoints_2d(ppdf, spc, **kwargs)["result"]
+    res = interpolate_with_sva_pilotpoints_2d(ppdf, spc, backend="numpy", **kwargs)
+    np.testing.assert_allclose(res["result"], exp, rtol=1e-5)
+    lay, yy, xx = np.indices((2, 15, 20))
+    grid = pd.DataFrame(
+        {
+            "x": 50.0 * xx.ravel() + 25.0,
+            "y": 50.0 * yy.ravel() + 25.0,
+            "z": -10.0 * lay.ravel() - 5.0,
+        }
+    )
+    ppdf = pd.DataFrame(
+        {
+            "ppname": [f"pp{i}" for i in range(20)],
+            "x": rng.uniform(0.0, 1000.0, 20),
+            "y": rng.uniform(0.0, 750.0, 20),
+            "z": rng.uniform(-20.0, 0.0, 20),
+            "value": rng.uniform(1.0, 5.0, 20),
+        }
+    )
+    kwargs = {"ahmax": 400.0, "avert": 20.0, "bearing": 30.0, "max_pts": 8}
+    exp = interpolate_with_pilotpoints_3d(ppdf, grid, **kwargs)["result"]
+    res = interpolate_with_pilotpoints_3d(ppdf, grid, backend="numpy", **kwargs)
+    np.testing.assert_allclose(res["result"], exp, rtol=1e-5)
+    with pytest.raises(ValueError, match="backend"):
+        interpolate_with_pilotpoints_3d(ppdf, grid, backend="fortran", **kwargs)
+
+
+def test_interpolate_with_pilotpoints_3d_grb():
+    pd = pytest.importorskip("pandas")
+    from pypestutils.helpers import interpolate_with_pilotpoints_3d
+
+    rng = np.random.default_rng(2)
+    ppdf = pd.DataFrame(
+        {
+            "ppname": [f"pp{i}" for i in range(20)],
+            "x": rng.uniform(0.0, 10000.0, 20),
+            "y": rng.uniform(0.0, 10000.0, 20),
+            "value": rng.uniform(1.0, 5.0, 20),
+            "zone": np.repeat([1, 2], 10),
+        }
+    )
+    grb = str(data_dir / "hd1h.dis.grb")
+    zone_array = rng.integers(1, 3, 11976)
+    res = interpolate_with_pilotpoints_3d(
+        ppdf, grb, ahmax={1: 2000.0, 2: 5000.0}, zone_array=zone_array
+    )
+    assert res["result"].shape == (1, 11976)
+    assert np.isfinite(res["result"]).all()
+    with pytest.raises(Exception, match="zone"):
+        interpolate_with_pilotpoints_3d(
+            ppdf, grb, ahmax={1: 2000.0}, zone_array=zone_array
+        )
+
+
+def test_grid_info_cache(tmp_path, monkeypatch):
+    from pypestutils import helpers
+    from pypestutils.helpers import (
+        GridInfo,
+        get_2d_grid_info_from_file,
+        get_grid_info_from_mf6_grb,
+    )
+
+    helpers.clear_grid_info_cache()
+    grb = tmp_path / "hd1h.dis.grb"
+    grb.write_bytes((data_dir / "hd1h.dis.grb").read_bytes())
+    spc = tmp_path / "rect.spc"
+    spc.write_text((data_dir / "rect.spc").read_text())
+    grid_info = GridInfo.from_file(grb)
+    assert grid_info.is_mf6
+    assert GridInfo.from_file(str(grb)) is grid_info
+    assert GridInfo.from_file(grb, cache=False) is not grid_info
+    # cached arrays are read-only, but copies are returned by the helpers
+    with pytest.raises(ValueError):
+        grid_info["x"][0] = 0.0
+    data = get_grid_info_from_mf6_grb(grb)
+    data["x"][0] = 0.0
+    assert grid_info["x"][0] != 0.0
+    # a GridInfo can be passed in place of a file name
+    for fname in [spc, grb]:
+        exp = get_2d_grid_info_from_file(str(fname))
+        res = get_2d_grid_info_from_file(GridInfo.from_file(fname))
+        assert res.keys() == exp.keys()
+        for key, value in exp.items():
+            np.testing.assert_array_equal(res[key], value)
+    with pytest.raises(Exception, match="MODFLOW-6"):
+        get_grid_info_from_mf6_grb(GridInfo.from_file(spc))
+    # 2-D grid info has copies of the cell arrays of a layer
+    nlay, nrow, ncol = 2, 3, 4
+    lay, _, _ = np.indices((nlay, nrow, ncol))
+    xyz = {key: lay.ravel() + offset for key, offset in zip("xyz", [0.0, 10.0, 20.0])}
+    dims = {"idis": 1, "ncells": 24, "ndim1": ncol, "ndim2": nrow, "ndim3": nlay}
+    grid_2d = get_2d_grid_info_from_file(GridInfo({**dims, **xyz}), layer=2)
+    assert grid_2d["nnodes"] == 12 and grid_2d["nrow"] == 3 and grid_2d["ncol"] == 4
+    for key, offset in zip("xyz", [0.0, 10.0, 20.0]):
+        np.testing.assert_array_equal(grid_2d[key], np.full((nrow, ncol), 1 + offset))
+        assert grid_2d[key].flags.writeable and grid_2d[key].base is None
+    dims.update(idis=2, ndim1=12, ndim2=1)
+    grid_2d = get_2d_grid_info_from_file(GridInfo({**dims, **xyz}))
+    assert grid_2d["nnodes"] == 12 and "nrow" not in grid_2d
+    np.testing.assert_array_equal(grid_2d["x"], np.zeros(12))
+    # grids are read again if modified
+    spc_info = GridInfo.from_file(spc)
+    assert GridInfo.from_file(spc) is spc_info
+    stat = spc.stat()
+    os.utime(spc, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert GridInfo.from_file(spc) is not spc_info
+    # least recently used grids are dropped
+    monkeypatch.setattr(helpers, "GRID_INFO_CACHE_SIZE", 1)
+    helpers.clear_grid_info_cache()
+    grid_info = GridInfo.from_file(grb)
+    assert GridInfo.from_file(grb) is grid_info
+    GridInfo.from_file(spc)
+    assert GridInfo.from_file(grb) is not grid_info
+    (tmp_path / "bad.txt").write_text("not a grid\n")
+    with pytest.raises(Exception, match="error getting grid info"):
+        GridInfo.from_file(tmp_path / "bad.txt")
+
+
+def test_generate_3d_grid_realizations(tmp_path, monkeypatch):
+    from pypestutils import helpers
+    from pypestutils.helpers import (
+        GridInfo,
+        _get_mf6_cell_geometry,
+        generate_3d_grid_realizations,
+        get_grid_info_from_mf6_grb,
+    )
+    from pypestutils.pestutilslib import PestUtilsLib
+
+    grb = str(data_dir / "hd1h.dis.grb")
+    kwargs = {"num_reals": 3, "ahmax": 200.0, "avert": 10.0, "random_seed": 3}
+    reals = generate_3d_grid_realizations(grb, **kwargs)
+    assert reals.shape == (3, 1, 11976)
+    # the same as generating all realizations in one call
+    grid_info = get_grid_info_from_mf6_grb(grb)
+    geometry = _get_mf6_cell_geometry(grb)
+    assert (geometry["area"] > 0.0).all() and (geometry["height"] > 0.0).all()
+    lib = PestUtilsLib()
+    lib.initialize_randgen(3)
+    exp = lib.fieldgen3d_sva(
+        grid_info["x"],
+        grid_info["y"],
+        grid_info["z"],
+        geometry["area"],
+        geometry["height"],
+        1,
+        1.0,
+        1.0,
+        200.0,
+        200.0,
+        10.0,
+        0.0,
+        0.0,
+        0.0,
+        "none",
+        "exp",
+        1.0,
+        3,
+    )
+    np.testing.assert_array_equal(reals[:, 0].T, exp)
+    # realizations do not depend on the chunk size, and may be
+    # written to a file
+    fname = tmp_path / "reals.npy"
+    res = generate_3d_grid_realizations(
+        grb, **kwargs, filename=fname, reals_per_chunk=2
+    )
+    assert isinstance(res, np.memmap)
+    np.testing.assert_array_equal(res, reals)
+    np.testing.assert_array_equal(np.load(fname), reals)
+    np.testing.assert_array_equal(
+        generate_3d_grid_realizations(grb, **kwargs, reals_per_chunk=1)[:, 0].T,
+        reals[:, 0].T,
+    )
+    # cell geometry is read from the grid info file when first used, and
+    # the grid info may be passed instead
+    calls = []
+
+    def get_geometry(fname):
+        calls.append(fname)
+        return _get_mf6_cell_geometry(fname)
+
+    monkeypatch.setattr(helpers, "_get_mf6_cell_geometry", get_geometry)
+    grid = GridInfo.from_file(grb, cache=False)
+    assert calls == []
+    for key, value in geometry.items():
+        np.testing.assert_array_equal(grid.geometry[key], value)
+    assert calls == [grb]
+    monkeypatch.undo()
+    np.testing.assert_array_equal(generate_3d_grid_realizations(grid, **kwargs), reals)
+    with pytest.raises(Exception, match="cell areas and heights"):
+        generate_3d_grid_realizations(GridInfo(grid.to_dict()), **kwargs)
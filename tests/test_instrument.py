@@ -0,0 +1,112 @@
+"""Tests for instrument module."""
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from pypestutils.instrument import Trace
+from pypestutils.pestutilslib import PestUtilsLib, PestUtilsLibError
+
+
+def krige(lib, factorfile):
+    rng = np.random.default_rng(1)
+    ecs, ncs = rng.uniform(0.0, 100.0, (2, 20))
+    ect, nct = rng.uniform(0.0, 100.0, (2, 50))
+    args = (ecs, ncs, 1, ect, nct, 1, "exp", "ordinary", 50.0, 1.0, 0.0, 1e30, 8, 1)
+    lib.calc_kriging_factors_2d(*args, factorfile, "binary")
+    sourceval = rng.uniform(1.0, 10.0, 20)
+    return lib.krige_using_file(
+        factorfile, "binary", 50, "ordinary", "none", sourceval, 0.0, 0.0
+    )
+
+
+def test_trace(tmp_path):
+    lib = PestUtilsLib()
+    factorfile = tmp_path / "factors.bin"
+    original = PestUtilsLib.krige_using_file
+    with Trace() as trace:
+        assert PestUtilsLib.krige_using_file is not original
+        exp = krige(lib, factorfile)
+    # methods are restored
+    assert PestUtilsLib.krige_using_file is original
+    nbytes = factorfile.stat().st_size
+    calc, kriged = trace.records
+    assert calc["name"] == "calc_kriging_factors_2d"
+    assert calc["sizes"] == {"npts": 20, "mpts": 50}
+    assert (calc["bytes_read"], calc["bytes_written"]) == (0, nbytes)
+    assert calc["time"] > 0.0
+    assert calc["error"] is None
+    assert kriged["name"] == "krige_using_file"
+    assert kriged["sizes"] == {"mpts": 50}
+    assert (kriged["bytes_read"], kriged["bytes_written"]) == (nbytes, 0)
+    # results are unchanged
+    np.testing.assert_array_equal(krige(lib, factorfile)["targval"], exp["targval"])
+    # calls after the trace are not recorded
+    assert len(trace.records) == 2
+    summary = trace.summary().splitlines()
+    assert summary[0].split()[:2] == ["method", "calls"]
+    assert {line.split()[0] for line in summary[2:]} == {
+        "calc_kriging_factors_2d",
+        "krige_using_file",
+    }
+    trace.to_json(tmp_path / "trace.json")
+    with open(tmp_path / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+    assert [event["name"] for event in events] == [
+        "calc_kriging_factors_2d",
+        "krige_using_file",
+    ]
+    assert events[0]["ph"] == "X"
+    assert events[1]["ts"] >= events[0]["ts"] + events[0]["dur"]
+    assert events[1]["args"]["bytes_read"] == nbytes
+
+
+def test_trace_lib_and_decorator(tmp_path):
+    lib = PestUtilsLib()
+    other = PestUtilsLib()
+    trace = Trace(lib)
+
+    @trace
+    def run():
+        krige(other, tmp_path / "other.bin")
+        krige(lib, tmp_path / "factors.bin")
+        with pytest.raises(PestUtilsLibError):
+            lib.krige_using_file(
+                tmp_path / "factors.bin", 0, 49, 1, 0, np.ones(20), 0.0, 0.0
+            )
+
+    with Trace() as outer:
+        run()
+    assert [record["name"] for record in trace.records] == [
+        "calc_kriging_factors_2d",
+        "krige_using_file",
+        "krige_using_file",
+    ]
+    assert trace.records[-1]["error"] == "PestUtilsLibError"
+    assert trace.records[-1]["bytes_read"] > 0
+    assert len(outer.records) == 5
+    assert not hasattr(PestUtilsLib.krige_using_file, "__wrapped__")
+
+
+def test_trace_reentry():
+    lib = PestUtilsLib()
+    trace = Trace()
+
+    @trace
+    def inner():
+        lib.initialize_randgen(1)
+
+    @trace
+    def outer():
+        inner()
+        # calls from other threads are recorded
+        thread = threading.Thread(target=lib.initialize_randgen, args=(2,))
+        thread.start()
+        thread.join()
+
+    with trace:
+        outer()
+    assert [record["name"] for record in trace.records] == ["initialize_randgen"] * 2
+    assert trace.records[0]["thread"] != trace.records[1]["thread"]
+    assert not hasattr(PestUtilsLib.initialize_randgen, "__wrapped__")
@@ -0,0 +1,192 @@
+"""Tests for ipd module."""
+
+import numpy as np
+import pytest
+
+from pypestutils.ipd import (
+    calc_ipd_factors_2d,
+    calc_ipd_factors_3d,
+    ipd_interpolate_2d,
+    ipd_interpolate_3d,
+)
+from pypestutils.pestutilslib import PestUtilsLib
+
+
+def args_2d(pts, **kwargs):
+    """Arguments of ipd_interpolate_2d, with any changed by kwargs."""
+    names = ["ecs", "ncs", "zns", "sourceval", "ect", "nct", "znt"]
+    names += ["anis", "bearing", "invpow"]
+    return {**{name: pts[name] for name in names}, "transtype": "none", **kwargs}
+
+
+def args_3d(pts, **kwargs):
+    """Arguments of ipd_interpolate_3d, with any changed by kwargs."""
+    names = ["ecs", "ncs", "zcs", "zns", "sourceval", "ect", "nct", "zct", "znt"]
+    names += ["bearing", "dip", "rake", "invpow"]
+    return {
+        **{name: pts[name] for name in names},
+        "transtype": "none",
+        "ahmax": 100.0,
+        "ahmin": 50.0,
+        "avert": 10.0,
+        **kwargs,
+    }
+
+
+def factor_args(args):
+    """Arguments of calc_ipd_factors_2d or _3d, from those of interpolation."""
+    return {k: v for k, v in args.items() if k not in ["sourceval", "transtype"]}
+
+
+def nearest_interpolate(pts, sqdist, transtype, max_pts, search_radius):
+    """Interpolate each target from a brute force search of sources."""
+    targval = np.full(len(pts["ect"]), -1.0)
+    for ipt, zone in enumerate(pts["znt"]):
+        if zone == 0:
+            continue
+        src = np.flatnonzero(pts["zns"] == zone)
+        sqd = sqdist(ipt, src)
+        order = np.argsort(sqd)
+        src, sqd = src[order], sqd[order]
+        if search_radius is not None:
+            src, sqd = src[sqd <= search_radius**2], sqd[sqd <= search_radius**2]
+        if max_pts is not None:
+            src, sqd = src[:max_pts], sqd[:max_pts]
+        if len(src) == 0:
+            continue
+        fac = 1.0 / sqd ** np.sqrt(pts["invpow"][ipt])
+        val = pts["sourceval"][src]
+        if transtype == "log":
+            targval[ipt] = np.exp((fac * np.log(val)).sum() / fac.sum())
+        else:
+            targval[ipt] = (fac * val).sum() / fac.sum()
+    return targval
+
+
+@pytest.mark.parametrize("transtype", ["none", "log"])
+def test_ipd_interpolate_2d(pts, transtype):
+    args = args_2d(pts, transtype=transtype)
+    exp = PestUtilsLib().ipd_interpolate_2d(**args)
+    res = ipd_interpolate_2d(**args)
+    np.testing.assert_allclose(res, exp, rtol=1e-12)
+
+
+@pytest.mark.parametrize("transtype", ["none", "log"])
+def test_ipd_interpolate_3d(pts, transtype):
+    args = args_3d(pts, transtype=transtype)
+    exp = PestUtilsLib().ipd_interpolate_3d(**args)
+    res = ipd_interpolate_3d(**args)
+    np.testing.assert_allclose(res, exp, rtol=1e-12)
+
+
+@pytest.mark.parametrize(
+    "max_pts, search_radius", [(8, None), (None, 150.0), (8, 120.0)]
+)
+def test_ipd_interpolate_2d_search(pts, max_pts, search_radius):
+    pytest.importorskip("scipy")
+
+    def sqdist(ipt, src):
+        angle = np.radians(180.0 - pts["bearing"][ipt])
+        dx = pts["ecs"][src] - pts["ect"][ipt]
+        dy = pts["ncs"][src] - pts["nct"][ipt]
+        dtempx = (dx * np.cos(angle) + dy * np.sin(angle)) * pts["anis"][ipt]
+        dtempy = -dx * np.sin(angle) + dy * np.cos(angle)
+        return dtempx**2 + dtempy**2
+
+    args = args_2d(pts)
+    exp = nearest_interpolate(pts, sqdist, "none", max_pts, search_radius)
+    res = ipd_interpolate_2d(
+        **args, max_pts=max_pts, search_radius=search_radius, nointerpval=-1.0
+    )
+    np.testing.assert_allclose(res, exp, rtol=1e-10)
+    assert (res[pts["znt"] == 0] == -1.0).all()
+    if search_radius is not None:
+        # some targets are without sources within the search radius
+        assert (res[pts["znt"] != 0] == -1.0).any()
+
+
+@pytest.mark.parametrize("transtype", ["none", "log"])
+def test_ipd_interpolate_3d_search(pts, transtype):
+    pytest.importorskip("scipy")
+    args = args_3d(pts, transtype=transtype)
+    # a search for more than the number of sources uses all of them
+    res = ipd_interpolate_3d(**args, max_pts=1000)
+    np.testing.assert_allclose(res, ipd_interpolate_3d(**args), rtol=1e-12)
+
+    def sqdist(ipt, src):
+        return (
+            (pts["ecs"][src] - pts["ect"][ipt]) ** 2
+            + (pts["ncs"][src] - pts["nct"][ipt]) ** 2
+            + (pts["zcs"][src] - pts["zct"][ipt]) ** 2
+        )
+
+    # isotropic correlation lengths
+    args.update(ahmax=30.0, ahmin=30.0, avert=30.0)
+    exp = nearest_interpolate(pts, sqdist, transtype, 5, 100.0)
+    res = ipd_interpolate_3d(**args, max_pts=5, search_radius=100.0, nointerpval=-1.0)
+    np.testing.assert_allclose(res, exp, rtol=1e-10)
+
+
+@pytest.mark.parametrize("factorfiletype", ["binary", "text"])
+@pytest.mark.parametrize("transtype", ["none", "log"])
+def test_calc_ipd_factors_2d(tmp_path, pts, factorfiletype, transtype):
+    factorfile = tmp_path / "factors.dat"
+    args = args_2d(pts, transtype=transtype)
+    mpts = len(pts["ect"])
+    kwargs = {"max_pts": 8, "search_radius": 120.0} if transtype == "log" else {}
+    icount_interp = calc_ipd_factors_2d(
+        **factor_args(args),
+        factorfile=factorfile,
+        factorfiletype=factorfiletype,
+        **kwargs,
+    )
+    exp = ipd_interpolate_2d(**args, **kwargs, nointerpval=-1.0)
+    assert icount_interp == (exp != -1.0).sum()
+    res = PestUtilsLib().krige_using_file(
+        factorfile,
+        factorfiletype,
+        mpts,
+        "ordinary",
+        transtype,
+        pts["sourceval"],
+        None,
+        -1.0,
+    )
+    assert res["icount_interp"] == icount_interp
+    # factors are stored in single precision
+    np.testing.assert_allclose(res["targval"], exp, rtol=1e-6)
+
+
+def test_calc_ipd_factors_3d(tmp_path, pts):
+    factorfile = tmp_path / "factors.bin"
+    args = args_3d(pts)
+    icount_interp = calc_ipd_factors_3d(
+        **factor_args(args), factorfile=factorfile, factorfiletype=0, max_pts=5
+    )
+    assert icount_interp == (pts["znt"] != 0).sum()
+    res = PestUtilsLib().krige_using_file(
+        factorfile, 0, len(pts["ect"]), 1, 0, pts["sourceval"], None, 0.0
+    )
+    exp = ipd_interpolate_3d(**args, max_pts=5)
+    np.testing.assert_allclose(res["targval"], exp, rtol=1e-6)
+
+
+def test_ipd_interpolate_errors(pts):
+    args = args_2d(pts)
+    with pytest.raises(ValueError, match="max_pts"):
+        ipd_interpolate_2d(**args, max_pts=0)
+    with pytest.raises(ValueError, match="FactorFileType"):
+        calc_ipd_factors_2d(
+            **factor_args(args), factorfile="fac.dat", factorfiletype="csv"
+        )
+    with pytest.raises(ValueError, match="search_radius"):
+        ipd_interpolate_2d(**args, search_radius=-1.0)
+    with pytest.raises(ValueError, match="TransType"):
+        ipd_interpolate_2d(**args_2d(pts, transtype="ln"))
+    with pytest.raises(ValueError, match="anis"):
+        ipd_interpolate_2d(**args_2d(pts, anis=0.0))
+    with pytest.raises(ValueError, match="zone 3"):
+        ipd_interpolate_2d(**args_2d(pts, znt=3))
+    sourceval = pts["sourceval"] - 5.0
+    with pytest.raises(ValueError, match="positive"):
+        ipd_interpolate_2d(**args_2d(pts, sourceval=sourceval, transtype="log"))
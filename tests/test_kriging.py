@@ -0,0 +1,248 @@
+"""Tests for kriging module."""
+import numpy as np
+import pytest
+
+from pypestutils.kriging import calc_kriging_factors_2d, calc_kriging_factors_3d
+from pypestutils.pestutilslib import PestUtilsLib
+
+pytest.importorskip("scipy")
+
+
+def read_factors(factorfile):
+    """Header and records of a binary factor file, by target."""
+    data = np.fromfile(factorfile, np.uint8)
+    acode = data[:20].tobytes().decode().strip()
+    words = data[20:].view(np.int32)
+    records = {}
+    pos = 2
+    while pos < len(words):
+        icell, na = words[pos : pos + 2]
+        pairs = words[pos + 3 : pos + 3 + 2 * na].reshape(na, 2)
+        rtemp = words[pos + 2 : pos + 3].view(np.float32)[0]
+        records[icell] = (rtemp, pairs[:, 0], pairs[:, 1].view(np.float32))
+        pos += 3 + 2 * na
+    return (acode, *words[:2]), records
+
+
+def assert_factors_close(factorfile, expected_factorfile):
+    header, records = read_factors(factorfile)
+    expected_header, expected_records = read_factors(expected_factorfile)
+    assert header == expected_header
+    assert list(records) == list(expected_records)
+    for icell, (rtemp, isrc, fac) in records.items():
+        exp_rtemp, exp_isrc, exp_fac = expected_records[icell]
+        np.testing.assert_array_equal(isrc, exp_isrc)
+        np.testing.assert_allclose(fac, exp_fac, atol=1e-5)
+        np.testing.assert_allclose(rtemp, exp_rtemp, atol=1e-5)
+
+
+def args_2d(pts, **kwargs):
+    """Arguments of calc_kriging_factors_2d, with any changed by kwargs."""
+    names = ["ecs", "ncs", "zns", "ect", "nct", "znt", "aa", "anis", "bearing"]
+    return {
+        **{name: pts[name] for name in names},
+        "vartype": "exp",
+        "krigtype": "ordinary",
+        "searchrad": 400.0,
+        "maxpts": 12,
+        "minpts": 1,
+        **kwargs,
+    }
+
+
+def args_3d(pts, **kwargs):
+    """Arguments of calc_kriging_factors_3d, with any changed by kwargs."""
+    names = ["ecs", "ncs", "zcs", "zns", "ect", "nct", "zct", "znt"]
+    return {
+        **{name: pts[name] for name in names},
+        "zonenum": [1, 2],
+        "krigtype": "ordinary",
+        "vartype": "exp",
+        "ahmax": [300.0, 200.0],
+        "ahmin": 150.0,
+        "avert": 40.0,
+        "bearing": [30.0, 60.0],
+        "dip": [10.0, -5.0],
+        "rake": [0.0, 20.0],
+        "srhmax": 500.0,
+        "srhmin": 300.0,
+        "srvert": 100.0,
+        "maxpts": 12,
+        "minpts": 1,
+        **kwargs,
+    }
+
+
+@pytest.mark.parametrize("vartype", ["spher", "exp", "pow"])
+@pytest.mark.parametrize("krigtype", ["ordinary", "simple"])
+def test_calc_kriging_factors_2d(tmp_path, pts, vartype, krigtype):
+    lib = PestUtilsLib()
+    args = args_2d(pts, vartype=vartype, krigtype=krigtype, factorfiletype=0)
+    if vartype == "pow":
+        args["aa"] = 1.0
+    icount_interp = calc_kriging_factors_2d(**args, factorfile=tmp_path / "factors.bin")
+    assert icount_interp == (pts["znt"] != 0).sum()
+    exp = lib.calc_kriging_factors_2d(**args, factorfile=tmp_path / "expected.bin")
+    assert icount_interp == exp
+    assert_factors_close(tmp_path / "factors.bin", tmp_path / "expected.bin")
+
+
+@pytest.mark.parametrize("vartype", ["spher", "exp", "gauss", "pow"])
+@pytest.mark.parametrize("krigtype", ["ordinary", "simple"])
+def test_calc_kriging_factors_3d(tmp_path, pts, vartype, krigtype):
+    lib = PestUtilsLib()
+    args = args_3d(pts, vartype=vartype, krigtype=krigtype, factorfiletype=0)
+    if vartype == "pow":
+        args["ahmax"] = 1.0
+    icount_interp = calc_kriging_factors_3d(**args, factorfile=tmp_path / "factors.bin")
+    assert icount_interp == (pts["znt"] != 0).sum()
+    exp = lib.calc_kriging_factors_3d(**args, factorfile=tmp_path / "expected.bin")
+    assert icount_interp == exp
+    assert_factors_close(tmp_path / "factors.bin", tmp_path / "expected.bin")
+
+
+@pytest.mark.parametrize("krigtype", ["ordinary", "simple"])
+def test_calc_kriging_factors_text(tmp_path, pts, krigtype, monkeypatch):
+    lib = PestUtilsLib()
+    mpts = len(pts["ect"])
+    for calc, args in [
+        (calc_kriging_factors_2d, args_2d(pts, krigtype=krigtype)),
+        (calc_kriging_factors_3d, args_3d(pts, krigtype=krigtype)),
+    ]:
+        calc(**args, factorfile=tmp_path / "factors.bin", factorfiletype="binary")
+        calc(**args, factorfile=tmp_path / "factors.txt", factorfiletype="text")
+        getattr(lib, calc.__name__)(
+            **args, factorfile=tmp_path / "expected.txt", factorfiletype="text"
+        )
+        res = {}
+        for fname, ftype in [
+            ("factors.bin", 0),
+            ("factors.txt", 1),
+            ("expected.txt", 1),
+        ]:
+            res[fname] = lib.krige_using_file(
+                tmp_path / fname,
+                ftype,
+                mpts,
+                krigtype,
+                "log",
+                pts["sourceval"],
+                3.0,
+                -1.0,
+            )["targval"]
+        np.testing.assert_allclose(res["factors.txt"], res["factors.bin"], rtol=1e-6)
+        np.testing.assert_allclose(res["factors.txt"], res["expected.txt"], rtol=1e-5)
+        # factors are the same when calculated in small chunks
+        monkeypatch.setattr("pypestutils.kriging.CHUNK_SIZE", 500)
+        calc(**args, factorfile=tmp_path / "chunks.bin", factorfiletype="binary")
+        monkeypatch.undo()
+        assert (tmp_path / "chunks.bin").read_bytes() == (
+            tmp_path / "factors.bin"
+        ).read_bytes()
+
+
+def test_krige_using_file(tmp_path, pts):
+    from pypestutils.kriging import _krige_using_file
+
+    lib = PestUtilsLib()
+    mpts = len(pts["ect"])
+    rng = np.random.default_rng(2)
+    sourceval = np.column_stack(
+        [pts["sourceval"], rng.uniform(-5.0, 5.0, len(pts["ecs"]))]
+    )
+    nointerpval = [3.0, -1.0]
+    for fname, ftype in [("factors.bin", "binary"), ("factors.txt", "text")]:
+        factorfile = tmp_path / fname
+        lib.calc_kriging_factors_2d(
+            **args_2d(pts), factorfile=factorfile, factorfiletype=ftype
+        )
+        # the same as applying the factors to each column in turn
+        exp = np.column_stack(
+            [
+                lib.krige_using_file(
+                    factorfile,
+                    ftype,
+                    mpts,
+                    "ordinary",
+                    "none",
+                    sourceval[:, i],
+                    None,
+                    nointerpval[i],
+                )["targval"]
+                for i in range(2)
+            ]
+        )
+        res = _krige_using_file(factorfile, ftype, sourceval, nointerpval)
+        np.testing.assert_array_equal(res, exp)
+        assert (res[pts["znt"] == 0] == nointerpval).all()
+    with pytest.raises(ValueError, match="sourceval"):
+        _krige_using_file(factorfile, "text", sourceval[1:], nointerpval)
+    lib.calc_kriging_factors_2d(
+        **args_2d(pts, krigtype="simple"),
+        factorfile=tmp_path / "simple.bin",
+        factorfiletype="binary",
+    )
+    with pytest.raises(ValueError, match="ordinary kriging factors"):
+        _krige_using_file(tmp_path / "simple.bin", "binary", sourceval, nointerpval)
+    (tmp_path / "short.bin").write_bytes((tmp_path / "factors.bin").read_bytes()[:-4])
+    with pytest.raises(ValueError, match="premature end"):
+        _krige_using_file(tmp_path / "short.bin", "binary", sourceval, nointerpval)
+
+
+def test_calc_kriging_factors_search(tmp_path, pts):
+    # targets with fewer than maxpts sources within the search radius
+    args = args_2d(pts, vartype="spher", searchrad=250.0, factorfiletype=0)
+    calc_kriging_factors_2d(**args, factorfile=tmp_path / "factors.bin")
+    PestUtilsLib().calc_kriging_factors_2d(**args, factorfile=tmp_path / "expected.bin")
+    _, records = read_factors(tmp_path / "factors.bin")
+    assert min(len(isrc) for _, isrc, _ in records.values()) < 12
+    assert_factors_close(tmp_path / "factors.bin", tmp_path / "expected.bin")
+
+
+def test_calc_kriging_factors_errors(tmp_path, pts):
+    files = {"factorfile": tmp_path / "factors.bin", "factorfiletype": 0}
+
+    def calc_2d(**kwargs):
+        calc_kriging_factors_2d(**args_2d(pts, **kwargs), **files)
+
+    def calc_3d(**kwargs):
+        calc_kriging_factors_3d(**args_3d(pts, **kwargs), **files)
+
+    with pytest.raises(ValueError, match="maxpts must not be less than minpts"):
+        calc_2d(maxpts=2, minpts=3)
+    with pytest.raises(ValueError, match="searchrad"):
+        calc_2d(searchrad=0.0)
+    with pytest.raises(ValueError, match="anis"):
+        calc_2d(anis=0.0)
+    with pytest.raises(ValueError, match="zone 3 from the znt array"):
+        calc_2d(znt=3)
+    with pytest.raises(ValueError, match="VarioType"):
+        calc_2d(vartype="sph")
+    with pytest.raises(ValueError, match="search radius"):
+        calc_2d(searchrad=10.0, minpts=5)
+    # coincident source points
+    ecs = pts["ecs"].copy()
+    ncs = pts["ncs"].copy()
+    ecs[1], ncs[1] = ecs[0], ncs[0]
+    with pytest.raises(ValueError, match="coincident"):
+        calc_2d(ecs=ecs, ncs=ncs, zns=1, znt=1)
+    with pytest.raises(ValueError, match="zone 2 features in the zns array"):
+        calc_3d(zonenum=1)
+    with pytest.raises(ValueError, match="ahmax"):
+        calc_3d(ahmax=0.0)
+
+
+@pytest.mark.parametrize("krigtype", ["ordinary", "simple"])
+def test_calc_kriging_factors_grid(tmp_path, krigtype):
+    # sources on a regular grid, with many equally near to targets
+    ecs, ncs = (a.ravel() * 100.0 for a in np.indices((10, 10)))
+    ect, nct = (a.ravel() * 25.0 for a in np.indices((40, 40)))
+    args = {
+        **{"ecs": ecs, "ncs": ncs, "zns": 1, "ect": ect, "nct": nct, "znt": 1},
+        **{"vartype": "exp", "krigtype": krigtype, "aa": 300.0, "anis": 1.0},
+        **{"bearing": 0.0, "searchrad": 1e10, "maxpts": 10, "minpts": 1},
+        "factorfiletype": 0,
+    }
+    calc_kriging_factors_2d(**args, factorfile=tmp_path / "factors.bin")
+    PestUtilsLib().calc_kriging_factors_2d(**args, factorfile=tmp_path / "expected.bin")
+    assert_factors_close(tmp_path / "factors.bin", tmp_path / "expected.bin")
@@ -0,0 +1,123 @@
+"""Tests for overlay module."""
+import numpy as np
+import pytest
+
+from pypestutils.overlay import OverlayFactors, calc_structural_overlay_factors
+from pypestutils.pestutilslib import PestUtilsLib
+
+
+@pytest.fixture
+def structures():
+    rng = np.random.default_rng(1)
+    # two zig-zag structures, the second overlapping the first
+    ecs = np.concatenate([np.linspace(100.0, 900.0, 21), np.linspace(200.0, 700.0, 11)])
+    ncs = np.concatenate(
+        [400.0 + 30.0 * (np.arange(21) % 2), np.linspace(200, 700, 11)]
+    )
+    ect, nct = np.meshgrid(np.arange(0.0, 1000.0, 20.0), np.arange(0.0, 1000.0, 25.0))
+    active = (rng.uniform(size=ect.size) > 0.1).astype(int)
+    return {
+        "ecs": ecs,
+        "ncs": ncs,
+        "ids": np.repeat([3, 1], [21, 11]),
+        "conwidth": rng.uniform(20.0, 60.0, len(ecs)),
+        "aa": rng.uniform(10.0, 40.0, len(ecs)),
+        "ect": ect.ravel(),
+        "nct": nct.ravel(),
+        "active": active,
+    }
+
+
+def args(structures, structype):
+    return (
+        *(structures[name] for name in ["ecs", "ncs", "ids", "conwidth", "aa"]),
+        structype,
+        1.5,
+        *(structures[name] for name in ["ect", "nct", "active"]),
+    )
+
+
+@pytest.mark.parametrize("structype", ["polylinear", "polygonal"])
+def test_calc_structural_overlay_factors(tmp_path, structures, structype):
+    lib = PestUtilsLib()
+    rng = np.random.default_rng(2)
+    npts = len(structures["ecs"])
+    mpts = len(structures["ect"])
+    factors = calc_structural_overlay_factors(*args(structures, structype))
+    assert (factors.npts, factors.mpts) == (npts, mpts)
+    assert factors.icount_interp == 2 * structures["active"].sum()
+    for factorfiletype in ["binary", "text"]:
+        factorfile = tmp_path / f"factors_{factorfiletype}.dat"
+        lib.calc_structural_overlay_factors(
+            *args(structures, structype), factorfile, factorfiletype
+        )
+        from_file = OverlayFactors.from_file(factorfile, factorfiletype)
+        np.testing.assert_array_equal(from_file.target, factors.target)
+        np.testing.assert_array_equal(from_file.indptr, factors.indptr)
+        np.testing.assert_array_equal(from_file.source, factors.source)
+        # text factors are written with 10 significant figures
+        np.testing.assert_allclose(from_file.factor, factors.factor, rtol=1e-9)
+    for transtype, lt_target, gt_target in [
+        ("none", "y", "y"),
+        ("log", "n", "y"),
+        ("log", True, False),
+    ]:
+        sourceval = rng.uniform(1.0, 10.0, npts)
+        targval = rng.uniform(1.0, 10.0, mpts)
+        exp = lib.interpolate_blend_using_file(
+            tmp_path / "factors_binary.dat",
+            "binary",
+            transtype,
+            lt_target,
+            gt_target,
+            sourceval,
+            targval,
+        )
+        res = factors.apply(sourceval, targval, transtype, lt_target, gt_target)
+        assert res.shape == (mpts,)
+        np.testing.assert_allclose(res, exp["targval"], rtol=1e-12)
+
+
+def test_overlay_factors_apply_ensemble(structures, monkeypatch):
+    rng = np.random.default_rng(3)
+    npts = len(structures["ecs"])
+    mpts = len(structures["ect"])
+    nreal = 7
+    factors = calc_structural_overlay_factors(*args(structures, 0))
+    sourceval = rng.uniform(1.0, 10.0, (npts, nreal))
+    targval = rng.uniform(1.0, 10.0, (mpts, nreal))
+    targval_in = targval.copy()
+    res = factors.apply(sourceval, targval, "log")
+    assert res.shape == (mpts, nreal)
+    np.testing.assert_array_equal(targval, targval_in)
+    for ireal in range(nreal):
+        exp = factors.apply(sourceval[:, ireal], targval[:, ireal], "log")
+        np.testing.assert_allclose(res[:, ireal], exp, rtol=1e-14)
+    # blending in small chunks gives the same result
+    monkeypatch.setattr("pypestutils.overlay.CHUNK_SIZE", 50)
+    np.testing.assert_allclose(factors.apply(sourceval, targval, "log"), res)
+    # source or target values are broadcast across realisations
+    res = factors.apply(sourceval[:, 0], targval)
+    np.testing.assert_allclose(
+        res[:, 1], factors.apply(sourceval[:, 0], targval[:, 1]), rtol=1e-14
+    )
+    res = factors.apply(sourceval, 1.0 + np.zeros(mpts))
+    assert res.shape == (mpts, nreal)
+
+
+def test_overlay_factors_errors(tmp_path, structures):
+    factors = calc_structural_overlay_factors(*args(structures, 0))
+    npts = factors.npts
+    mpts = factors.mpts
+    with pytest.raises(ValueError, match="sourceval"):
+        factors.apply(np.ones(npts + 1), np.ones(mpts))
+    with pytest.raises(ValueError, match="realisations"):
+        factors.apply(np.ones((npts, 2)), np.ones((mpts, 3)))
+    with pytest.raises(ValueError, match="lt_target"):
+        factors.apply(np.ones(npts), np.ones(mpts), lt_target="x")
+    with pytest.raises(ValueError, match="positive"):
+        factors.apply(np.zeros(npts), np.ones(mpts), "log")
+    factorfile = tmp_path / "factors.dat"
+    factorfile.write_text("2dko\n         2         2\n")
+    with pytest.raises(ValueError, match="incompatible"):
+        OverlayFactors.from_file(factorfile, "text")
@@ -2,6 +2,7 @@
 import logging
 from pathlib import PureWindowsPath
 
+import numpy as np
 import pytest
 
 from pypestutils.pestutilslib import PestUtilsLib, PestUtilsLibError
@@ -114,12 +115,94 @@ def test_build_covar_matrix_3d():
     ...
 
 
-def test_calc_structural_overlay_factors():
-    ...
-
-
-def test_interpolate_blend_using_file():
-    ...
+@pytest.mark.parametrize("factorfiletype", ["binary", "text"])
+@pytest.mark.parametrize("structype", ["polylinear", "polygonal"])
+def test_calc_structural_overlay_factors(tmp_path, structype, factorfiletype):
+    lib = PestUtilsLib()
+    # a zig-zag structure of many short segments
+    ecs = np.linspace(100.0, 900.0, 41)
+    ncs = 500.0 + 20.0 * (np.arange(41) % 2)
+    if structype == "polygonal":
+        ecs = np.concatenate([ecs, ecs[::-1]])
+        ncs = np.concatenate([ncs, ncs[::-1] + 200.0])
+    conwidth, aa = 40.0, 15.0
+    ect, nct = np.meshgrid(np.arange(0.0, 1000.0, 10.0), np.arange(300.0, 900.0, 7.0))
+    ect, nct = ect.ravel(), nct.ravel()
+    active = np.ones(len(ect), dtype=int)
+    active[::7] = 0
+    factorfile = tmp_path / "factors.dat"
+    icount_interp = lib.calc_structural_overlay_factors(
+        ecs,
+        ncs,
+        1,
+        conwidth,
+        aa,
+        structype,
+        1.0,
+        ect,
+        nct,
+        active,
+        factorfile,
+        factorfiletype,
+    )
+    assert icount_interp == active.sum()
+    res = lib.interpolate_blend_using_file(
+        factorfile,
+        factorfiletype,
+        "none",
+        True,
+        True,
+        np.full(len(ecs), 5.0),
+        np.ones(len(ect)),
+    )
+    assert res["icount_interp"] == icount_interp
+
+    # blending factors from the distance to the closest segment
+    x1, y1, x2, y2 = ecs[:-1], ncs[:-1], ecs[1:], ncs[1:]
+    if structype == "polygonal":
+        x1, y1 = np.append(x1, ecs[-1]), np.append(y1, ncs[-1])
+        x2, y2 = np.append(x2, ecs[0]), np.append(y2, ncs[0])
+    dx, dy = x2 - x1, y2 - y1
+    uu = ((ect[:, None] - x1) * dx + (nct[:, None] - y1) * dy) / (dx**2 + dy**2)
+    uu = uu.clip(0.0, 1.0)
+    dist = np.hypot(x1 + uu * dx - ect[:, None], y1 + uu * dy - nct[:, None])
+    dist = dist.min(axis=1) - conwidth / 2
+    gg = np.where(dist < 0.0, 1.0, np.exp(-((dist / aa) ** 2)))
+    if structype == "polygonal":
+        gg[(ect > 100.0) & (ect < 900.0) & (nct > 520.0) & (nct < 700.0)] = 1.0
+    exp = np.where(active == 1, 1.0 + 4.0 * gg, 1.0)
+    np.testing.assert_allclose(res["targval"], exp, rtol=1e-7, atol=1e-12)
+    # targets beyond the influence of the structure are unchanged
+    assert (res["targval"] == 1.0).sum() > len(ect) // 4
+
+
+def test_interpolate_blend_using_file(tmp_path):
+    lib = PestUtilsLib()
+    factorfile = tmp_path / "factors.bin"
+    ect = np.arange(0.0, 100.0, 5.0)
+    nct = np.zeros_like(ect)
+    lib.calc_structural_overlay_factors(
+        [20.0, 80.0], [0.0, 0.0], 1, 10.0, 5.0, 0, 1.0, ect, nct, 1, factorfile, 0
+    )
+    targval = np.full(len(ect), 2.0)
+    res = lib.interpolate_blend_using_file(
+        factorfile, 0, "log", "n", "y", [10.0, 10.0], targval
+    )
+    # the input array is not modified
+    assert (targval == 2.0).all()
+    # half of the contact width is within the structure
+    within = (ect >= 15.0) & (ect <= 85.0)
+    np.testing.assert_allclose(res["targval"][within], 10.0)
+    assert (res["targval"][~within] < 10.0).all()
+    # values greater than the target values are not allowed
+    res = lib.interpolate_blend_using_file(
+        factorfile, 0, "log", "y", "n", [10.0, 10.0], targval
+    )
+    np.testing.assert_array_equal(res["targval"], targval)
+    with pytest.raises(PestUtilsLibError, match="LT_TARGET"):
+        lib.interpolate_blend_using_file(
+            factorfile, 0, "log", "x", "n", [10.0, 10.0], targval
+        )
 
 
 def test_ipd_interpolate_2d():
@@ -140,3 +223,73 @@ def test_fieldgen2d_sva():
 
 def test_fieldgen3d_sva():
     ...
+
+
+def test_set_progress_callback(tmp_path):
+    lib = PestUtilsLib()
+    lib.initialize_randgen(123)
+    ect, nct = np.meshgrid(np.arange(20.0), np.arange(10.0))
+    ect = ect.ravel()
+    nct = nct.ravel()
+    nnode = len(ect)
+    fieldgen_args = (ect, nct, 1.0, 1, 1.0, 1.0, 3.0, 1.0, 0.0, "none", "exp", 1.0, 2)
+    calls = []
+    try:
+        lib.set_progress_callback(lambda done, total: calls.append((done, total)), 30)
+        lib.fieldgen2d_sva(*fieldgen_args)
+        # every 30 nodes and the last one
+        assert calls == [(done, nnode) for done in [*range(30, nnode, 30), nnode]]
+        calls.clear()
+        ecs = np.array([2.0, 15.0, 8.0])
+        ncs = np.array([2.0, 3.0, 8.0])
+        znt = np.where(ect < 5.0, 0, 1)
+        lib.calc_kriging_factors_2d(
+            ecs,
+            ncs,
+            1,
+            ect,
+            nct,
+            znt,
+            "exp",
+            "ordinary",
+            10.0,
+            1.0,
+            0.0,
+            1e10,
+            3,
+            1,
+            tmp_path / "factors.bin",
+            "binary",
+        )
+        assert calls[-1] == (znt.sum(), znt.sum())
+        # cancel
+        lib.set_progress_callback(lambda done, total: done >= 60, 30)
+        with pytest.raises(PestUtilsLibError, match="cancelled"):
+            lib.fieldgen2d_sva(*fieldgen_args)
+
+        def interrupt(done, total):
+            raise KeyboardInterrupt
+
+        lib.set_progress_callback(interrupt)
+        with pytest.raises(PestUtilsLibError, match="cancelled"):
+            lib.fieldgen2d_sva(*fieldgen_args)
+        with pytest.raises(PestUtilsLibError, match="interval"):
+            lib.set_progress_callback(interrupt, 0)
+    finally:
+        lib.set_progress_callback(None)
+    # removed
+    lib.fieldgen2d_sva(*fieldgen_args)
+
+
+def test_set_num_threads():
+    lib = PestUtilsLib()
+    nthreads = lib.get_num_threads()
+    assert nthreads >= 1
+    try:
+        lib.set_num_threads(2)
+        # 1 if the library was built without OpenMP
+        assert lib.get_num_threads() in (1, 2)
+        with pytest.raises(PestUtilsLibError, match="nthreads"):
+            lib.set_num_threads(0)
+    finally:
+        lib.set_num_threads(nthreads)